@@ -13,23 +13,20 @@ setup(
     version='0.2.5',
     packages=find_packages(),
     install_requires=requirements,
-)
-
-entry_points = {
-    'console_scripts': [
-        'my_command=package_name.module:function',
+    entry_points={
+        'console_scripts': [
+            'wxtools=wxtools.cli:main',
+        ],
+    },
+    author='JY',
+    author_email='yingjiang.jy@gmail.com',
+    url='https://github.com/terancejiang/wxtools',
+    description='wxtools',
+    long_description=open('README.md').read(),
+    long_description_content_type='text/markdown',
+    license='MIT',
+    classifiers=[
+        'Programming Language :: Python :: 3.6',
+        'License :: OSI Approved :: MIT License',
     ],
-},
-
-author = 'JY',
-author_email = 'yingjiang.jy@gmail.com',
-url = 'https://github.com/terancejiang/wxtools'
-description = 'wxtools'
-long_description = open('README.md').read(),
-long_description_content_type = 'text/markdown',
-url = '',
-license = 'MIT',
-classifiers = [
-    'Programming Language :: Python :: 3.6',
-    'License :: OSI Approved :: MIT License',
-],
+)
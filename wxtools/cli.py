@@ -0,0 +1,284 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, TextIO
+
+# command modules are imported inside the commands, so that I/O commands do not pay for cv2/onnxruntime imports
+#
+# such as:
+#   wxtools list /data/images --extensions .jpg > paths.txt
+#   wxtools copy --src /data/images --dst /mnt/images --chunksize 64 --verify < paths.txt
+#   wxtools quality < paths.txt > quality.tsv
+
+
+def _logs_to_stderr() -> None:
+    """
+    wxtools loggers write to stdout, move them to stderr so that stdout only carries command output
+    """
+    for name, item in logging.root.manager.loggerDict.items():
+        if name.startswith('wxtools') and isinstance(item, logging.Logger):
+            for handler in item.handlers:
+                if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                    handler.setStream(sys.stderr)
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    """
+    lazily read a manifest, one path per line, '-' for stdin
+    """
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _open_output(path: str) -> TextIO:
+    return sys.stdout if path == '-' else open(path, 'w')
+
+
+def _expand_inputs(inputs: List[str], extension: str) -> List[str]:
+    """
+    expand directories into the files with extension they contain, recursively; '-' reads paths from stdin
+    """
+    paths = []
+    for item in inputs:
+        if item == '-':
+            paths.extend(_read_lines(item))
+        elif os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, x) for x in sorted(files) if x.lower().endswith(extension))
+        else:
+            paths.append(item)
+    return paths
+
+
+def convert_worker(arg):
+    path, output_dir, ext = arg
+    from wxtools.cv.img_utils import convert_jp2_to_image
+    os.makedirs(output_dir, exist_ok=True)
+    convert_jp2_to_image([path], output_dir, ext)
+    return path
+
+
+def quality_worker(arg):
+    path, bright_lower, dark_lower, cache = arg
+    from wxtools.cv.tiling import zone_fractions_file
+    return path, zone_fractions_file(path, bright_lower, dark_lower, cache=cache)
+
+
+def cmd_list(args) -> int:
+    from wxtools.io_utils import list_files_aio, list_files_mlpro
+    _logs_to_stderr()
+    if args.aio:
+        paths = list_files_aio(args.root, args.threads, args.exclude, args.extensions)
+    else:
+        paths = list_files_mlpro(args.root, args.workers, args.max_depth, args.exclude, args.extensions)
+    out = _open_output(args.output)
+    for path in paths:
+        out.write(path + '\n')
+    out.flush()
+    return len(paths)
+
+
+def cmd_copy(args) -> int:
+    from wxtools.io_utils import copy_file_mlpro, verify_copy
+    _logs_to_stderr()
+    file_list = list(_read_lines(args.input))
+    copy_file_mlpro(file_list, args.src, args.dst, args.workers, args.dedup, args.hash_cache, args.chunksize)
+    if args.verify or args.checksum:
+        report = verify_copy(file_list, args.src, args.dst, args.checksum, args.workers, report_path=args.report)
+        if report['files']:
+            print('{} files failed verification'.format(len(report['files'])), file=sys.stderr)
+    return len(file_list)
+
+
+def cmd_restructure(args) -> int:
+    from wxtools.io_utils import copy_worker, iter_restructure_pairs
+    from wxtools.utils.mlpro_utils import iter_mlpro
+    _logs_to_stderr()
+    paths = list(_read_lines(args.input))
+    out = _open_output(args.output)
+
+    def pairs():
+        # the pairs are written and copied as they are generated, without collecting both path lists
+        for src, dst in iter_restructure_pairs(paths, args.dst_root, args.id_index):
+            out.write('{}\t{}\n'.format(src, dst))
+            yield src, dst
+
+    if args.copy:
+        for _ in iter_mlpro(copy_worker, pairs(), args.workers, args.chunksize, total=len(paths)):
+            pass
+    else:
+        for _ in pairs():
+            pass
+    out.flush()
+    return len(paths)
+
+
+def cmd_bin2png(args) -> int:
+    from tqdm import tqdm
+    from wxtools.cv.bin2png import Bin2ImgJob
+    _logs_to_stderr()
+    paths = _expand_inputs(args.inputs, '.bin')
+    with tqdm(total=len(paths)) as pbar:
+        job = Bin2ImgJob(paths, args.output, tuple(args.size), args.channel, args.workers, args.chunksize,
+                         progress_callback=lambda processed, total: pbar.update(processed - pbar.n))
+        result = job.run()
+    for path, error in result['failed']:
+        print('Failed to convert {}: {}'.format(path, error), file=sys.stderr)
+    return result['converted']
+
+
+def cmd_convert(args) -> int:
+    from wxtools.utils.mlpro_utils import iter_mlpro
+    _logs_to_stderr()
+    # a root only matches whole directory names, /data/a is not the root of /data/ab/x.jp2
+    roots = [os.path.join(x.rstrip('/'), '') for x in args.inputs if os.path.isdir(x)]
+    tasks = []
+    for path in _expand_inputs(args.inputs, '.jp2'):
+        root = next((x for x in roots if path.startswith(x)), None)
+        relative = os.path.relpath(os.path.dirname(path), root) if root is not None else ''
+        tasks.append((path, os.path.normpath(os.path.join(args.output, relative)), args.ext))
+    return sum(1 for _ in iter_mlpro(convert_worker, tasks, args.workers, args.chunksize, total=len(tasks)))
+
+
+def cmd_quality(args) -> int:
+    from wxtools.utils.mlpro_utils import iter_mlpro
+    _logs_to_stderr()
+    tasks = ((path, args.bright_lower, args.dark_lower, args.cache) for path in _read_lines(args.input))
+    out = _open_output(args.output)
+    out.write('path\tbright\tdark\tbright_large\tdark_large\n')
+    count = 0
+    for path, fractions in iter_mlpro(quality_worker, tasks, args.workers, args.chunksize):
+        count += 1
+        if fractions is None:
+            print('Failed to read image: {}'.format(path), file=sys.stderr)
+            continue
+        out.write('{}\t{:.6f}\t{:.6f}\t{:d}\t{:d}\n'.format(
+            path, fractions['bright'], fractions['dark'],
+            fractions['bright'] > args.bright_threshold, fractions['dark'] > args.dark_threshold))
+    out.flush()
+    return count
+
+
+def cmd_similarity(args) -> int:
+    import numpy as np
+    from wxtools.cv.feature_pipeline import FEATURES_NAME, INDEX_NAME, STATUS_NAME, DONE
+    from wxtools.linalg.group_clean import clean_groups, offsets_from_labels
+    _logs_to_stderr()
+
+    with open(os.path.join(args.feature_dir, INDEX_NAME)) as f:
+        paths = np.array(f.read().split('\n'))
+    rows = np.flatnonzero(np.load(os.path.join(args.feature_dir, STATUS_NAME)) == DONE)
+    features = np.load(os.path.join(args.feature_dir, FEATURES_NAME), mmap_mode='r')
+
+    labels = [x.split('/')[args.id_index] for x in paths[rows]] if args.id_index is not None else [''] * len(rows)
+    order, offsets, _ = offsets_from_labels(labels)
+    rows = rows[order]
+    result = clean_groups(np.asarray(features[rows]), offsets, args.min_centroid_sim, args.min_intra_mean,
+                          args.max_zscore, args.min_group_size, args.workers)
+
+    out = _open_output(args.output)
+    out.write('path\tcentroid_sim\tintra_mean\toutlier\n')
+    for path, centroid_sim, intra_mean, outlier in zip(paths[rows], result['centroid_sim'], result['intra_mean'],
+                                                       result['outlier']):
+        out.write('{}\t{:.6f}\t{:.6f}\t{:d}\n'.format(path, centroid_sim, intra_mean, outlier))
+    out.flush()
+    return len(rows)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='wxtools', description='wxtools command line tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, func, help_text, chunksize=1):
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes')
+        sub.add_argument('--chunksize', type=int, default=chunksize, help='number of items sent to a worker at once')
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = add_command('list', cmd_list, 'list files of a directory tree, one per line')
+    sub.add_argument('root', help='root directory')
+    sub.add_argument('--max-depth', type=int, default=1, help='depth of the subdirectories listed in parallel')
+    sub.add_argument('--exclude', nargs='+', help='skip paths containing any of these strings')
+    sub.add_argument('--extensions', nargs='+', help='keep paths ending with any of these extensions')
+    sub.add_argument('--aio', action='store_true', help='list with a thread pool instead of processes')
+    sub.add_argument('--threads', type=int, default=64, help='number of threads with --aio')
+    sub.add_argument('--output', default='-', help="output file, '-' for stdout")
+
+    sub = add_command('copy', cmd_copy, 'copy the files of a manifest from src to dst', chunksize=64)
+    sub.add_argument('--src', required=True, help='source root directory')
+    sub.add_argument('--dst', required=True, help='destination root directory')
+    sub.add_argument('--input', default='-', help="manifest of paths relative to src or absolute, '-' for stdin")
+    sub.add_argument('--dedup', choices=['skip', 'hardlink'], help='copy byte-identical sources only once')
+    sub.add_argument('--hash-cache', help='path of the dedup hash cache')
+    sub.add_argument('--verify', action='store_true', help='verify sizes and mtimes after copying')
+    sub.add_argument('--checksum', action='store_true', help='verify contents after copying')
+    sub.add_argument('--report', help='path of the JSON verify report')
+
+    sub = add_command('restructure', cmd_restructure, 'group the images of a manifest by id under dst_root',
+                      chunksize=64)
+    sub.add_argument('--dst-root', required=True, help='destination root directory')
+    sub.add_argument('--id-index', type=int, required=True, help="index of the id in the '/' separated path")
+    sub.add_argument('--input', default='-', help="manifest of image paths, '-' for stdin")
+    sub.add_argument('--output', default='-', help="output file of 'src<TAB>dst' lines, '-' for stdout")
+    sub.add_argument('--copy', action='store_true', help='also copy the files')
+
+    sub = add_command('bin2png', cmd_bin2png, 'convert .bin images to png with a thread pool', chunksize=16)
+    sub.add_argument('inputs', nargs='+', help="directories, .bin files, or '-' to read paths from stdin")
+    sub.add_argument('--output', required=True, help='output directory')
+    sub.add_argument('--size', nargs=2, type=int, default=[600, 800], help='image width and height')
+    sub.add_argument('--channel', type=int, default=1, help='number of channels')
+
+    sub = add_command('convert', cmd_convert, 'convert .jp2 images to jpg or png, keeping the folder structure')
+    sub.add_argument('inputs', nargs='+', help="directories, .jp2 files, or '-' to read paths from stdin")
+    sub.add_argument('--output', required=True, help='output directory')
+    sub.add_argument('--ext', choices=['jpg', 'png'], default='jpg', help='output format')
+
+    sub = add_command('quality', cmd_quality, 'bright and dark area fractions of images, as TSV', chunksize=16)
+    sub.add_argument('--input', default='-', help="manifest of image paths, '-' for stdin")
+    sub.add_argument('--output', default='-', help="output file, '-' for stdout")
+    sub.add_argument('--bright-lower', type=int, default=240, help='lower intensity of bright pixels')
+    sub.add_argument('--dark-lower', type=int, default=40, help='lower intensity of non dark pixels')
+    sub.add_argument('--bright-threshold', type=float, default=0.3, help='bright fraction of a bright image')
+    sub.add_argument('--dark-threshold', type=float, default=0.2, help='dark fraction of a dark image')
+    sub.add_argument('--cache', help='artifact cache directory, fractions of unchanged images are reused')
+
+    sub = add_command('similarity', cmd_similarity, 'similarity statistics of features from extract_features')
+    sub.add_argument('feature_dir', help='output directory of extract_features')
+    sub.add_argument('--id-index', type=int, help="index of the id in the '/' separated path, None for one group")
+    sub.add_argument('--output', default='-', help="output file, '-' for stdout")
+    sub.add_argument('--min-centroid-sim', type=float, help='flag samples below this centroid similarity')
+    sub.add_argument('--min-intra-mean', type=float, help='flag samples below this mean similarity')
+    sub.add_argument('--max-zscore', type=float, default=3.0, help='flag samples below this z-score')
+    sub.add_argument('--min-group-size', type=int, default=3, help='groups smaller than this are never flagged')
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    count = args.func(args)
+    elapsed = time.perf_counter() - start
+    print('{}: {} items in {:.2f}s ({:.1f} items/s)'.format(args.command, count, elapsed,
+                                                             count / elapsed if elapsed > 0 else 0.0),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,8 +9,9 @@ File Name: bin2png.py
 """
 import argparse
 import os
-import tkinter as tk
-from tkinter import filedialog, font
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
@@ -20,13 +21,15 @@ import numpy as np
 #             img_size: Tuple[int, int] = (600, 800),
 #             channel: int = 1,
 #             output_dst: str = None) -> List[np.ndarray]:
-def bin2img(images, img_size=(600, 800), channel=1, output_dst=None):
+def bin2img(images, img_size=(600, 800), channel=1, output_dst=None, out=None):
     """
     convert binary image to cv2 images
     :param channel:  channel of binary image
     :param output_dst:  output directory
     :param images: can be 1. a image path, 2. a single binary image, 3. list of paths, 4. list of binary images
     :param img_size: binary image size in (width, height), default is (600, 800)
+    :param out: uint8 buffer of shape (n, height, width, channel), files are read directly into it and the
+                returned images are views of it, None to allocate
     :return: cv2 image or list of cv2 images
     """
     image_paths = []
@@ -35,16 +38,13 @@ def bin2img(images, img_size=(600, 800), channel=1, output_dst=None):
         if os.path.isdir(images):
             image_paths = [os.path.join(images, image) for image in os.listdir(images)]
             image_paths = [image for image in image_paths if image.endswith(".bin")]
-            images = [np.fromfile(image, dtype=np.uint8) for image in image_paths]
         elif os.path.exists(images):
-            if not os.path.exists(images):
-                raise ValueError("image path does not exist")
             if not images.endswith(".bin"):
                 raise ValueError("image path should be a binary image")
             image_paths = [images]
-            images = [np.fromfile(images, dtype=np.uint8)]
         else:
             raise ValueError("image path does not exist")
+        images = image_paths
     # image is a single image
     elif isinstance(images, np.ndarray):
         images = [images]
@@ -56,7 +56,6 @@ def bin2img(images, img_size=(600, 800), channel=1, output_dst=None):
             if not all([image.endswith(".bin") for image in images]):
                 raise ValueError("image path should be a binary image")
             image_paths = images
-            images = [np.fromfile(image, dtype=np.uint8) for image in images]
         # image is a list of images
         else:
             images = images
@@ -65,11 +64,27 @@ def bin2img(images, img_size=(600, 800), channel=1, output_dst=None):
 
     width, height = img_size
     channel = channel
+    frame_size = width * height * channel
+    if out is not None:
+        assert out.shape[0] >= len(images) and out.shape[1:] == (height, width, channel) and out.dtype == np.uint8, \
+            "out should be a uint8 array of shape (>= {}, {}, {}, {})".format(len(images), height, width, channel)
+
     converted_images = []
     for idx, image in enumerate(images):
-        image = image[0:width * height]
+        if out is not None:
+            image_output = out[idx]
+            if len(image_paths) > 0:
+                with open(image_paths[idx], 'rb') as f:
+                    if f.readinto(image_output.reshape(-1)) < frame_size:
+                        raise ValueError("{} is smaller than {} bytes".format(image_paths[idx], frame_size))
+            else:
+                np.copyto(image_output.reshape(-1), image.reshape(-1)[0:frame_size])
+        else:
+            if len(image_paths) > 0:
+                image = np.fromfile(image_paths[idx], dtype=np.uint8, count=frame_size)
+            image = image[0:frame_size]
 
-        image_output = np.reshape(image, (height, width, channel))
+            image_output = np.reshape(image, (height, width, channel))
         converted_images.append(image_output)
 
         if output_dst is not None:
@@ -84,76 +99,171 @@ def bin2img(images, img_size=(600, 800), channel=1, output_dst=None):
     return converted_images
 
 
-class Bin2ImgApp:
-    def __init__(self, master):
-        self.master = master
-        master.title("Bin2Img Converter")
-
-        # Define a larger font
-        self.custom_font = font.Font(family="Helvetica", size=20)
-
-        # Apply the font to labels, entries, and buttons
-        tk.Label(master, text="Source Folder:", font=self.custom_font).grid(row=0)
-        tk.Label(master, text="Output Folder:", font=self.custom_font).grid(row=1)
-        tk.Label(master, text="Image Size (WxH):", font=self.custom_font).grid(row=2)
-        tk.Label(master, text="Channel:", font=self.custom_font).grid(row=3)
-
-        self.src_entry = tk.Entry(master, font=self.custom_font)
-        self.src_entry.grid(row=0, column=1)
-        tk.Button(master, text="Browse", font=self.custom_font, command=self.browse_src).grid(row=0, column=2)
-
-        self.out_entry = tk.Entry(master, font=self.custom_font)
-        self.out_entry.grid(row=1, column=1)
-        tk.Button(master, text="Browse", font=self.custom_font, command=self.browse_out).grid(row=1, column=2)
-
-        self.size_entry = tk.Entry(master, font=self.custom_font)
-        self.size_entry.insert(0, "600x800")  # Default size
-        self.size_entry.grid(row=2, column=1)
-
-        self.channel_entry = tk.Entry(master, font=self.custom_font)
-        self.channel_entry.insert(0, "1")  # Default channel
-        self.channel_entry.grid(row=3, column=1)
-
-        tk.Button(master, text="Convert", font=self.custom_font, command=self.convert).grid(row=4, column=1)
-
-    def browse_src(self):
-        directory = filedialog.askdirectory()
-        self.src_entry.delete(0, tk.END)
-        self.src_entry.insert(0, directory)
-
-    def browse_out(self):
-        directory = filedialog.askdirectory()
-        self.out_entry.delete(0, tk.END)
-        self.out_entry.insert(0, directory)
+def list_bin_files(images):
+    """
+    list .bin files from a directory (sorted by name), a single path or a list of paths
+    :param images:  directory, .bin path or list of .bin paths
+    :return:  list of .bin paths
+    """
+    if isinstance(images, str):
+        if os.path.isdir(images):
+            return [os.path.join(images, x) for x in sorted(os.listdir(images)) if x.endswith(".bin")]
+        return [images]
+    return list(images)
 
-    def convert(self):
-        # Conversion logic remains the same
-        src_dir = self.src_entry.get()
-        out_dir = self.out_entry.get()
-        size = tuple(map(int, self.size_entry.get().split('x')))
-        channel = int(self.channel_entry.get())
 
-        images = src_dir  # Pass the source directory directly
-        bin2img(images, img_size=size, channel=channel, output_dst=out_dir)
-        CustomDialog(self.master, "Images converted successfully.")
+class Bin2ImgJob:
+    """
+    bin2img conversion of many files as a background job, files are converted by a thread pool
+    (reading and png encoding release the GIL), with progress reporting and cancellation.
 
+    such as:
+        job = Bin2ImgJob("/data/bins", "/data/png", img_size=(600, 800), progress_callback=print).start()
+        ...
+        job.cancel()
+        result = job.wait()
 
-class CustomDialog:
-    def __init__(self, master, text):
-        top = self.top = tk.Toplevel(master)
-        self.custom_font = font.Font(family="Helvetica", size=12)  # Custom font
+        # blocking, from a script
+        result = Bin2ImgJob(paths, "/data/png", num_workers=16).run()
+    """
 
-        tk.Label(top, text=text, font=self.custom_font).pack(pady=10)
-        tk.Button(top, text="OK", command=self.ok, font=self.custom_font).pack(pady=5)
+    def __init__(self,
+                 images,
+                 output_dst,
+                 img_size=(600, 800),
+                 channel=1,
+                 num_workers=8,
+                 chunksize=16,
+                 progress_callback=None):
+        """
+        :param images:  directory, .bin path or list of .bin paths
+        :param output_dst:  output directory
+        :param img_size:  binary image size in (width, height)
+        :param channel:  channel of binary image
+        :param num_workers:  number of worker threads
+        :param chunksize:  number of files converted per task, cancellation is checked before each file
+        :param progress_callback:  function (processed, total) called from the job thread after each task
+        """
+        self.image_paths = list_bin_files(images)
+        self.output_dst = output_dst
+        self.img_size = tuple(img_size)
+        self.channel = channel
+        self.num_workers = num_workers
+        self.chunksize = chunksize
+        self.progress_callback = progress_callback
+
+        self.total = len(self.image_paths)
+        self.converted = 0
+        self.failed = []
+        self.error = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._thread = None
+
+    @property
+    def processed(self):
+        return self.converted + len(self.failed)
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        """
+        start the job in a background thread
+        :return:  self
+        """
+        assert self._thread is None, "job already started"
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        stop the job, files being converted are finished, the remaining files are not converted
+        """
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """
+        wait for the job to finish
+        :param timeout:  timeout in seconds, None to wait forever
+        :return:  result dict, None on timeout
+        """
+        if not self._finished.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.result()
+
+    def run(self):
+        """
+        run the job in the calling thread
+        :return:  result dict
+        """
+        self._thread = threading.current_thread()
+        self._run()
+        return self.wait()
+
+    def result(self):
+        """
+        :return:  dict of total, converted, failed [(path, error)] and cancelled
+        """
+        return {'total': self.total, 'converted': self.converted, 'failed': list(self.failed),
+                'cancelled': self.cancelled}
+
+    def _convert_chunk(self, paths):
+        converted, failed = 0, []
+        for path in paths:
+            if self._cancel.is_set():
+                break
+            try:
+                bin2img([path], img_size=self.img_size, channel=self.channel, output_dst=self.output_dst)
+                converted += 1
+            except (ValueError, OSError) as e:
+                failed.append((path, str(e)))
+        return converted, failed
+
+    def _run(self):
+        try:
+            os.makedirs(self.output_dst, exist_ok=True)
+            chunks = [self.image_paths[i:i + self.chunksize] for i in range(0, self.total, self.chunksize)]
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                futures = deque()
+                for chunk in chunks:
+                    if self._cancel.is_set():
+                        break
+                    futures.append(executor.submit(self._convert_chunk, chunk))
+                    # bound the number of pending tasks, so a cancel takes effect quickly
+                    while len(futures) >= self.num_workers * 2:
+                        self._collect(futures.popleft())
+                while futures:
+                    self._collect(futures.popleft())
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finished.set()
+
+    def _collect(self, future):
+        converted, failed = future.result()
+        self.converted += converted
+        self.failed.extend(failed)
+        if self.progress_callback is not None:
+            self.progress_callback(self.processed, self.total)
+
+
+def __getattr__(name):
+    # the Tk GUI is imported on first use, so that this module works on headless servers
+    if name in ('Bin2ImgApp', 'CustomDialog'):
+        from wxtools.cv import bin2png_gui
+        return getattr(bin2png_gui, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-    def ok(self):
-        self.top.destroy()
 
-# if __name__ == "__main__":
-#     root = tk.Tk()
-#     app = Bin2ImgApp(root)
-#     root.mainloop()
-# # #
 if __name__ == "__main__":
 
     # Example usage:
@@ -165,14 +275,17 @@ if __name__ == "__main__":
     parser.add_argument('--size', nargs=2, type=int, default=[600, 800],
                         help='Size of the output images as two integers: width height')
     parser.add_argument('--channel', type=int, default=1, help='Number of channels in the image')
-    parser.add_argument('--output_dst', type=str, help='Output directory to save the images')
+    parser.add_argument('--output_dst', type=str, required=True, help='Output directory to save the images')
 
     args = parser.parse_args()
 
     # Convert the size argument from list to tuple
     size = tuple(args.size)
 
-    # Call the bin2img function with the parsed arguments
-    converted_images = bin2img(images=args.images, img_size=size, channel=args.channel, output_dst=args.output_dst)
+    # Expand directories, nargs='+' always gives a list
+    images = [path for image in args.images for path in list_bin_files(image)]
+
+    # Convert with the job engine
+    result = Bin2ImgJob(images, args.output_dst, img_size=size, channel=args.channel).run()
 
-    print("Images converted successfully.")
+    print("{} images converted successfully, {} failed.".format(result['converted'], len(result['failed'])))
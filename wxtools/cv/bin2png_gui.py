@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Project Name: wxtools
+File Created: 2024/2/1 下午5:31
+Author: Ying.Jiang
+File Name: bin2png_gui.py
+"""
+import tkinter as tk
+from tkinter import filedialog, font
+
+from wxtools.cv.bin2png import Bin2ImgJob
+
+# interval of the progress polling in milliseconds
+POLL_INTERVAL = 100
+
+
+class Bin2ImgApp:
+    def __init__(self, master):
+        self.master = master
+        self.job = None
+        master.title("Bin2Img Converter")
+
+        # Define a larger font
+        self.custom_font = font.Font(family="Helvetica", size=20)
+
+        # Apply the font to labels, entries, and buttons
+        tk.Label(master, text="Source Folder:", font=self.custom_font).grid(row=0)
+        tk.Label(master, text="Output Folder:", font=self.custom_font).grid(row=1)
+        tk.Label(master, text="Image Size (WxH):", font=self.custom_font).grid(row=2)
+        tk.Label(master, text="Channel:", font=self.custom_font).grid(row=3)
+
+        self.src_entry = tk.Entry(master, font=self.custom_font)
+        self.src_entry.grid(row=0, column=1)
+        tk.Button(master, text="Browse", font=self.custom_font, command=self.browse_src).grid(row=0, column=2)
+
+        self.out_entry = tk.Entry(master, font=self.custom_font)
+        self.out_entry.grid(row=1, column=1)
+        tk.Button(master, text="Browse", font=self.custom_font, command=self.browse_out).grid(row=1, column=2)
+
+        self.size_entry = tk.Entry(master, font=self.custom_font)
+        self.size_entry.insert(0, "600x800")  # Default size
+        self.size_entry.grid(row=2, column=1)
+
+        self.channel_entry = tk.Entry(master, font=self.custom_font)
+        self.channel_entry.insert(0, "1")  # Default channel
+        self.channel_entry.grid(row=3, column=1)
+
+        self.convert_button = tk.Button(master, text="Convert", font=self.custom_font, command=self.convert)
+        self.convert_button.grid(row=4, column=1)
+        self.cancel_button = tk.Button(master, text="Cancel", font=self.custom_font, command=self.cancel,
+                                       state=tk.DISABLED)
+        self.cancel_button.grid(row=4, column=2)
+
+        self.progress_label = tk.Label(master, text="", font=self.custom_font)
+        self.progress_label.grid(row=5, column=0, columnspan=3)
+
+    def browse_src(self):
+        directory = filedialog.askdirectory()
+        self.src_entry.delete(0, tk.END)
+        self.src_entry.insert(0, directory)
+
+    def browse_out(self):
+        directory = filedialog.askdirectory()
+        self.out_entry.delete(0, tk.END)
+        self.out_entry.insert(0, directory)
+
+    def convert(self):
+        src_dir = self.src_entry.get()
+        out_dir = self.out_entry.get()
+        size = tuple(map(int, self.size_entry.get().split('x')))
+        channel = int(self.channel_entry.get())
+
+        # the conversion runs in a background job, the Tk main thread only polls its progress
+        self.job = Bin2ImgJob(src_dir, out_dir, img_size=size, channel=channel).start()
+        self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.master.after(POLL_INTERVAL, self.poll)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def poll(self):
+        job = self.job
+        self.progress_label.config(text="{} / {}".format(job.processed, job.total))
+        if not job.done:
+            self.master.after(POLL_INTERVAL, self.poll)
+            return
+
+        self.convert_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if job.error is not None:
+            text = "Conversion failed: {}".format(job.error)
+        elif job.cancelled:
+            text = "Conversion cancelled, {} images converted.".format(job.converted)
+        else:
+            text = "{} images converted successfully, {} failed.".format(job.converted, len(job.failed))
+        CustomDialog(self.master, text)
+
+
+class CustomDialog:
+    def __init__(self, master, text):
+        top = self.top = tk.Toplevel(master)
+        self.custom_font = font.Font(family="Helvetica", size=12)  # Custom font
+
+        tk.Label(top, text=text, font=self.custom_font).pack(pady=10)
+        tk.Button(top, text="OK", command=self.ok, font=self.custom_font).pack(pady=5)
+
+    def ok(self):
+        self.top.destroy()
+
+
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = Bin2ImgApp(root)
+    root.mainloop()
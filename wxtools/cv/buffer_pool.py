@@ -0,0 +1,59 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    preallocated destination arrays keyed by (name, shape, dtype), allocated on first use and reused afterwards,
+    so a steady-state frame loop runs without per-frame allocations.
+    a buffer is overwritten by the next call with the same key, use one pool per thread.
+
+    such as:
+        pool = BufferPool()
+        out = pool.get('input', (1, 1, 112, 112), np.float32)
+        for idx, frame in VideoFrameSource("video.mp4"):
+            preprocess_2gray(frame, (112, 112), out=out, pool=pool)
+            sess.run(None, {input_name: out})
+    """
+
+    def __init__(self):
+        self._buffers: Dict[Tuple[str, Tuple[int, ...], np.dtype], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        :param name:  buffer name, e.g. the pipeline stage using it
+        :param shape:  buffer shape
+        :param dtype:  buffer dtype
+        :return:  uninitialized buffer, the same array for the same key
+        """
+        key = (name, tuple(int(x) for x in shape), np.dtype(dtype))
+        buf = self._buffers.get(key)
+        if buf is None:
+            with self._lock:
+                buf = self._buffers.setdefault(key, np.empty(key[1], dtype=key[2]))
+        return buf
+
+    def like(self, name: str, arr: np.ndarray) -> np.ndarray:
+        """
+        buffer with the shape and dtype of arr
+        """
+        return self.get(name, arr.shape, arr.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(x.nbytes for x in self._buffers.values())
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buffers.clear()
@@ -0,0 +1,150 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from typing import Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from wxtools.cv.buffer_pool import BufferPool
+from wxtools.cv.geometry import estimate_similarity, warp_affine_batch
+
+# eyes, nose tip and mouth corners of an aligned 112x112 face, the common arcface template
+FIVE_POINT_TEMPLATE = np.array([[38.2946, 51.6963],
+                                [73.5318, 51.5014],
+                                [56.0252, 71.7366],
+                                [41.5493, 92.3655],
+                                [70.7299, 92.2041]], dtype=np.float64)
+FIVE_POINT_TEMPLATE_SIZE = (112, 112)
+
+
+def box_matrices(boxes: np.ndarray,
+                 size: Tuple[int, int],
+                 margin: float = 0.0,
+                 keep_aspect: bool = True,
+                 xywh: bool = False) -> np.ndarray:
+    """
+    affine matrices mapping boxes onto crops of the given size, the box center goes to the crop center
+    :param boxes:  (N, 4) boxes, x1, y1, x2, y2
+    :param size:  crop size (w, h)
+    :param margin:  fraction of the box size added around it, such as 0.2 for 10% on every side
+    :param keep_aspect:  scale both axes by the same factor, the box is padded instead of stretched
+    :param xywh:  whether boxes are xywh format
+    :return:  (N, 2, 3) float64 matrices
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if xywh:
+        boxes = np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+    w, h = size
+    box_w = np.maximum(boxes[:, 2] - boxes[:, 0], 1) * (1 + margin)
+    box_h = np.maximum(boxes[:, 3] - boxes[:, 1], 1) * (1 + margin)
+    scale_x, scale_y = w / box_w, h / box_h
+    if keep_aspect:
+        scale_x = scale_y = np.minimum(scale_x, scale_y)
+
+    matrices = np.zeros((len(boxes), 2, 3), dtype=np.float64)
+    matrices[:, 0, 0], matrices[:, 1, 1] = scale_x, scale_y
+    matrices[:, 0, 2] = w / 2 - scale_x * (boxes[:, 0] + boxes[:, 2]) / 2
+    matrices[:, 1, 2] = h / 2 - scale_y * (boxes[:, 1] + boxes[:, 3]) / 2
+    return matrices
+
+
+def landmark_matrices(landmarks: np.ndarray,
+                      size: Tuple[int, int] = FIVE_POINT_TEMPLATE_SIZE,
+                      template: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    similarity transforms aligning landmarks to a template
+    :param landmarks:  (N, K, 2) landmarks
+    :param size:  crop size (w, h)
+    :param template:  (K, 2) landmark positions in the crop, None for FIVE_POINT_TEMPLATE scaled to size
+    :return:  (N, 2, 3) float64 matrices
+    """
+    if template is None:
+        template = FIVE_POINT_TEMPLATE * (np.array(size, dtype=np.float64) / FIVE_POINT_TEMPLATE_SIZE)
+    return estimate_similarity(landmarks, template)
+
+
+def crop_align(images: Union[np.ndarray, Sequence[np.ndarray]],
+               boxes: Optional[np.ndarray] = None,
+               landmarks: Optional[np.ndarray] = None,
+               size: Tuple[int, int] = FIVE_POINT_TEMPLATE_SIZE,
+               image_index: Optional[np.ndarray] = None,
+               template: Optional[np.ndarray] = None,
+               margin: float = 0.0,
+               out: Optional[np.ndarray] = None,
+               flags: int = cv2.INTER_LINEAR,
+               num_threads: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    extract the crops of a batch of detections into one (N, h, w[, C]) array.
+    crops are aligned to the template when landmarks are given, and cut around the boxes otherwise. all transforms
+    are computed at once and the warps run in a thread pool, writing into out directly.
+    such as:
+        # every face of a frame, aligned and ready for a recognition model
+        crops, matrices = crop_align([frame], landmarks=landmarks, image_index=np.zeros(len(landmarks), int))
+        batch = crops_2gray(crops)
+        # the matrices map crop coordinates back to the frame with invert_affine
+    :param images:  images the detections come from, a list or a (M, H, W[, C]) array
+    :param boxes:  (N, 4) boxes, x1, y1, x2, y2
+    :param landmarks:  (N, K, 2) landmarks, used instead of boxes when given
+    :param size:  crop size (w, h)
+    :param image_index:  (N,) index of the image of each detection, None when detection i comes from images[i]
+    :param template:  (K, 2) landmark positions in the crop, see landmark_matrices
+    :param margin:  box margin, see box_matrices
+    :param out:  (N, h, w[, C]) output buffer, None to allocate
+    :param flags:  cv2 interpolation flags
+    :param num_threads:  number of warping threads
+    :return:  (crops, (N, 2, 3) matrices mapping image coordinates to crop coordinates)
+    """
+    if landmarks is not None:
+        matrices = landmark_matrices(landmarks, size, template)
+    elif boxes is not None:
+        matrices = box_matrices(boxes, size, margin)
+    else:
+        raise ValueError("Either boxes or landmarks should be given.")
+
+    if image_index is None:
+        assert len(images) == len(matrices), "got {} images and {} detections, pass image_index".format(
+            len(images), len(matrices))
+        sources = images
+    else:
+        image_index = np.asarray(image_index).reshape(-1)
+        assert len(image_index) == len(matrices), "image_index should have {} entries".format(len(matrices))
+        sources = [images[i] for i in image_index]
+
+    if len(matrices) == 0:
+        # no detections, nothing to warp
+        if out is None:
+            sample = images[0] if len(images) else np.empty((0, 0), dtype=np.uint8)
+            out = np.empty((0, size[1], size[0]) + sample.shape[2:], dtype=sample.dtype)
+        return out, matrices
+    crops = warp_affine_batch(sources, matrices, size, out=out, flags=flags, num_threads=num_threads)
+    return crops, matrices
+
+
+def crops_2gray(crops: np.ndarray,
+                out: Optional[np.ndarray] = None,
+                pool: Optional[BufferPool] = None) -> np.ndarray:
+    """
+    preprocess_2gray for a batch of crops, with a single color conversion for the whole batch
+    :param crops:  (N, h, w, 3) BGR uint8 crops, such as the output of crop_align
+    :param out:  float32 output buffer of shape (N, 1, h, w), None to allocate
+    :param pool:  buffer pool for the gray intermediate, None to allocate it
+    :return:  (N, 1, h, w) float32 batch, the same values as preprocess_2gray of each crop
+    """
+    assert crops.ndim == 4 and crops.shape[3] == 3, "crops should have shape (N, h, w, 3), got {}".format(
+        crops.shape)
+    n, h, w = crops.shape[:3]
+    if out is None:
+        out = np.empty((n, 1, h, w), dtype=np.float32)
+    assert out.shape == (n, 1, h, w), "out should have shape {}".format((n, 1, h, w))
+    if n == 0:
+        return out
+
+    # the batch is converted as one tall image, color conversion is per pixel
+    gray = pool.get('crops_2gray.gray', (n * h, w), crops.dtype) if pool is not None else None
+    gray = cv2.cvtColor(np.ascontiguousarray(crops).reshape(n * h, w, 3), cv2.COLOR_BGR2GRAY, dst=gray)
+    np.subtract(gray.reshape(n, h, w), 127.5, out=out[:, 0], dtype=np.float32)
+    np.multiply(out, 0.0078125, out=out)
+    return out
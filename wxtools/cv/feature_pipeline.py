@@ -0,0 +1,234 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from wxtools.cv.img_utils import get_onnx_session, preprocess_2gray
+from wxtools.logger.utils import colorstr
+from wxtools.utils.artifact_cache import ArtifactCache, cached_artifact
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+FEATURES_NAME = 'features.npy'
+STATUS_NAME = 'status.npy'
+INDEX_NAME = 'index.txt'
+
+# values of status.npy
+PENDING, DONE, FAILED = 0, 1, 2
+
+
+def _load_index(output_dir: str, image_paths: List[str], resume: bool) -> bool:
+    """
+    write the index file, or check it against image_paths when resuming
+    :return:  True if an existing run is resumed
+    """
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    if resume and os.path.exists(index_path):
+        with open(index_path) as f:
+            existing = f.read().split('\n')
+        if existing != list(image_paths):
+            raise ValueError('{} does not match image_paths, use a new output_dir or resume=False'.format(index_path))
+        return os.path.exists(os.path.join(output_dir, STATUS_NAME))
+
+    with open(index_path, 'w') as f:
+        f.write('\n'.join(image_paths))
+    return False
+
+
+def _open_status(output_dir: str, num_images: int, resumed: bool) -> np.ndarray:
+    path = os.path.join(output_dir, STATUS_NAME)
+    if resumed:
+        return np.load(path, mmap_mode='r+')
+    status = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(num_images,))
+    status[:] = PENDING
+    return status
+
+
+def _open_features(output_dir: str, num_images: int, dim: int, resumed: bool) -> np.ndarray:
+    path = os.path.join(output_dir, FEATURES_NAME)
+    if resumed and os.path.exists(path):
+        features = np.load(path, mmap_mode='r+')
+        if features.shape != (num_images, dim):
+            raise ValueError('{} has shape {}, expected {}'.format(path, features.shape, (num_images, dim)))
+        return features
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(num_images, dim))
+
+
+def _decode_batches(image_paths: List[str],
+                    pending: np.ndarray,
+                    batch_size: int,
+                    load: Callable,
+                    num_threads: int,
+                    prefetch: queue.Queue,
+                    stop: threading.Event) -> None:
+    """
+    producer thread: decode and preprocess batches with a thread pool and put them into the prefetch queue
+    """
+    try:
+        with ThreadPoolExecutor(num_threads) as executor:
+            for start in range(0, len(pending), batch_size):
+                if stop.is_set():
+                    return
+                indices = pending[start:start + batch_size]
+                tensors = list(executor.map(load, [image_paths[i] for i in indices]))
+                ok = np.array([x is not None for x in tensors], dtype=bool)
+                batch = np.concatenate([x for x in tensors if x is not None]) if ok.any() else None
+                prefetch.put((indices, ok, batch))
+        prefetch.put(None)
+    except Exception as e:
+        prefetch.put(e)
+
+
+@cached_artifact()
+def load_image_tensor(img_path: str,
+                      size: Optional[Tuple[int, int]],
+                      preprocess: Callable,
+                      read_flag: int) -> Optional[np.ndarray]:
+    """
+    read and preprocess an image, None if it cannot be read
+    """
+    img = cv2.imread(img_path, read_flag)
+    if img is None:
+        return None
+    return preprocess(img, size)
+
+
+def extract_features(image_paths: List[str],
+                     model: Union[str, object],
+                     output_dir: str,
+                     batch_size: int = 64,
+                     size: Optional[Tuple[int, int]] = (112, 112),
+                     preprocess: Callable = preprocess_2gray,
+                     read_flag: int = cv2.IMREAD_COLOR,
+                     num_decode_threads: int = 8,
+                     prefetch_batches: int = 4,
+                     cuda: bool = False,
+                     resume: bool = True,
+                     flush_every: int = 50,
+                     cache: Union[ArtifactCache, str, None] = None) -> np.ndarray:
+    """
+    extract features of an image folder listing into a memmapped feature store.
+    decoding runs on a thread pool and is prefetched through a bounded queue while the model runs batched inference,
+    so io, decode and compute overlap. the run can be interrupted and resumed with the same output_dir.
+
+    output_dir will contain:
+        features.npy  float32 (n, d), row i is the feature of image_paths[i], load with np.load(mmap_mode='r')
+        status.npy    uint8 (n,), 0 pending, 1 done, 2 failed to read
+        index.txt     image_paths, one per line
+
+    such as:
+        paths = list_files_mlpro("/data/images", 10, extensions=[".jpg"])
+        features = extract_features(paths, "model.onnx", "/data/features")
+        mean_sims = get_mean_cosine_similarity(paths, features)
+
+    :param image_paths:  list of image paths
+    :param model:  path to the ONNX model, or an InferenceSession
+    :param output_dir:  output directory of the feature store
+    :param batch_size:  inference batch size
+    :param size:  input size in (width, height) passed to preprocess
+    :param preprocess:  function (img, size) -> (1, c, h, w) float32 tensor
+    :param read_flag:  cv2.imread flag
+    :param num_decode_threads:  number of decode threads
+    :param prefetch_batches:  max number of decoded batches waiting for inference
+    :param cuda:  whether to use CUDA when model is a path
+    :param resume:  continue a previous run in output_dir
+    :param flush_every:  flush the memmaps every n batches
+    :param cache:  artifact cache or its directory for the preprocessed tensors, so that another model run on the
+                   same images skips decoding, see cached_artifact
+    :return:  features memmap of shape (n, d)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    image_paths = list(image_paths)
+    sess = get_onnx_session(model, cuda) if isinstance(model, str) else model
+    input_meta = sess.get_inputs()[0]
+    if isinstance(input_meta.shape[0], int) and input_meta.shape[0] != batch_size:
+        # the model has a static batch dimension
+        batch_size = input_meta.shape[0]
+
+    resumed = _load_index(output_dir, image_paths, resume)
+    status = _open_status(output_dir, len(image_paths), resumed)
+    pending = np.flatnonzero(status == PENDING)
+    logger.info(colorstr('green', 'Extracting features of {} images ({} done)'.format(
+        len(pending), len(image_paths) - len(pending))))
+
+    features = None
+    dim = sess.get_outputs()[0].shape[-1]
+    if isinstance(dim, int):
+        features = _open_features(output_dir, len(image_paths), dim, resumed)
+    elif resumed and os.path.exists(os.path.join(output_dir, FEATURES_NAME)):
+        features = np.load(os.path.join(output_dir, FEATURES_NAME), mmap_mode='r+')
+
+    load = functools.partial(load_image_tensor, size=size, preprocess=preprocess, read_flag=read_flag, cache=cache)
+
+    prefetch = queue.Queue(maxsize=prefetch_batches)
+    stop = threading.Event()
+    producer = threading.Thread(target=_decode_batches,
+                                args=(image_paths, pending, batch_size, load, num_decode_threads, prefetch, stop),
+                                daemon=True)
+    producer.start()
+
+    pbar = tqdm(total=len(pending))
+    try:
+        num_batches = 0
+        while True:
+            item = prefetch.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            indices, ok, batch = item
+            if batch is not None:
+                if len(batch) < batch_size and isinstance(input_meta.shape[0], int):
+                    # pad the last batch of a static batch model
+                    padded = np.zeros((batch_size,) + batch.shape[1:], dtype=batch.dtype)
+                    padded[:len(batch)] = batch
+                    output = sess.run(None, {input_meta.name: padded})[0][:len(batch)]
+                else:
+                    output = sess.run(None, {input_meta.name: batch})[0]
+                output = output.reshape(len(batch), -1)
+
+                if features is None:
+                    features = _open_features(output_dir, len(image_paths), output.shape[1], False)
+                features[indices[ok]] = output
+
+            status[indices[ok]] = DONE
+            status[indices[~ok]] = FAILED
+            for i in indices[~ok]:
+                logger.info(colorstr('red', 'Failed to read image: {}'.format(image_paths[i])))
+
+            num_batches += 1
+            if num_batches % flush_every == 0:
+                # features first, so a flushed status never points to unflushed features
+                if features is not None:
+                    features.flush()
+                status.flush()
+            pbar.update(len(indices))
+    finally:
+        stop.set()
+        # unblock the producer if it is waiting on a full queue
+        while producer.is_alive():
+            try:
+                prefetch.get_nowait()
+            except queue.Empty:
+                producer.join(0.1)
+        pbar.close()
+        if features is not None:
+            features.flush()
+        status.flush()
+
+    if features is None:
+        features = _open_features(output_dir, len(image_paths), 0, False)
+    return features
@@ -0,0 +1,339 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from wxtools.logger.utils import colorstr
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+
+class FrameSource:
+    """
+    base class of frame sources, frames are decoded by a background thread into a ring of preallocated buffers.
+
+    frames()/batches() yield views into the ring, a buffer is handed back to the decode thread when the next
+    frame/batch is requested, so no array is allocated per frame. copy a frame if it must outlive the iteration.
+
+    such as:
+        for idx, frame in VideoFrameSource("video.mp4", stride=5):
+            tensor = preprocess_2gray(frame, (112, 112))
+        for indices, batch in BinSequenceSource("/data/bins", img_size=(600, 800)).batches(64):
+            ...
+
+    subclasses implement:
+        _probe() -> (shape, dtype) of a frame
+        _open() / _close()
+        _read_into(buf) -> index of the frame read into buf, None when the source is exhausted
+        _skip(n) -> skip n frames without decoding them if possible
+    """
+
+    def __init__(self,
+                 stride: int = 1,
+                 start: int = 0,
+                 max_frames: Optional[int] = None,
+                 num_buffers: int = 4):
+        """
+        :param stride:  keep one frame every stride frames
+        :param start:  number of frames skipped at the beginning
+        :param max_frames:  maximum number of frames yielded, None for all
+        :param num_buffers:  number of buffers in the ring, i.e. frames or batches decoded ahead plus one in use
+        """
+        assert stride >= 1, "stride should be >= 1"
+        assert num_buffers >= 2, "num_buffers should be >= 2"
+        self.stride = stride
+        self.start = start
+        self.max_frames = max_frames
+        self.num_buffers = num_buffers
+
+    def _probe(self) -> Tuple[Tuple[int, ...], np.dtype]:
+        raise NotImplementedError
+
+    def _open(self) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+    def _read_into(self, buf: np.ndarray) -> Optional[int]:
+        raise NotImplementedError
+
+    def _skip(self, n: int) -> None:
+        for _ in range(n):
+            if self._scratch is None:
+                self._scratch = np.empty_like(self._ring[0, 0])
+            if self._read_into(self._scratch) is None:
+                return
+
+    def _produce(self, batch_size: int, free: queue.Queue, filled: queue.Queue, stop: threading.Event) -> None:
+        """
+        decode thread: fill free ring slots with batches of frames
+        """
+        try:
+            self._open()
+            self._skip(self.start)
+            count = 0
+            exhausted = False
+            while not exhausted and not stop.is_set():
+                try:
+                    slot = free.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                indices = []
+                while len(indices) < batch_size:
+                    if self.max_frames is not None and count >= self.max_frames:
+                        exhausted = True
+                        break
+                    idx = self._read_into(self._ring[slot, len(indices)])
+                    if idx is None:
+                        exhausted = True
+                        break
+                    indices.append(idx)
+                    count += 1
+                    if self.stride > 1:
+                        self._skip(self.stride - 1)
+                if indices:
+                    filled.put((slot, indices))
+            filled.put(None)
+        except Exception as e:
+            filled.put(e)
+        finally:
+            self._close()
+
+    def batches(self, batch_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        iterate over batches of frames, the last batch may be smaller
+        :param batch_size:  number of frames per batch
+        :return:  iterator of (frame indices (n,), frames (n, h, w[, c]) view into the ring)
+        """
+        shape, dtype = self._probe()
+        self._ring = np.empty((self.num_buffers, batch_size) + tuple(shape), dtype=dtype)
+        self._scratch = None
+
+        free, filled = queue.Queue(), queue.Queue()
+        for slot in range(self.num_buffers):
+            free.put(slot)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(batch_size, free, filled, stop), daemon=True)
+        producer.start()
+
+        in_use = None
+        try:
+            while True:
+                if in_use is not None:
+                    free.put(in_use)
+                    in_use = None
+                item = filled.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                in_use, indices = item
+                yield np.array(indices, dtype=np.int64), self._ring[in_use, :len(indices)]
+        finally:
+            stop.set()
+            producer.join()
+
+    def frames(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        iterate over single frames
+        :return:  iterator of (frame index, frame view into the ring)
+        """
+        for indices, batch in self.batches(1):
+            yield int(indices[0]), batch[0]
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        return self.frames()
+
+
+class VideoFrameSource(FrameSource):
+    """
+    frames of a video file or camera read with cv2.VideoCapture, skipped frames are grabbed but not decoded
+    """
+
+    def __init__(self, video: Union[str, int], **kwargs):
+        """
+        :param video:  video path or camera index
+        :param kwargs:  stride, start, max_frames, num_buffers, see FrameSource
+        """
+        super().__init__(**kwargs)
+        self.video = video
+        self._cap = None
+        self._pos = 0
+
+    def _probe(self):
+        cap = cv2.VideoCapture(self.video)
+        ok, frame = cap.read()
+        cap.release()
+        if not ok:
+            raise ValueError("unable to read video: {}".format(self.video))
+        return frame.shape, frame.dtype
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.video)
+        self._pos = 0
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _read_into(self, buf):
+        ok, frame = self._cap.read(buf)
+        if not ok:
+            return None
+        if not np.shares_memory(frame, buf):
+            # opencv reallocated the frame, e.g. the video changed resolution
+            if frame.shape != buf.shape:
+                raise ValueError("frame {} has shape {}, expected {}".format(self._pos, frame.shape, buf.shape))
+            np.copyto(buf, frame)
+        self._pos += 1
+        return self._pos - 1
+
+    def _skip(self, n):
+        for _ in range(n):
+            if not self._cap.grab():
+                return
+            self._pos += 1
+
+
+class ImageFolderSource(FrameSource):
+    """
+    frames of an image folder or a list of image paths, unreadable images are logged and skipped
+    """
+
+    def __init__(self,
+                 images: Union[str, List[str]],
+                 size: Optional[Tuple[int, int]] = None,
+                 read_flag: int = cv2.IMREAD_COLOR,
+                 **kwargs):
+        """
+        :param images:  image folder, sorted by name, or list of image paths
+        :param size:  resize frames to (width, height), None to require images of the same size as the first
+        :param read_flag:  cv2.imread flag
+        :param kwargs:  stride, start, max_frames, num_buffers, see FrameSource
+        """
+        super().__init__(**kwargs)
+        if isinstance(images, str):
+            images = sorted(os.path.join(images, x) for x in os.listdir(images)
+                            if x.lower().endswith(IMAGE_EXTENSIONS))
+        self.image_paths = list(images)
+        self.size = size
+        self.read_flag = read_flag
+        self._pos = 0
+
+    def _probe(self):
+        for path in self.image_paths:
+            img = cv2.imread(path, self.read_flag)
+            if img is None:
+                continue
+            if self.size is not None:
+                return (self.size[1], self.size[0]) + img.shape[2:], img.dtype
+            return img.shape, img.dtype
+        raise ValueError("no readable image")
+
+    def _open(self):
+        self._pos = 0
+
+    def _read_into(self, buf):
+        while self._pos < len(self.image_paths):
+            path = self.image_paths[self._pos]
+            self._pos += 1
+            img = cv2.imread(path, self.read_flag)
+            if img is None:
+                logger.info(colorstr('red', 'Failed to read image: {}'.format(path)))
+                continue
+            if self.size is not None:
+                cv2.resize(img, self.size, dst=buf)
+            elif img.shape != buf.shape:
+                logger.info(colorstr('red', 'Skip image of shape {}: {}'.format(img.shape, path)))
+                continue
+            else:
+                np.copyto(buf, img)
+            return self._pos - 1
+        return None
+
+    def _skip(self, n):
+        self._pos += n
+
+
+class BinSequenceSource(FrameSource):
+    """
+    raw frames, either one .bin file per frame (as bin2img) or a single file of consecutive frames,
+    read directly into the ring buffers with readinto
+    """
+
+    def __init__(self,
+                 images: Union[str, List[str]],
+                 img_size: Tuple[int, int] = (600, 800),
+                 channel: int = 1,
+                 **kwargs):
+        """
+        :param images:  folder of .bin files sorted by name, list of .bin paths, or a single file of frames
+        :param img_size:  frame size in (width, height)
+        :param channel:  channel of the frames
+        :param kwargs:  stride, start, max_frames, num_buffers, see FrameSource
+        """
+        super().__init__(**kwargs)
+        self.stream = None
+        if isinstance(images, str):
+            if os.path.isdir(images):
+                images = sorted(os.path.join(images, x) for x in os.listdir(images) if x.endswith('.bin'))
+            elif os.path.exists(images):
+                self.stream = images
+                images = []
+            else:
+                raise ValueError("image path does not exist")
+        self.image_paths = list(images)
+        self.shape = (img_size[1], img_size[0], channel)
+        self.frame_bytes = int(np.prod(self.shape))
+        self._file = None
+        self._pos = 0
+
+    def _probe(self):
+        return self.shape, np.dtype(np.uint8)
+
+    def _open(self):
+        self._pos = 0
+        if self.stream is not None:
+            self._file = open(self.stream, 'rb')
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_into(self, buf):
+        flat = buf.reshape(-1)
+        if self._file is not None:
+            if self._file.readinto(flat) < self.frame_bytes:
+                return None
+            self._pos += 1
+            return self._pos - 1
+
+        while self._pos < len(self.image_paths):
+            path = self.image_paths[self._pos]
+            self._pos += 1
+            with open(path, 'rb') as f:
+                num_bytes = f.readinto(flat)
+            if num_bytes < self.frame_bytes:
+                logger.info(colorstr('red', 'Skip truncated frame of {} bytes: {}'.format(num_bytes, path)))
+                continue
+            return self._pos - 1
+        return None
+
+    def _skip(self, n):
+        if self._file is not None:
+            self._file.seek(n * self.frame_bytes, os.SEEK_CUR)
+        self._pos += n
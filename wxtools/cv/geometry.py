@@ -0,0 +1,176 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+def _as_batch(matrices: np.ndarray) -> Tuple[np.ndarray, bool]:
+    matrices = np.asarray(matrices, dtype=np.float64)
+    assert matrices.shape[-2:] == (2, 3), "matrices should have shape (2, 3) or (N, 2, 3), got {}".format(
+        matrices.shape)
+    return (matrices[np.newaxis], True) if matrices.ndim == 2 else (matrices, False)
+
+
+def rotation_matrices(centers: np.ndarray,
+                      angles: Union[np.ndarray, float],
+                      scales: Union[np.ndarray, float] = 1.0) -> np.ndarray:
+    """
+    batched cv2.getRotationMatrix2D
+    :param centers:  rotation centers, (N, 2) x, y
+    :param angles:  rotation angles in degrees, (N,) or a scalar, positive values rotate counter-clockwise
+    :param scales:  isotropic scales, (N,) or a scalar
+    :return:  (N, 2, 3) float64 affine matrices
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    theta = np.deg2rad(np.broadcast_to(np.asarray(angles, dtype=np.float64), len(centers)))
+    scales = np.broadcast_to(np.asarray(scales, dtype=np.float64), len(centers))
+    alpha, beta = scales * np.cos(theta), scales * np.sin(theta)
+    cx, cy = centers[:, 0], centers[:, 1]
+
+    matrices = np.empty((len(centers), 2, 3), dtype=np.float64)
+    matrices[:, 0, 0], matrices[:, 0, 1], matrices[:, 0, 2] = alpha, beta, (1 - alpha) * cx - beta * cy
+    matrices[:, 1, 0], matrices[:, 1, 1], matrices[:, 1, 2] = -beta, alpha, beta * cx + (1 - alpha) * cy
+    return matrices
+
+
+def invert_affine(matrices: np.ndarray) -> np.ndarray:
+    """
+    batched cv2.invertAffineTransform
+    :param matrices:  (2, 3) or (N, 2, 3) affine matrices
+    :return:  inverse matrices with the same shape
+    """
+    batch, single = _as_batch(matrices)
+    inverse = np.empty_like(batch)
+    inverse[:, :, :2] = np.linalg.inv(batch[:, :, :2])
+    inverse[:, :, 2] = -np.matmul(inverse[:, :, :2], batch[:, :, 2, np.newaxis])[:, :, 0]
+    return inverse[0] if single else inverse
+
+
+def transform_points(points: np.ndarray,
+                     matrices: np.ndarray,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    apply affine matrices to batches of points with one matmul, instead of one np.dot per point as rotate_point
+    such as:
+        # rotate the 68 landmarks of N faces around their box centers
+        matrices = rotation_matrices(centers, angles)
+        landmarks = transform_points(landmarks, matrices)
+    :param points:  (N, K, 2) points of N objects, or (K, 2) points transformed by every matrix
+    :param matrices:  (N, 2, 3) matrices, or a (2, 3) matrix applied to every object
+    :param out:  float output buffer of the result shape, None to allocate
+    :return:  transformed float points, (K, 2) when both inputs are single and (N, K, 2) otherwise
+    """
+    batch, single = _as_batch(matrices)
+    points = np.asarray(points)
+    assert points.shape[-1] == 2 and points.ndim in (2, 3), \
+        "points should have shape (K, 2) or (N, K, 2), got {}".format(points.shape)
+    # x' = x @ A^T + t for all objects at once
+    if single:
+        result = np.matmul(points, batch[0, :, :2].T, out=out)
+        result += batch[0, :, 2]
+    else:
+        result = np.matmul(points, batch[:, :, :2].transpose(0, 2, 1), out=out)
+        result += batch[:, np.newaxis, :, 2]
+    return result
+
+
+def estimate_similarity(src: np.ndarray,
+                        dst: np.ndarray,
+                        estimate_scale: bool = True) -> np.ndarray:
+    """
+    batched least squares similarity transform (Umeyama), the equivalent of cv2.estimateAffinePartial2D
+    without RANSAC for every object at once
+    :param src:  (N, K, 2) source points, such as detected landmarks
+    :param dst:  (K, 2) target points shared by all objects, such as an alignment template, or (N, K, 2)
+    :param estimate_scale:  False for a rigid transform
+    :return:  (N, 2, 3) float64 matrices mapping src to dst
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    assert src.ndim == 3 and src.shape[-1] == 2, "src should have shape (N, K, 2), got {}".format(src.shape)
+    assert dst.shape[-2:] == src.shape[-2:], "dst should have shape {} or {}, got {}".format(
+        src.shape[1:], src.shape, dst.shape)
+    num_points = src.shape[1]
+
+    src_mean = src.mean(axis=1, keepdims=True)
+    dst_mean = dst.mean(axis=-2, keepdims=True)
+    src_centered = src - src_mean
+    dst_centered = dst - dst_mean
+
+    # (N, 2, 2) covariance between dst and src, its SVD gives the rotation
+    cov = np.matmul(np.swapaxes(dst_centered, -1, -2), src_centered) / num_points
+    u, s, vt = np.linalg.svd(cov)
+    # reflections are turned into rotations by flipping the smallest singular direction
+    d = np.ones((len(src), 2))
+    d[np.linalg.det(u) * np.linalg.det(vt) < 0, 1] = -1
+    rotation = np.matmul(u * d[:, np.newaxis, :], vt)
+
+    if estimate_scale:
+        src_var = np.square(src_centered).sum(axis=(1, 2)) / num_points
+        scale = (s * d).sum(axis=1) / np.maximum(src_var, np.finfo(np.float64).tiny)
+    else:
+        scale = np.ones(len(src))
+
+    matrices = np.empty((len(src), 2, 3), dtype=np.float64)
+    matrices[:, :, :2] = rotation * scale[:, np.newaxis, np.newaxis]
+    matrices[:, :, 2] = np.broadcast_to(dst_mean, src_mean.shape)[:, 0] - \
+        np.matmul(matrices[:, :, :2], src_mean.transpose(0, 2, 1))[:, :, 0]
+    return matrices
+
+
+def warp_affine_batch(images: Union[np.ndarray, Sequence[np.ndarray]],
+                      matrices: np.ndarray,
+                      size: Tuple[int, int],
+                      out: Optional[np.ndarray] = None,
+                      flags: int = cv2.INTER_LINEAR,
+                      border_mode: int = cv2.BORDER_CONSTANT,
+                      border_value: Union[float, Tuple[float, ...]] = 0,
+                      num_threads: int = 8) -> np.ndarray:
+    """
+    warp each image with its own matrix into one preallocated batch, cv2.warpAffine writes into out directly
+    such as:
+        out = np.empty((len(faces), 112, 112, 3), np.uint8)
+        for frame, faces in frames:
+            warp_affine_batch([frame] * len(faces), matrices, (112, 112), out=out[:len(faces)])
+    :param images:  (N, H, W[, C]) array, or N images of the same channels and dtype and any size
+    :param matrices:  (N, 2, 3) matrices mapping image coordinates to output coordinates
+    :param size:  output size (w, h)
+    :param out:  (N, h, w[, C]) output buffer with the dtype of the images, None to allocate
+    :param flags:  cv2 interpolation flags
+    :param border_mode:  cv2 border mode
+    :param border_value:  value of constant borders
+    :param num_threads:  number of warping threads, 1 to warp in the calling thread
+    :return:  (N, h, w[, C]) warped images
+    """
+    batch, _ = _as_batch(matrices)
+    assert len(images) == len(batch), "got {} images and {} matrices".format(len(images), len(batch))
+    w, h = size
+    if out is None:
+        out = np.empty((len(batch), h, w) + images[0].shape[2:], dtype=images[0].dtype)
+    assert out.shape[:3] == (len(batch), h, w) and out.flags.c_contiguous, \
+        "out should be a contiguous array of shape {}".format((len(batch), h, w) + images[0].shape[2:])
+
+    def warp(i: int) -> None:
+        dst = out[i]
+        result = cv2.warpAffine(images[i], batch[i], (w, h), dst=dst, flags=flags, borderMode=border_mode,
+                                borderValue=border_value)
+        if result is not dst and not np.shares_memory(result, dst):
+            # single channel images come back as (h, w) when out has a channel axis
+            dst[...] = result.reshape(dst.shape)
+
+    num_threads = min(num_threads, len(batch), os.cpu_count() or 1)
+    if num_threads <= 1:
+        for i in range(len(batch)):
+            warp(i)
+    else:
+        # cv2 releases the GIL, so small warps run in parallel instead of paying the per-call overhead in turn
+        with ThreadPoolExecutor(num_threads) as executor:
+            list(executor.map(warp, range(len(batch))))
+    return out
@@ -14,6 +14,9 @@ from typing import Union, List
 import os
 from PIL import Image
 
+from wxtools.cv.buffer_pool import BufferPool
+from wxtools.utils.artifact_cache import cached_artifact
+
 
 def convert_jp2_to_image(img_in: Union[str, List[str]], output: str, ext: str = 'jpg') -> None:
     """
@@ -58,11 +61,19 @@ def convert_jp2_to_image(img_in: Union[str, List[str]], output: str, ext: str =
         convert_file(img_in)
 
 
+def _draw_target(img_draw: np.ndarray, dst: Optional[np.ndarray]) -> np.ndarray:
+    if dst is None or dst is img_draw:
+        return img_draw
+    np.copyto(dst, img_draw)
+    return dst
+
+
 def draw_bbox(img_draw: np.ndarray,
               bbox: Union[List[int], Tuple[int, int, int, int]],
               color: Tuple[int, int, int] = (0, 255, 255),
               thickness: int = 2,
-              xywh: bool = False) -> np.ndarray:
+              xywh: bool = False,
+              dst: Optional[np.ndarray] = None) -> np.ndarray:
     """
     draw bbox on image
     :param img_draw:  image to draw
@@ -70,8 +81,10 @@ def draw_bbox(img_draw: np.ndarray,
     :param color:  color of bbox
     :param thickness:  thickness of bbox
     :param xywh:  whether bbox is xywh format
+    :param dst:  buffer to draw on instead of img_draw, img_draw is copied into it and left unchanged
     :return:
     """
+    img_draw = _draw_target(img_draw, dst)
     if xywh:
         bbox[2] += bbox[0]
         bbox[3] += bbox[1]
@@ -85,7 +98,8 @@ def draw_text(img_draw: np.ndarray,
               text: str, pos: Tuple[int, int],
               color: Tuple[int, int, int] = (0, 255, 255),
               thickness: int = 2,
-              font_scale: float = 1) -> np.ndarray:
+              font_scale: float = 1,
+              dst: Optional[np.ndarray] = None) -> np.ndarray:
     """
     draw text on image
     :param img_draw:  image to draw
@@ -94,8 +108,10 @@ def draw_text(img_draw: np.ndarray,
     :param color:   color of text
     :param thickness:   thickness of text
     :param font_scale:  font scale of text
+    :param dst:  buffer to draw on instead of img_draw, img_draw is copied into it and left unchanged
     :return:  image with text
     """
+    img_draw = _draw_target(img_draw, dst)
     cv2.putText(img_draw, text, pos, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
     return img_draw
 
@@ -104,7 +120,8 @@ def draw_landmarks(img_draw: np.ndarray,
                    landmarks: List[Tuple[int, int]],
                    color: Tuple[int, int, int] = (0, 255, 255),
                    thickness: int = 2,
-                   draw_num: bool = False) -> np.ndarray:
+                   draw_num: bool = False,
+                   dst: Optional[np.ndarray] = None) -> np.ndarray:
     """
     draw landmarks on image
     :param img_draw:  image to draw
@@ -112,8 +129,10 @@ def draw_landmarks(img_draw: np.ndarray,
     :param color:  color of landmarks
     :param thickness:  thickness of landmarks
     :param draw_num:  whether draw number of landmarks
+    :param dst:  buffer to draw on instead of img_draw, img_draw is copied into it and left unchanged
     :return:  image with landmarks
     """
+    img_draw = _draw_target(img_draw, dst)
     for idx, landmark in enumerate(landmarks):
         cv2.circle(img_draw, (int(landmark[0]), int(landmark[1])), 2, color, thickness)
         if draw_num:
@@ -122,25 +141,62 @@ def draw_landmarks(img_draw: np.ndarray,
 
 
 def preprocess_2gray(img: np.ndarray,
-                     size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+                     size: Optional[Tuple[int, int]] = None,
+                     out: Optional[np.ndarray] = None,
+                     pool: Optional[BufferPool] = None) -> np.ndarray:
     """
     preprocess image from size (h, w, 3) to (1, 1, h, w)
     :param size: output size
     :param img: cv2 image
+    :param out: float32 output buffer of shape (1, 1, h, w), e.g. a slice of a batch, None to allocate
+    :param pool: buffer pool for the resized and gray intermediates, None to allocate them
     :return: preprocessed image with size (1, 1, h, w)
     """
-    if size is not None:
-        img = cv2.resize(img, size)
+    if out is None and pool is None:
+        if size is not None:
+            img = cv2.resize(img, size)
 
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-    if img.ndim == 2:
-        img = img[:, :, np.newaxis]
-    img = (img.transpose((2, 0, 1)) - 127.5) * 0.0078125
-    img = img.astype(np.float32)
-    img = img[np.newaxis, ...]
+        if img.ndim == 2:
+            img = img[:, :, np.newaxis]
+        img = (img.transpose((2, 0, 1)) - 127.5) * 0.0078125
+        img = img.astype(np.float32)
+        img = img[np.newaxis, ...]
 
-    return img
+        return img
+
+    # same values as above, (x - 127.5) * 2 ** -7 is exact in float32 for uint8 x
+    if size is not None:
+        resized = pool.get('preprocess_2gray.resize', (size[1], size[0]) + img.shape[2:], img.dtype) \
+            if pool is not None else None
+        img = cv2.resize(img, size, dst=resized)
+    gray = pool.get('preprocess_2gray.gray', img.shape[:2], img.dtype) if pool is not None else None
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+
+    if out is None:
+        out = pool.get('preprocess_2gray.out', (1, 1) + gray.shape, np.float32)
+    np.subtract(gray, 127.5, out=out[0, 0], dtype=np.float32)
+    np.multiply(out, 0.0078125, out=out)
+    return out
+
+
+@cached_artifact()
+def read_thumbnail(img_path: str,
+                   size: Tuple[int, int] = (64, 64),
+                   read_flag: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """
+    read an image and resize it to a thumbnail.
+    pass cache=ArtifactCache or its directory to reuse thumbnails of unchanged files, see cached_artifact
+    :param img_path:  image path
+    :param size:  thumbnail size in (width, height)
+    :param read_flag:  cv2.imread flag
+    :return:  thumbnail, or None if the image cannot be read
+    """
+    img = cv2.imread(img_path, read_flag)
+    if img is None:
+        return None
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
 
 
 def bbox_xywh2xyxy(bbox_xywh: np.ndarray) -> np.ndarray:
@@ -190,9 +246,120 @@ def load_onnx(model_path, cuda=False):
     return sess
 
 
+# per process session cache of get_onnx_session, keyed by (model path, providers, options)
+_ONNX_SESSIONS = {}
+
+# numpy dtypes of the onnxruntime input types, for the warm-up inputs
+_ONNX_DTYPES = {
+    'tensor(float)': np.float32,
+    'tensor(float16)': np.float16,
+    'tensor(double)': np.float64,
+    'tensor(uint8)': np.uint8,
+    'tensor(int8)': np.int8,
+    'tensor(int32)': np.int32,
+    'tensor(int64)': np.int64,
+    'tensor(bool)': np.bool_,
+}
+
+
+def _session_options(optimized_model_path: Optional[str],
+                     intra_op_num_threads: Optional[int]) -> Tuple[ort.SessionOptions, Optional[str]]:
+    """
+    :return:  (session options, model path to load instead of the original one or None)
+    """
+    options = ort.SessionOptions()
+    if intra_op_num_threads is not None:
+        options.intra_op_num_threads = intra_op_num_threads
+    if optimized_model_path is None:
+        return options, None
+    if os.path.exists(optimized_model_path):
+        # the graph was optimized when the file was written, skip the optimization passes
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return options, optimized_model_path
+    # every worker of a pool may write it at the same time, write to a private file and rename
+    options.optimized_model_filepath = '{}.{}.tmp'.format(optimized_model_path, os.getpid())
+    return options, None
+
+
+def warmup_onnx_session(sess: ort.InferenceSession, shapes: List[Tuple[int, ...]]) -> None:
+    """
+    run the session once on zeros of each shape, so that memory allocation and kernel selection for the
+    representative input shapes are done before the first real batch
+    :param sess:  ONNX model session
+    :param shapes:  list of shapes of the first input, such as [(64, 1, 112, 112)]
+    """
+    input_meta = sess.get_inputs()[0]
+    if input_meta.type not in _ONNX_DTYPES:
+        raise ValueError('Unsupported input type for warm-up: {}'.format(input_meta.type))
+    for shape in shapes:
+        sess.run(None, {input_meta.name: np.zeros(shape, dtype=_ONNX_DTYPES[input_meta.type])})
+
+
+def get_onnx_session(model_path: str,
+                     cuda: bool = False,
+                     providers: Optional[List[str]] = None,
+                     optimized_model_path: Optional[str] = None,
+                     intra_op_num_threads: Optional[int] = None,
+                     warmup_shapes: Optional[List[Tuple[int, ...]]] = None) -> ort.InferenceSession:
+    """
+    cached version of load_onnx, a session is created once per process for each model path, providers and options.
+    use it inside run_mlpro workers together with init_onnx_worker, so that a worker loads the model once instead of
+    once per task.
+    such as:
+        options = dict(optimized_model_path="model.opt.onnx", intra_op_num_threads=1)
+
+        def worker(batch):
+            return infer_onnx_model(get_onnx_session("model.onnx", **options), batch)
+
+        run_mlpro(worker, batches, 8, initializer=init_onnx_worker,
+                  initargs=("model.onnx", dict(options, warmup_shapes=[(64, 1, 112, 112)])))
+    :param model_path:  path to the ONNX model
+    :param cuda:  whether to use CUDA, ignored if providers is given
+    :param providers:  execution providers, None for CUDA or CPU depending on cuda
+    :param optimized_model_path:  path of the optimized model. it is written by the first session and loaded with
+                                  graph optimizations disabled afterwards. it is specific to the providers and
+                                  the hardware, delete it when the model, the providers or the machine change
+    :param intra_op_num_threads:  number of threads per session, use a small value with many worker processes
+    :param warmup_shapes:  input shapes to run once when the session is created, see warmup_onnx_session
+    :return:  ONNX model session
+    """
+    if providers is None:
+        providers = ['CUDAExecutionProvider'] if cuda else ['CPUExecutionProvider']
+    key = (os.path.abspath(model_path), tuple(providers), optimized_model_path, intra_op_num_threads)
+    sess = _ONNX_SESSIONS.get(key)
+    if sess is not None:
+        return sess
+
+    options, load_path = _session_options(optimized_model_path, intra_op_num_threads)
+    sess = ort.InferenceSession(load_path or model_path, sess_options=options, providers=providers)
+    if options.optimized_model_filepath and os.path.exists(options.optimized_model_filepath):
+        os.replace(options.optimized_model_filepath, optimized_model_path)
+    if warmup_shapes:
+        warmup_onnx_session(sess, warmup_shapes)
+    _ONNX_SESSIONS[key] = sess
+    return sess
+
+
+def init_onnx_worker(model_path: str, session_kwargs: Optional[dict] = None) -> None:
+    """
+    pool initializer creating the session of get_onnx_session when a worker process starts, see get_onnx_session
+    :param model_path:  path to the ONNX model
+    :param session_kwargs:  keyword arguments of get_onnx_session, the worker must pass the same ones except
+                            warmup_shapes to get the cached session
+    """
+    get_onnx_session(model_path, **(session_kwargs or {}))
+
+
+def clear_onnx_sessions() -> None:
+    """
+    drop the sessions cached by get_onnx_session in this process
+    """
+    _ONNX_SESSIONS.clear()
+
+
 def rotate_point(pt, rot_mat):
     """
-    rotate x,y points by give rotate matrix
+    rotate x,y points by give rotate matrix, use wxtools.cv.geometry.transform_points for many points
     :param pt:
     :param rot_mat:
     :return:
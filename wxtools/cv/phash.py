@@ -0,0 +1,281 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from functools import lru_cache
+from itertools import combinations
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from wxtools.utils.mlpro_utils import run_mlpro
+
+HASH_METHODS = ('phash', 'dhash')
+
+# (i, j, distance) records returned by find_near_duplicates
+DUPLICATE_DTYPE = np.dtype([('i', np.int64), ('j', np.int64), ('distance', np.uint8)])
+
+_POPCOUNT_LUT = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n: int) -> np.ndarray:
+    """
+    orthonormal DCT-II matrix, so that dct(x) = D @ x
+    :param n:  size
+    :return:  float32 matrix of shape (n, n)
+    """
+    k = np.arange(n)[:, np.newaxis]
+    i = np.arange(n)[np.newaxis, :]
+    mat = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    mat[0] /= np.sqrt(2.0)
+    return mat.astype(np.float32)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    pack (n, 64) boolean bits into a uint64 array, first bit is the most significant one
+    :param bits:  boolean array of shape (n, 64)
+    :return:  uint64 array of shape (n,)
+    """
+    packed = np.packbits(bits.reshape(len(bits), 64), axis=1)
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    """
+    count set bits of a uint64 array
+    :param x:  uint64 array
+    :return:  uint8 array with the same shape
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x).astype(np.uint8)
+    bytes_view = np.ascontiguousarray(x).reshape(-1).view(np.uint8)
+    return _POPCOUNT_LUT[bytes_view].reshape(x.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def hamming_distance(hash1: np.ndarray, hash2: np.ndarray) -> np.ndarray:
+    """
+    hamming distance between packed 64 bit hashes, broadcasting like numpy
+    :param hash1:  uint64 hash or array of hashes
+    :param hash2:  uint64 hash or array of hashes
+    :return:  uint8 distances
+    """
+    return popcount(np.bitwise_xor(np.asarray(hash1, dtype=np.uint64), np.asarray(hash2, dtype=np.uint64)))
+
+
+def phash(images: np.ndarray) -> np.ndarray:
+    """
+    perceptual hash of a batch of images, the low 8x8 DCT coefficients are compared with their median
+    :param images:  grayscale images of shape (n, 32, 32)
+    :return:  uint64 array of shape (n,)
+    """
+    images = np.asarray(images, dtype=np.float32)
+    assert images.shape[1:] == (32, 32), "phash expects images of shape (n, 32, 32)"
+    dct = _dct_matrix(32)[:8]
+    # (8, 32) @ (n, 32, 32) @ (32, 8) -> (n, 8, 8)
+    low = np.matmul(np.matmul(dct, images), dct.T).reshape(len(images), 64)
+    median = np.median(low, axis=1, keepdims=True)
+    return _pack_bits(low > median)
+
+
+def dhash(images: np.ndarray) -> np.ndarray:
+    """
+    difference hash of a batch of images, each pixel is compared with its right neighbour
+    :param images:  grayscale images of shape (n, 8, 9)
+    :return:  uint64 array of shape (n,)
+    """
+    images = np.asarray(images, dtype=np.int16)
+    assert images.shape[1:] == (8, 9), "dhash expects images of shape (n, 8, 9)"
+    return _pack_bits(images[:, :, 1:] > images[:, :, :-1])
+
+
+def _hash_size(method: str) -> Tuple[int, int]:
+    """
+    downscaled image size in (width, height) of a hash method
+    """
+    if method == 'phash':
+        return 32, 32
+    elif method == 'dhash':
+        return 9, 8
+    raise ValueError('method should be one of {}'.format(HASH_METHODS))
+
+
+def _downscale(img: np.ndarray, size: Tuple[int, int], dst: np.ndarray) -> None:
+    """
+    gray conversion and area downscaling shared by hash_images and hash_worker, so both give the same hashes
+    """
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    cv2.resize(img, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+def hash_images(images: List[np.ndarray], method: str = 'phash') -> np.ndarray:
+    """
+    hash a list of images
+    :param images:  list of cv2 images, BGR or grayscale, any size
+    :param method:  'phash' or 'dhash'
+    :return:  uint64 array of shape (n,)
+    """
+    size = _hash_size(method)
+    small = np.empty((len(images), size[1], size[0]), dtype=np.uint8)
+    for idx, img in enumerate(images):
+        _downscale(img, size, small[idx])
+
+    return phash(small) if method == 'phash' else dhash(small)
+
+
+def read_for_hash(path: str, size: Tuple[int, int], reduced: bool = True) -> Optional[np.ndarray]:
+    """
+    :param path:  image path
+    :param size:  hash size (width, height)
+    :param reduced:  decode jpegs at 1/4 scale when the image is at least 4x the hash size, which skips most of the
+                     idct work. the hashes can then differ by a few bits from hash_images of the full image
+    :return:  BGR image, None if it cannot be read
+    """
+    if reduced:
+        img = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_4)
+        if img is None or (img.shape[1] >= size[0] and img.shape[0] >= size[1]):
+            return img
+    # small images are decoded at full size, they would be upscaled otherwise
+    return cv2.imread(path, cv2.IMREAD_COLOR)
+
+
+def hash_worker(arg):
+    chunk_idx, paths, method, reduced = arg
+    size = _hash_size(method)
+    small = np.zeros((len(paths), size[1], size[0]), dtype=np.uint8)
+    valid = np.zeros(len(paths), dtype=bool)
+    for idx, path in enumerate(paths):
+        img = read_for_hash(path, size, reduced)
+        if img is None:
+            continue
+        _downscale(img, size, small[idx])
+        valid[idx] = True
+
+    hashes = phash(small) if method == 'phash' else dhash(small)
+    return chunk_idx, hashes, valid
+
+
+def compute_image_hashes(image_paths: List[str],
+                         method: str = 'phash',
+                         process_num: int = 10,
+                         batch_size: int = 256,
+                         reduced: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    decode and hash images with multiprocessing, hashing is vectorized over each batch.
+    images that cannot be read get hash 0 and valid False, filter them before searching for duplicates
+    :param image_paths:  list of image paths
+    :param method:  'phash' or 'dhash'
+    :param process_num:  number of processes
+    :param batch_size:  number of images per task
+    :param reduced:  reduced jpeg decoding of large images, see read_for_hash. False gives exactly
+                     hash_images([cv2.imread(x) for x in image_paths])
+    :return:  (uint64 hashes of shape (n,), boolean mask of images that were decoded)
+    """
+    _hash_size(method)
+    args = [(idx, image_paths[start:start + batch_size], method, reduced)
+            for idx, start in enumerate(range(0, len(image_paths), batch_size))]
+
+    hashes = np.zeros(len(image_paths), dtype=np.uint64)
+    valid = np.zeros(len(image_paths), dtype=bool)
+    for chunk_idx, chunk_hashes, chunk_valid in run_mlpro(hash_worker, args, process_num):
+        start = chunk_idx * batch_size
+        hashes[start:start + len(chunk_hashes)] = chunk_hashes
+        valid[start:start + len(chunk_valid)] = chunk_valid
+
+    return hashes, valid
+
+
+def _flip_masks(bits: int, radius: int) -> np.ndarray:
+    """
+    all masks of `bits` bits with at most `radius` bits set
+    """
+    masks = [0]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(bits), r):
+            masks.append(sum(1 << p for p in positions))
+    return np.array(masks, dtype=np.uint64)
+
+
+def find_near_duplicates(hashes: np.ndarray,
+                         max_distance: int = 4,
+                         queries: Optional[np.ndarray] = None,
+                         num_chunks: int = 4,
+                         block_size: int = 65536) -> np.ndarray:
+    """
+    find pairs of hashes within a hamming distance with multi-index hashing.
+    the 64 bits are split into num_chunks chunks, two hashes within max_distance must have at least one chunk
+    within max_distance // num_chunks, so only hashes sharing a (nearly) equal chunk are compared.
+    such as:
+        hashes, valid = compute_image_hashes(paths)
+        # unreadable images all have hash 0, they would match each other
+        paths, hashes = [x for x, ok in zip(paths, valid) if ok], hashes[valid]
+        pairs = find_near_duplicates(hashes, max_distance=4)
+        for i, j, distance in pairs: paths[i] is a near duplicate of paths[j]
+
+    :param hashes:  uint64 hashes of shape (n,)
+    :param max_distance:  max hamming distance of a pair
+    :param queries:  optional uint64 hashes of shape (m,), if given pairs are (query index, hash index),
+                     otherwise pairs are (i, j) with i < j within hashes
+    :param num_chunks:  number of chunks, must divide 64
+    :param block_size:  number of queries processed at once, bounds memory
+    :return:  structured array with fields (i, j, distance)
+    """
+    assert 64 % num_chunks == 0, "num_chunks should divide 64"
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    self_join = queries is None
+    queries = hashes if self_join else np.asarray(queries, dtype=np.uint64)
+
+    bits = 64 // num_chunks
+    chunk_mask = np.uint64((1 << bits) - 1)
+    flips = _flip_masks(bits, max_distance // num_chunks)
+
+    found = []
+    for chunk in range(num_chunks):
+        shift = np.uint64(chunk * bits)
+        keys = (hashes >> shift) & chunk_mask
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        query_keys = (queries >> shift) & chunk_mask
+
+        for start in range(0, len(queries), block_size):
+            block_keys = query_keys[start:start + block_size]
+            block_idx = np.arange(start, start + len(block_keys))
+            for flip in flips:
+                target = block_keys ^ flip
+                lo = np.searchsorted(sorted_keys, target, side='left')
+                counts = np.searchsorted(sorted_keys, target, side='right') - lo
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+
+                # expand every query to all hashes of its bucket
+                qi = np.repeat(block_idx, counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                cj = order[np.repeat(lo, counts) + offsets]
+
+                if self_join:
+                    keep = qi < cj
+                    qi, cj = qi[keep], cj[keep]
+                distance = hamming_distance(queries[qi], hashes[cj])
+                keep = distance <= max_distance
+                found.append((qi[keep], cj[keep], distance[keep]))
+
+    if not found:
+        return np.zeros(0, dtype=DUPLICATE_DTYPE)
+
+    qi = np.concatenate([x[0] for x in found])
+    cj = np.concatenate([x[1] for x in found])
+    distance = np.concatenate([x[2] for x in found])
+
+    # a pair can be found through several chunks
+    _, first = np.unique(qi * len(hashes) + cj, return_index=True)
+    output = np.zeros(len(first), dtype=DUPLICATE_DTYPE)
+    output['i'] = qi[first]
+    output['j'] = cj[first]
+    output['distance'] = distance[first]
+    return output
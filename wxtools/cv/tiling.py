@@ -0,0 +1,194 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from wxtools.cv.img_quality import contrast_boost
+from wxtools.utils.artifact_cache import cached_artifact
+
+# halo needed for an exact tiled contrast_boost:
+#   mode 1: 5x5 Gaussian, radius 2
+#   mode 2: 3x3 median followed by a 3x3 Laplacian, radius 1 + 1
+CONTRAST_BOOST_HALO = 2
+
+
+def _open_image(img: Union[np.ndarray, str]) -> np.ndarray:
+    """
+    a .npy path is memory mapped, so only the tiles being processed are read
+    """
+    if isinstance(img, str):
+        return np.load(img, mmap_mode='r')
+    if img is None:
+        raise ValueError("Image not found or unable to read.")
+    return img
+
+
+def _open_output(out: Union[np.ndarray, str, None], shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+    assert out.shape == shape, "out should have shape {}".format(shape)
+    return out
+
+
+def iter_tiles(shape: Tuple[int, ...],
+               tile_size: int = 2048,
+               halo: int = 0) -> Iterator[Tuple[slice, slice, slice, slice]]:
+    """
+    split an image into tiles
+    :param shape:  image shape, (h, w) or (h, w, c)
+    :param tile_size:  tile height and width, without the halo
+    :param halo:  number of extra pixels read around each tile, clipped at the image border
+    :return:  iterator of (core rows, core cols, halo rows, halo cols) slices of the image
+    """
+    h, w = shape[:2]
+    for y in range(0, h, tile_size):
+        for x in range(0, w, tile_size):
+            y1, x1 = min(y + tile_size, h), min(x + tile_size, w)
+            yield slice(y, y1), slice(x, x1), slice(max(y - halo, 0), min(y1 + halo, h)), \
+                slice(max(x - halo, 0), min(x1 + halo, w))
+
+
+def process_tiled(img: Union[np.ndarray, str],
+                  func: Callable[[np.ndarray], np.ndarray],
+                  halo: int = 0,
+                  tile_size: int = 2048,
+                  out: Union[np.ndarray, str, None] = None,
+                  dtype: Optional[np.dtype] = None,
+                  num_threads: int = 8) -> np.ndarray:
+    """
+    apply a local filter to an image tile by tile, in parallel with threads, and stitch the results.
+    each tile is read with a halo of extra pixels, so the result is exact for filters with a radius up to halo,
+    at the image border the tile border is the image border and opencv applies its usual border handling.
+    peak memory is about num_threads tiles instead of several copies of the image.
+    :param img:  image of shape (h, w) or (h, w, c), or the path of a .npy file which is memory mapped
+    :param func:  function from an image to a filtered image of the same height and width
+    :param halo:  filter radius
+    :param tile_size:  tile height and width
+    :param out:  output array, or the path of a .npy file to write a memmap, None to allocate
+    :param dtype:  output dtype, None for the image dtype
+    :param num_threads:  number of threads
+    :return:  filtered image
+    """
+    img = _open_image(img)
+    output = _open_output(out, img.shape, np.dtype(dtype or img.dtype))
+
+    def run(tile):
+        rows, cols, halo_rows, halo_cols = tile
+        result = func(np.ascontiguousarray(img[halo_rows, halo_cols]))
+        top, left = rows.start - halo_rows.start, cols.start - halo_cols.start
+        output[rows, cols] = result[top:top + rows.stop - rows.start, left:left + cols.stop - cols.start]
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        for _ in executor.map(run, iter_tiles(img.shape, tile_size, halo)):
+            pass
+
+    if isinstance(output, np.memmap):
+        output.flush()
+    return output
+
+
+def contrast_boost_tiled(img: Union[np.ndarray, str],
+                         mode: int,
+                         tile_size: int = 2048,
+                         out: Union[np.ndarray, str, None] = None,
+                         num_threads: int = 8) -> np.ndarray:
+    """
+    contrast_boost for very large images, same result as contrast_boost
+    such as:
+        contrast_boost_tiled("scan.npy", 1, out="scan_boosted.npy")
+    :param img:  image, or the path of a .npy file
+    :param mode:  1 or 2, see contrast_boost
+    :param tile_size:  tile height and width
+    :param out:  output array, or the path of a .npy file to write a memmap, None to allocate
+    :param num_threads:  number of threads
+    :return:  contrast-enhanced image
+    """
+    if mode not in (1, 2):
+        raise ValueError('Invalid mode')
+    img = _open_image(img)
+    dtype = np.uint8 if mode == 1 else img.dtype
+    return process_tiled(img, lambda tile: contrast_boost(tile, mode), CONTRAST_BOOST_HALO, tile_size, out, dtype,
+                         num_threads)
+
+
+def zone_fractions_tiled(img: Union[np.ndarray, str],
+                         bright_lower: int = 240,
+                         dark_lower: int = 40,
+                         higher: int = 255,
+                         tile_size: int = 2048,
+                         num_threads: int = 8) -> Dict[str, float]:
+    """
+    bright and dark area fractions of a very large image, aggregated from per tile pixel counts
+    :param img:  image, or the path of a .npy file
+    :param bright_lower:  lower threshold of bright pixels, see is_bright_zone_large
+    :param dark_lower:  lower threshold of dark pixels, see is_dark_zone_large
+    :param higher:  higher threshold of the binary threshold
+    :param tile_size:  tile height and width
+    :param num_threads:  number of threads
+    :return:  {"bright": fraction, "dark": fraction}
+    """
+    img = _open_image(img)
+
+    def count(tile):
+        rows, cols, _, _ = tile
+        block = np.ascontiguousarray(img[rows, cols])
+        _, bright_zones = cv2.threshold(block, bright_lower, higher, cv2.THRESH_BINARY)
+        _, dark_zones = cv2.threshold(block, dark_lower, higher, cv2.THRESH_BINARY)
+        return np.count_nonzero(bright_zones == 255), np.count_nonzero(dark_zones == 0)
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        counts = np.array(list(executor.map(count, iter_tiles(img.shape, tile_size))), dtype=np.int64)
+
+    bright, dark = counts.sum(axis=0) if len(counts) else (0, 0)
+    return {'bright': bright / float(img.size), 'dark': dark / float(img.size)}
+
+
+@cached_artifact()
+def zone_fractions_file(img_path: str,
+                        bright_lower: int = 240,
+                        dark_lower: int = 40,
+                        higher: int = 255,
+                        num_threads: int = 1) -> Optional[Dict[str, float]]:
+    """
+    zone_fractions_tiled of an image file read in grayscale.
+    pass cache=ArtifactCache or its directory to reuse the fractions of unchanged files, see cached_artifact
+    :param img_path:  image path
+    :param num_threads:  number of threads, 1 inside multiprocessing workers
+    :return:  {"bright": fraction, "dark": fraction}, or None if the image cannot be read
+    """
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    return zone_fractions_tiled(img, bright_lower, dark_lower, higher, num_threads=num_threads)
+
+
+def is_bright_zone_large_tiled(img: Union[np.ndarray, str],
+                               threshold: float = 0.3,
+                               lower: int = 240,
+                               higher: int = 255,
+                               tile_size: int = 2048,
+                               num_threads: int = 8) -> bool:
+    """
+    is_bright_zone_large for very large images
+    """
+    return zone_fractions_tiled(img, lower, 0, higher, tile_size, num_threads)['bright'] > threshold
+
+
+def is_dark_zone_large_tiled(img: Union[np.ndarray, str],
+                             threshold: float = 0.2,
+                             lower: int = 40,
+                             higher: int = 255,
+                             tile_size: int = 2048,
+                             num_threads: int = 8) -> bool:
+    """
+    is_dark_zone_large for very large images
+    """
+    return zone_fractions_tiled(img, 255, lower, higher, tile_size, num_threads)['dark'] > threshold
@@ -3,4 +3,8 @@ Project: wxtools
 Author: Terance Jiang
 Date: 1/16/2024
 """""""""""""""""""""""""""""
-from .io_utils import *
\ No newline at end of file
+from .io_utils import *
+from .async_io import *
+from .shards import *
+from .verify import *
+from .path_table import *
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Union
+
+from tqdm import tqdm
+
+from wxtools.io_utils.io_utils import build_copy_args, copy_worker, match_file
+from wxtools.logger.utils import colorstr
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+
+async def run_async_io(worker: Callable,
+                       data: Iterable,
+                       num_threads: int = 256,
+                       max_inflight: int = 4096,
+                       total: Optional[int] = None) -> list:
+    """
+    run a blocking io worker over data on a bounded thread-offload executor.
+    at most max_inflight items are scheduled at once, data is consumed lazily so it can be a generator.
+    :param worker:  blocking worker function
+    :param data:  iterable of worker arguments
+    :param num_threads:  number of executor threads, i.e. filesystem requests in flight
+    :param max_inflight:  max number of scheduled items, provides backpressure on data
+    :param total:  number of items for the progress bar
+    :return:  list of results that are not None
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_inflight)
+    output = []
+    tasks = set()
+    pbar = tqdm(total=total if total is not None else getattr(data, '__len__', lambda: None)())
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        async def run_one(item):
+            try:
+                result = await loop.run_in_executor(executor, worker, item)
+                if result is not None:
+                    output.append(result)
+            finally:
+                semaphore.release()
+                pbar.update(1)
+
+        for item in data:
+            await semaphore.acquire()
+            task = loop.create_task(run_one(item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    pbar.close()
+    return output
+
+
+async def copy_file_async(file_list: Union[str, List[str]] = None,
+                          src: Union[str, List[str]] = None,
+                          dst: Union[str, List[str]] = None,
+                          num_threads: int = 256,
+                          max_inflight: int = 4096) -> None:
+    """
+    asyncio variant of copy_file_mlpro for high latency network filesystems (NFS/SMB),
+    keeps num_threads stat/open/copy requests in flight from a single process
+    :param file_list:  list of file paths, None if src and dst are List of paths
+    :param src:  source root directory OR list of source paths
+    :param dst:  destination root directory OR list of destination paths
+    :param num_threads:  number of concurrent filesystem operations
+    :param max_inflight:  max number of scheduled copies
+    :return:  None
+    """
+    args = build_copy_args(file_list, src, dst)
+    await run_async_io(copy_worker, args, num_threads, max_inflight)
+
+
+def scan_directory(path: str):
+    """
+    list the direct entries of a directory as os.walk does, symlinked directories are neither files nor descended
+    :param path:  directory path
+    :return:  (list of subdirectories, list of files)
+    """
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.path)
+                elif not entry.is_symlink():
+                    dirs.append(entry.path)
+    except OSError as e:
+        logger.info(colorstr('red', e))
+    return dirs, files
+
+
+async def list_files_async(root_dir: str,
+                           num_threads: int = 256,
+                           exclude: Optional[List[str]] = None,
+                           extensions: Optional[List[str]] = None) -> List[str]:
+    """
+    asyncio variant of list_files_mlpro, every directory is scanned as soon as it is discovered,
+    so num_threads directory listings are in flight regardless of the tree shape
+    :param root_dir:  root directory
+    :param num_threads:  number of concurrent directory scans
+    :param exclude:  list of strings to exclude
+    :param extensions:  list of extensions
+    :return:  list of file paths
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    paths = []
+    queue.put_nowait(root_dir)
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        async def scan_loop():
+            while True:
+                directory = await queue.get()
+                try:
+                    dirs, files = await loop.run_in_executor(executor, scan_directory, directory)
+                    paths.extend(x for x in files if match_file(x, exclude, extensions))
+                    for x in dirs:
+                        queue.put_nowait(x)
+                finally:
+                    queue.task_done()
+
+        scanners = [loop.create_task(scan_loop()) for _ in range(num_threads)]
+        await queue.join()
+        for scanner in scanners:
+            scanner.cancel()
+        await asyncio.gather(*scanners, return_exceptions=True)
+
+    logger.info(colorstr('green', 'Found {} files in {}'.format(len(paths), root_dir)))
+    return paths
+
+
+def copy_file_aio(file_list: Union[str, List[str]] = None,
+                  src: Union[str, List[str]] = None,
+                  dst: Union[str, List[str]] = None,
+                  num_threads: int = 256,
+                  max_inflight: int = 4096) -> None:
+    """
+    blocking wrapper of copy_file_async
+    """
+    asyncio.run(copy_file_async(file_list, src, dst, num_threads, max_inflight))
+
+
+def list_files_aio(root_dir: str,
+                   num_threads: int = 256,
+                   exclude: Optional[List[str]] = None,
+                   extensions: Optional[List[str]] = None) -> List[str]:
+    """
+    blocking wrapper of list_files_async
+    """
+    return asyncio.run(list_files_async(root_dir, num_threads, exclude, extensions))
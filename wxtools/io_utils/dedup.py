@@ -0,0 +1,271 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import hashlib
+import os
+import shutil
+import sqlite3
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple
+
+from wxtools.logger.utils import colorstr
+from wxtools.utils.mlpro_utils import run_mlpro
+from wxtools.logger.logger import setup_logger
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+HASH_BLOCK_SIZE = 64 * 1024
+HASH_ALGORITHM = 'xxh3_128' if xxhash is not None else 'blake2b'
+
+
+def _new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def partial_hash(path: str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """
+    hash the first and the last block of a file, files smaller than two blocks are hashed entirely
+    :param path:  file path
+    :param block_size:  block size in bytes
+    :return:  hex digest
+    """
+    hasher = _new_hasher()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= 2 * block_size:
+            hasher.update(f.read())
+        else:
+            hasher.update(f.read(block_size))
+            f.seek(-block_size, os.SEEK_END)
+            hasher.update(f.read(block_size))
+    return hasher.hexdigest()
+
+
+def full_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    hash the whole file
+    :param path:  file path
+    :param block_size:  read size in bytes
+    :return:  hex digest
+    """
+    hasher = _new_hasher()
+    with open(path, 'rb') as f:
+        buffer = bytearray(block_size)
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """
+    on-disk hash cache keyed by (device, inode, mtime, size), a file that is modified or replaced gets a new key
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self.conn = sqlite3.connect(cache_path)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(hashes)')]
+        if columns and 'dev' not in columns:
+            # caches written before the device was part of the key, inodes of different devices could collide
+            self.conn.execute('DROP TABLE hashes')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS hashes ('
+                          'dev INTEGER, ino INTEGER, mtime_ns INTEGER, size INTEGER, kind TEXT, digest TEXT, '
+                          'PRIMARY KEY (dev, ino, mtime_ns, size, kind))')
+        self.conn.commit()
+
+    def get(self, identity: Tuple[int, int, int, int], kind: str) -> Optional[str]:
+        row = self.conn.execute('SELECT digest FROM hashes WHERE dev=? AND ino=? AND mtime_ns=? AND size=? AND kind=?',
+                                (*identity, kind)).fetchone()
+        return row[0] if row is not None else None
+
+    def put_many(self, items: List[Tuple[Tuple[int, int, int, int], str]], kind: str) -> None:
+        self.conn.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)',
+                              [(*identity, kind, digest) for identity, digest in items])
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def stat_worker(path: str) -> Optional[Tuple[str, Tuple[int, int, int, int]]]:
+    """
+    :param path:  file path
+    :return:  (path, (device, inode, mtime_ns, size)), None if the file cannot be read
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.info(colorstr('red', e))
+        return None
+    return path, (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def partial_hash_worker(path: str) -> Optional[Tuple[str, str]]:
+    try:
+        return path, partial_hash(path)
+    except OSError as e:
+        logger.info(colorstr('red', e))
+        return None
+
+
+def full_hash_worker(path: str) -> Optional[Tuple[str, str]]:
+    try:
+        return path, full_hash(path)
+    except OSError as e:
+        logger.info(colorstr('red', e))
+        return None
+
+
+def _hash_paths(paths: List[str],
+                identities: Dict[str, Tuple[int, int, int, int]],
+                worker,
+                kind: str,
+                cache: Optional[HashCache],
+                process_num: int) -> Dict[str, str]:
+    """
+    hash paths in parallel, reading and updating the hash cache
+    """
+    kind = '{}:{}'.format(kind, HASH_ALGORITHM)
+    digests = {}
+    missing = []
+    for path in paths:
+        digest = cache.get(identities[path], kind) if cache is not None else None
+        if digest is None:
+            missing.append(path)
+        else:
+            digests[path] = digest
+
+    if missing:
+        chunksize = max(1, min(64, len(missing) // (process_num * 4)))
+        computed = run_mlpro(worker, missing, process_num, chunksize=chunksize)
+        digests.update(computed)
+        if cache is not None:
+            cache.put_many([(identities[path], digest) for path, digest in computed], kind)
+
+    return digests
+
+
+def _split_groups(groups: List[List[str]], key: Dict[str, str]) -> List[List[str]]:
+    """
+    split candidate groups by a key, keeping only sub-groups with more than one path
+    """
+    output = []
+    for group in groups:
+        sub_groups = defaultdict(list)
+        for path in group:
+            if path in key:
+                sub_groups[key[path]].append(path)
+        output.extend(x for x in sub_groups.values() if len(x) > 1)
+    return output
+
+
+def find_duplicates(paths: List[str],
+                    process_num: int = 10,
+                    cache_path: Optional[str] = None) -> Dict[str, str]:
+    """
+    find byte-identical files.
+    candidates are prefiltered by size, then by a partial hash of the first/last blocks,
+    and only the remaining collisions are fully hashed.
+    :param paths:  list of file paths
+    :param process_num:  number of processes
+    :param cache_path:  path of the on-disk hash cache (sqlite), None to disable the cache
+    :return:  dict of {duplicate path: canonical path}, the canonical path is the first occurrence in paths
+    """
+    order = {path: idx for idx, path in reversed(list(enumerate(paths)))}
+    unique_paths = sorted(order, key=order.get)
+
+    chunksize = max(1, min(256, len(unique_paths) // (process_num * 4)))
+    identities = dict(run_mlpro(stat_worker, unique_paths, process_num, chunksize=chunksize))
+
+    by_size = defaultdict(list)
+    for path in unique_paths:
+        if path in identities:
+            by_size[identities[path][3]].append(path)
+    groups = [x for x in by_size.values() if len(x) > 1]
+    logger.info(colorstr('green', '{} files in {} same-size groups'.format(sum(map(len, groups)), len(groups))))
+
+    cache = HashCache(cache_path) if cache_path is not None else None
+    try:
+        candidates = [path for group in groups for path in group]
+        partial = _hash_paths(candidates, identities, partial_hash_worker, 'partial', cache, process_num)
+        groups = _split_groups(groups, partial)
+
+        # files that fit in two blocks were hashed entirely by the partial hash
+        small = [x for x in groups if identities[x[0]][3] <= 2 * HASH_BLOCK_SIZE]
+        large = [x for x in groups if identities[x[0]][3] > 2 * HASH_BLOCK_SIZE]
+        candidates = [path for group in large for path in group]
+        logger.info(colorstr('green', 'Full hashing {} candidate files'.format(len(candidates))))
+        full = _hash_paths(candidates, identities, full_hash_worker, 'full', cache, process_num)
+        groups = small + _split_groups(large, full)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    duplicates = {}
+    for group in groups:
+        group.sort(key=order.get)
+        for path in group[1:]:
+            duplicates[path] = group[0]
+
+    logger.info(colorstr('green', 'Found {} duplicate files'.format(len(duplicates))))
+    return duplicates
+
+
+def dedup_copy_pairs(src_paths: List[str],
+                     dst_paths: List[str],
+                     process_num: int = 10,
+                     cache_path: Optional[str] = None) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+    """
+    remove duplicated sources from copy pairs
+    :param src_paths:  list of source paths
+    :param dst_paths:  list of destination paths
+    :param process_num:  number of processes
+    :param cache_path:  path of the on-disk hash cache, None to disable the cache
+    :return:  (src paths to copy, dst paths to copy, [(canonical dst, duplicate dst), ...])
+    """
+    assert len(src_paths) == len(dst_paths), "src_paths and dst_paths should have the same length"
+
+    duplicates = find_duplicates(src_paths, process_num, cache_path)
+
+    first_dst = {}
+    copy_src, copy_dst, links = [], [], []
+    for src, dst in zip(src_paths, dst_paths):
+        canonical = duplicates.get(src, src)
+        if canonical in first_dst:
+            if first_dst[canonical] != dst:
+                links.append((first_dst[canonical], dst))
+            continue
+        first_dst[canonical] = dst
+        copy_src.append(src)
+        copy_dst.append(dst)
+
+    return copy_src, copy_dst, links
+
+
+def link_worker(arg) -> None:
+    src_path, dst_path = arg
+    try:
+        if os.path.exists(dst_path):
+            return
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            # hardlinks are not supported across devices or on some filesystems
+            shutil.copyfile(src_path, dst_path)
+    except Exception as e:
+        logger.info(colorstr('red', e))
@@ -4,22 +4,30 @@ Author: Terance Jiang
 Date: 1/16/2024
 """""""""""""""""""""""""""""
 import ast
+import functools
 import json
 import multiprocessing
 import os
+import queue
 import shutil
-from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Union, Optional, Tuple, Any
+from typing import Iterator, List, Union, Optional, Tuple
 
+import numpy as np
 from tqdm import tqdm
 
+from wxtools.io_utils.dedup import dedup_copy_pairs, link_worker
+from wxtools.io_utils.path_table import PathTable
 from wxtools.logger.utils import colorstr
-from wxtools.utils.mlpro_utils import run_mlpro
+from wxtools.utils.mlpro_utils import run_mlpro, iter_mlpro
 from wxtools.logger.logger import setup_logger
 
 logger = setup_logger(__name__, log_file=None, log_level='INFO')
 
+# number of initial work units of list_files_mlpro per process
+LIST_UNITS_PER_PROCESS = 4
+
 
 def replace_suffix(dst_extension: str, path: Path, allowed_extensions: List[str] = None):
     """
@@ -35,55 +43,140 @@ def replace_suffix(dst_extension: str, path: Path, allowed_extensions: List[str]
     return path
 
 
-def restructure_bio_dataset(image_paths: list,
-                            dst_root: str,
-                            id_index: int, ) -> tuple[list[Any], list[str]]:
+def _split_restructure_dir(head: str, id_index: int) -> Tuple[Optional[str], str]:
     """
-    restructure bio dataset, merge images with same id into the same folder, will retrain the same path after id_index
-    such as:  ["/path1/[id_index]/x/1.jpg", "/path2/[id_index]/x/2.jpg"] ->
-                ["/dst_root/[id_index]/x/1.jpg", "/dst_root/[id_index]/x/2.jpg"]
-    :param image_paths:
-    :param dst_root:
-    :param id_index:
-    :return:
+    :param head:  directory of a path with its trailing '/', or '' for a bare file name
+    :return:  (id, or None if the id is the file name, the directory part kept after the id)
+    """
+    # same number of components as the path, the file name takes the place of the last ''
+    parts = head.split('/')
+    position = id_index if id_index >= 0 else len(parts) + id_index
+    if position < 0 or position >= len(parts):
+        raise IndexError('id_index {} out of range for {}'.format(id_index, head))
+    return parts[position] if position < len(parts) - 1 else None, '/'.join(parts[position:])
+
+
+def iter_restructure_pairs(image_paths: Union[List[str], PathTable],
+                           dst_root: str,
+                           id_index: int,
+                           make_dirs: bool = True,
+                           num_threads: int = 16) -> Iterator[Tuple[str, str]]:
+    """
+    stream the (source path, destination path) pairs of restructure_bio_dataset, grouped by id.
+    the directory of each path is split once and memoized, ids are interned and the paths are ordered with a stable
+    argsort of the id ranks, so only the unique ids are sorted and image_paths is left unchanged.
+    :param image_paths:  list of image paths, or a PathTable
+    :param dst_root:  destination root directory
+    :param id_index:  index of the id in the '/' separated path
+    :param make_dirs:  create the id directories in dst_root before the first pair is yielded
+    :param num_threads:  number of threads creating the directories
+    :return:  iterator of (source path, destination path), in the order of restructure_bio_dataset
     """
-
-    def id_key(x):
-        return lambda x: x.split('/')[id_index]
-
     assert image_paths is not None, "image_paths should not be None"
     assert dst_root is not None, "dst_root should not be None"
     assert id_index is not None, "id_index should not be None"
+    if isinstance(image_paths, PathTable):
+        table = image_paths
+        # ids come from the interned directories, only the paths of ids in file names are decoded
+        ids, image_ids = table.component_ids(id_index)
+        id_dirs = [os.path.join(dst_root, x, '') for x in image_ids]
+        # destination prefix of the file names by directory, None if the id is the file name
+        prefixes: List[Optional[str]] = [None] * len(table.dirs)
+        dir_list, first_rows = np.unique(table.dir_ids, return_index=True)
+        for dir_idx, row in zip(dir_list.tolist(), first_rows.tolist()):
+            image_id, rest = _split_restructure_dir(table.dirs[dir_idx], id_index)
+            if image_id is not None:
+                prefixes[dir_idx] = rest if rest.startswith('/') else id_dirs[ids[row]] + rest
+    else:
+        id_map = {}
+        id_dirs = []
+
+        def intern(image_id):
+            number = id_map.get(image_id)
+            if number is None:
+                number = id_map[image_id] = len(id_dirs)
+                id_dirs.append(os.path.join(dst_root, image_id, ''))
+            return number
+
+        # (id number, destination prefix of the file names) by directory, (None, None) if the id is the file name.
+        # bare file names are stored under None, as "/x.jpg" has the same head as "x.jpg"
+        dirs = {}
+
+        def row_ids():
+            for path in image_paths:
+                head, sep, name = path.rpartition('/')
+                entry = dirs.get(head if sep else None)
+                if entry is None:
+                    image_id, rest = _split_restructure_dir(head + sep, id_index)
+                    if image_id is None:
+                        entry = (None, None)
+                    else:
+                        number = intern(image_id)
+                        # os.path.join keeps an absolute last part only
+                        entry = (number, rest if rest.startswith('/') else id_dirs[number] + rest)
+                    dirs[head if sep else None] = entry
+                yield entry[0] if entry[0] is not None else intern(name)
+
+        # filled in place, without an intermediate list of python ints
+        ids = np.fromiter(row_ids(), dtype=np.int64, count=len(image_paths))
+        image_ids = list(id_map)
+
+    rank = np.empty(len(image_ids), dtype=np.int64)
+    rank[sorted(range(len(image_ids)), key=image_ids.__getitem__)] = np.arange(len(image_ids))
+    order = np.argsort(rank[ids], kind='stable')
+
+    if make_dirs:
+        with ThreadPoolExecutor(num_threads) as executor:
+            list(executor.map(functools.partial(os.makedirs, exist_ok=True), id_dirs))
+
+    if isinstance(image_paths, PathTable):
+        # rows are decoded a chunk at a time, in the output order
+        chunk_size = 1 << 16
+        for start in range(0, len(order), chunk_size):
+            rows = order[start:start + chunk_size]
+            chunk = table.select(rows)
+            for stem, dir_idx, suffix_idx, image_id in zip(chunk.stems(), chunk.dir_ids.tolist(),
+                                                           chunk.suffix_ids.tolist(), ids[rows].tolist()):
+                name = stem + table.suffixes[suffix_idx]
+                prefix = prefixes[dir_idx]
+                yield table.dirs[dir_idx] + name, prefix + name if prefix is not None else id_dirs[image_id] + name
+    else:
+        for idx in order.tolist():
+            path = image_paths[idx]
+            head, sep, name = path.rpartition('/')
+            prefix = dirs[head if sep else None][1]
+            yield path, prefix + name if prefix is not None else id_dirs[ids[idx]] + name
 
-    assert isinstance(image_paths, list), "image_paths should be a list"
-
-    dst_paths = list()
+def restructure_bio_dataset(image_paths: Union[List[str], PathTable],
+                            dst_root: str,
+                            id_index: int,
+                            num_threads: int = 16) -> Tuple[List[str], List[str]]:
+    """
+    restructure bio dataset, merge images with same id into the same folder, will retrain the same path after id_index
+    such as:  ["/path1/[id_index]/x/1.jpg", "/path2/[id_index]/x/2.jpg"] ->
+                ["/dst_root/[id_index]/[id_index]/x/1.jpg", "/dst_root/[id_index]/[id_index]/x/2.jpg"]
+    use iter_restructure_pairs to stream the pairs of very large datasets instead of collecting both lists
+    :param image_paths:  list of image paths, or a PathTable, it is not modified
+    :param dst_root:  destination root directory, the id directories are created
+    :param id_index:  index of the id in the '/' separated path
+    :param num_threads:  number of threads creating the directories
+    :return:  (source paths, destination paths), grouped by id in sorted id order
+    """
     src_paths = list()
-
-    image_paths.sort(key=lambda x: x.split('/')[id_index])
-
-    image_groups = groupby(image_paths, key=lambda x: x.split('/')[id_index])
-    # image_groups = {k: list(v) for k, v in image_groups}
-
-    for image_id, group in tqdm(image_groups):
-        group = list(group)
-
-        dst_dir = os.path.join(dst_root, image_id)
-        os.makedirs(dst_dir, exist_ok=True)
-        for src_file in group:
-            dst_file = os.path.join(dst_dir, "/".join(src_file.split('/')[id_index:]))
-
-            dst_paths.append(dst_file)
-            src_paths.append(src_file)
+    dst_paths = list()
+    for src_file, dst_file in tqdm(iter_restructure_pairs(image_paths, dst_root, id_index, True, num_threads),
+                                   total=len(image_paths)):
+        src_paths.append(src_file)
+        dst_paths.append(dst_file)
 
     return src_paths, dst_paths
 
 
-def replace_root_extension(paths: Union[str, List[str]],
+def replace_root_extension(paths: Union[str, List[str], PathTable],
                            src_root: str = None,
                            dst_root: str = None,
                            src_extension: Union[str, List[str]] = None,
-                           dst_extension: str = None) -> Union[str, List[str]]:
+                           dst_extension: str = None) -> Union[str, List[str], PathTable]:
     """
     replace root and extension
     such as "/src_root/a/b/c.txt" -> "/dst_root/a/b/c.jpg"
@@ -103,7 +196,7 @@ def replace_root_extension(paths: Union[str, List[str]],
 
     :param dst_extension:
     :param src_extension:
-    :param paths:  path or list of paths
+    :param paths:  path or list of paths, or a PathTable which is rewritten without touching every path
     :param src_root:  source root directory
     :param dst_root:  destination root directory
     :return:
@@ -119,12 +212,17 @@ def replace_root_extension(paths: Union[str, List[str]],
     if isinstance(src_extension, str):
         src_extension = [src_extension]
 
-    if '.' not in dst_extension:
-        assert dst_extension is not None, "dst_extension should be a string with a dot, such as '.jpg'"
-    if '.' not in src_extension[0]:
-        assert src_extension is not None, "src_extension should be a string with a dot, such as '.jpg'"
+    if dst_extension is not None:
+        assert '.' in dst_extension, "dst_extension should be a string with a dot, such as '.jpg'"
+        assert '.' in src_extension[0], "src_extension should be a string with a dot, such as '.jpg'"
 
-    if isinstance(paths, str):
+    if isinstance(paths, PathTable):
+        if dst_extension is not None:
+            paths = paths.replace_suffix(dst_extension, src_extension)
+        if src_root is not None:
+            paths = paths.replace_root(src_root, dst_root)
+
+    elif isinstance(paths, str):
         paths = Path(paths)
         if dst_extension is not None:
             paths = replace_suffix(dst_extension, paths, src_extension)
@@ -211,6 +309,21 @@ def find_subfolders_with_string(root_dir: str,
     return matching_folders
 
 
+def resolve_copy_path(src: str, dst: str, file_path: str) -> Tuple[str, str]:
+    """
+    resolve a file path relative to src root to its (source path, destination path)
+    :param src:  source root directory
+    :param dst:  destination root directory
+    :param file_path:  file path, relative to src or absolute
+    :return:  (source path, destination path)
+    """
+    if not os.path.isabs(file_path):
+        src_path = os.path.join(src, file_path)
+    else:
+        src_path = file_path
+    return src_path, src_path.replace(src, dst)
+
+
 def copy_worker(arg):
     if len(arg) == 2:
         src, dst = arg
@@ -226,16 +339,12 @@ def copy_worker(arg):
                 logger.info(colorstr('red', 'File does not exist: {}'.format(src_path)))
                 return
         else:
-            if not os.path.isabs(file_path):
-                src_path = os.path.join(src, file_path)
-            else:
-                src_path = file_path
+            src_path, dst_path = resolve_copy_path(src, dst, file_path)
 
             if not os.path.exists(src_path):
                 logger.info(colorstr('red', 'File does not exist: {}'.format(src_path)))
                 return
 
-            dst_path = src_path.replace(src, dst)
             if os.path.exists(dst_path):
                 return
 
@@ -245,17 +354,15 @@ def copy_worker(arg):
         logger.info(colorstr('red', e))
 
 
-def copy_file_mlpro(file_list: Union[str, List[str]] = None,
+def build_copy_args(file_list: Union[str, List[str]] = None,
                     src: Union[str, List[str]] = None,
-                    dst: Union[str, List[str]] = None,
-                    process_num: int = 10) -> None:
+                    dst: Union[str, List[str]] = None) -> List[tuple]:
     """
-    copy files from src_root to dst_root, with multiprocessing
-    :param file_list:  list of file paths, None if src and dst are List of paths
+    build copy_worker arguments, see copy_file_mlpro for the accepted inputs
+    :param file_list:  list of file paths or txt file of paths, None if src and dst are List of paths
     :param src:  source root directory OR list of source paths
     :param dst:  destination root directory OR list of destination paths
-    :param process_num:  number of processes
-    :return:  None
+    :return:  list of (src, dst, file_path) or (src_path, dst_path) tuples
     """
     if file_list is not None:
         if isinstance(file_list, str):
@@ -266,16 +373,52 @@ def copy_file_mlpro(file_list: Union[str, List[str]] = None,
         assert isinstance(src, str) and isinstance(dst, str), \
             "src and dst should be strings when file_list is not None."
 
-        args = [(src, dst, file_path) for file_path in file_list]
+        return [(src, dst, file_path) for file_path in file_list]
     else:
         assert isinstance(src, list) and isinstance(dst, list), \
             "src and dst should be lists when file_list is None."
         assert len(src) == len(dst), \
             "src and dst should have the same length when file_list is None."
 
-        args = list(zip(src, dst))
+        return list(zip(src, dst))
+
+
+def copy_file_mlpro(file_list: Union[str, List[str]] = None,
+                    src: Union[str, List[str]] = None,
+                    dst: Union[str, List[str]] = None,
+                    process_num: int = 10,
+                    dedup: Optional[str] = None,
+                    hash_cache: Optional[str] = None,
+                    chunksize: int = 1) -> None:
+    """
+    copy files from src_root to dst_root, with multiprocessing
+    :param file_list:  list of file paths, None if src and dst are List of paths
+    :param src:  source root directory OR list of source paths
+    :param dst:  destination root directory OR list of destination paths
+    :param process_num:  number of processes
+    :param dedup:  None to copy every file, 'skip' to copy byte-identical sources only once,
+                   'hardlink' to copy them once and hardlink the other destinations to the copy
+    :param hash_cache:  path of the on-disk hash cache used by dedup, None to disable the cache
+    :param chunksize:  number of files sent to a worker at once, use a larger value for many small files
+    :return:  None
+    """
+    assert dedup in (None, 'skip', 'hardlink'), "dedup should be None, 'skip' or 'hardlink'"
 
-    run_mlpro(copy_worker, args, process_num)
+    args = build_copy_args(file_list, src, dst)
+
+    links = []
+    if dedup is not None:
+        if file_list is not None:
+            args = [resolve_copy_path(*arg) for arg in args]
+        src_paths, dst_paths, links = dedup_copy_pairs([x[0] for x in args], [x[1] for x in args],
+                                                       process_num, hash_cache)
+        args = list(zip(src_paths, dst_paths))
+
+    run_mlpro(copy_worker, args, process_num, chunksize=chunksize)
+
+    if dedup == 'hardlink' and links:
+        logger.info(colorstr('green', 'Linking {} duplicate files'.format(len(links))))
+        run_mlpro(link_worker, links, process_num, chunksize=chunksize)
 
 
 def get_subdirectories(root: Union[str, Path], level: int, max_level: int) -> List[Path]:
@@ -311,27 +454,117 @@ def get_subdirectories(root: Union[str, Path], level: int, max_level: int) -> Li
     return subdirs
 
 
+def match_file(path: str,
+               exclude: Optional[List[str]] = None,
+               extensions: Optional[List[str]] = None) -> bool:
+    """
+    check a file path against list_files_mlpro filters
+    :param path:  file path
+    :param exclude:  list of strings, paths containing any of them are rejected
+    :param extensions:  list of extensions, paths not ending with any of them are rejected
+    :return:  True if the path passes the filters
+    """
+    if exclude is not None and any(e in path for e in exclude):
+        return False
+    if extensions is not None and not path.endswith(tuple(extensions)):
+        return False
+    return True
+
+
 def process_directory(arg):
     root, exc, ext = arg
     paths = []
     for dirpath, _, files in os.walk(root):
-        file_paths = []
-        for x in files:
-            x = os.path.join(dirpath, x)
-            if exc is not None:
-                for e in exc:
-                    if e in x:
-                        files.remove(x)
-                        continue
-            if ext is not None:
-                if not x.endswith(tuple(ext)):
-                    files.remove(x)
-                    continue
-            file_paths.append(x)
-        paths.extend(file_paths)
+        file_paths = [os.path.join(dirpath, x) for x in files]
+        paths.extend(x for x in file_paths if match_file(x, exc, ext))
     return paths
 
 
+def _scan_directory(path: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    :return:  (file paths, directory paths, symlinked directory paths) of one directory, as os.walk sees them
+    """
+    files, dirs, links = [], [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.path)
+                elif entry.is_symlink():
+                    links.append(entry.path)
+                else:
+                    dirs.append(entry.path)
+    except OSError:
+        pass  # Ignore directories that cannot be read, as os.walk does
+    return files, dirs, links
+
+
+def list_unit_worker(arg) -> Tuple[List[str], List[str]]:
+    """
+    walk a work unit of list_files_mlpro until about `budget` directory entries were read
+    :param arg:  (directories, exclude, extensions, budget)
+    :return:  (file paths passing the filters, directories left to walk), or the exception raised by the walk
+    """
+    roots, exc, ext, budget = arg
+    paths = []
+    # depth first, like os.walk the symlinked directories below the roots are not followed
+    stack = list(reversed(roots))
+    entries = 0
+    try:
+        while stack and entries < budget:
+            files, dirs, _ = _scan_directory(stack.pop())
+            entries += len(files) + len(dirs)
+            paths.extend(x for x in files if match_file(x, exc, ext))
+            stack.extend(reversed(dirs))
+    except Exception as e:
+        # raised in the pool the exception would terminate it while it still waits for the next unit
+        return e
+    return paths, stack[::-1]
+
+
+def partition_directories(root_dir: str,
+                          max_depth: int = 1,
+                          exclude: Optional[List[str]] = None,
+                          extensions: Optional[List[str]] = None,
+                          num_threads: int = 32) -> Tuple[List[str], List[str]]:
+    """
+    scan the first max_depth levels of root_dir with a thread pool, keeping the files found on the way.
+    unlike get_subdirectories, files above max_depth are returned instead of being skipped.
+    :param root_dir:  root directory
+    :param max_depth:  depth of the returned directories
+    :param exclude:  list of strings to exclude
+    :param extensions:  list of extensions
+    :param num_threads:  number of scanning threads
+    :return:  (file paths above max_depth passing the filters, directories at max_depth, in sorted order)
+    """
+    files = []
+    frontier = [root_dir]
+    with ThreadPoolExecutor(num_threads) as executor:
+        for _ in range(max_depth):
+            next_frontier = []
+            # symlinked directories are followed above max_depth, as get_subdirectories does
+            for dir_files, dirs, links in executor.map(_scan_directory, frontier):
+                files.extend(x for x in dir_files if match_file(x, exclude, extensions))
+                next_frontier.extend(dirs)
+                next_frontier.extend(links)
+            frontier = sorted(next_frontier)
+    return files, frontier
+
+
+def _split_units(dirs: List[str], num_units: int) -> List[List[str]]:
+    """
+    split directories into at most num_units interleaved units, neighbouring directories tend to have similar sizes
+    """
+    if not dirs:
+        return []
+    num_units = max(1, min(num_units, len(dirs)))
+    return [dirs[i::num_units] for i in range(num_units)]
+
+
 def split_worker(arg: str, separator: str) -> list:
     return arg.split(separator)
 
@@ -340,25 +573,58 @@ def list_files_mlpro(root_dir: str,
                      process_num: int,
                      max_depth: int = 1,
                      exclude: Optional[List[str]] = None,
-                     extensions: Optional[List[str]] = None) -> List[str]:
+                     extensions: Optional[List[str]] = None,
+                     unit_entries: int = 20000) -> List[str]:
     """
-    list files with multiprocessing
+    list files with multiprocessing.
+    the directories at max_depth are split into work units, a worker reads about unit_entries directory entries of its
+    unit and hands the directories it did not reach back, which are split again over the workers. a single huge
+    subdirectory is therefore listed by all workers instead of being one task, and the load stays balanced on
+    skewed trees. files above max_depth are listed as well.
     :param root_dir:  root directory
     :param process_num:  number of processes
-    :param max_depth:  max depth
+    :param max_depth:  depth of the initial work units
     :param exclude:  list of strings to exclude
     :param extensions:  list of extensions
+    :param unit_entries:  number of directory entries read by a worker before it returns, smaller values balance
+                          better but send more tasks
     :return:  list of file paths
     """
     # todo change exclude to path, rename extensions
 
     logger.info(colorstr('green', 'Listing subdirectories from {} to depth {}'.format(root_dir, max_depth)))
-    subdirectories = get_subdirectories(root_dir, 0, max_depth)
-    logger.info(colorstr('green', 'Found {} subdirectories'.format(len(subdirectories))))
-
-    process_args = [(x, exclude, extensions) for x in subdirectories]
+    image_paths, subdirectories = partition_directories(root_dir, max_depth, exclude, extensions)
+    logger.info(colorstr('green', 'Found {} subdirectories and {} files above them'.format(
+        len(subdirectories), len(image_paths))))
+
+    tasks = queue.Queue()
+    pending = 0
+    for unit in _split_units(subdirectories, process_num * LIST_UNITS_PER_PROCESS):
+        tasks.put((unit, exclude, extensions, unit_entries))
+        pending += 1
+    if pending == 0:
+        return image_paths
+    # the work units are generated while the workers run, the iterator ends when no unit is left
+    task_iter = iter(tasks.get, None)
 
     logger.info(colorstr('green', 'Listing files from {} subdirectories'.format(len(subdirectories))))
-    image_paths = run_mlpro(process_directory, process_args, process_num)
+    # the file lists come back through shared memory instead of the pool pipe
+    results = iter_mlpro(list_unit_worker, task_iter, process_num, shared_memory=True)
+    try:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+            paths, leftover = result
+            image_paths.extend(paths)
+            for unit in _split_units(leftover, process_num):
+                tasks.put((unit, exclude, extensions, unit_entries))
+                pending += 1
+            pending -= 1
+            if pending == 0:
+                break
+    finally:
+        # the pool waits for the task iterator to end before it can be closed or terminated
+        tasks.put(None)
+        results.close()
 
     return image_paths
@@ -0,0 +1,256 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class PathTable:
+    """
+    columnar storage of a large list of file paths.
+
+    a path is stored as dirs[dir_ids[i]] + stem + suffixes[suffix_ids[i]], where directories (with their trailing
+    '/') and suffixes are interned, and the stems are kept in one '\\0' separated utf-8 blob with offsets.
+    a million paths take a few tens of MB instead of hundreds of MB of python strings, and root rewriting,
+    suffix rewriting, filtering and grouping work on the interned directories and numpy arrays instead of
+    on every path.
+
+    such as:
+        table = PathTable.from_paths(list_files_mlpro("/data/images", 10))
+        keys, order, offsets = table.group_by_component(3)
+        dst = table.replace_root("/data/images", "/mnt/images").replace_suffix(".png", [".jpg"])
+        table.save("images.npz")
+    """
+
+    def __init__(self,
+                 dirs: List[str],
+                 dir_ids: np.ndarray,
+                 blob: np.ndarray,
+                 offsets: np.ndarray,
+                 suffixes: List[str],
+                 suffix_ids: np.ndarray):
+        self.dirs = dirs
+        self.dir_ids = dir_ids
+        self.blob = blob
+        self.offsets = offsets
+        self.suffixes = suffixes
+        self.suffix_ids = suffix_ids
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str]) -> 'PathTable':
+        """
+        :param paths:  iterable of paths
+        :return:  PathTable
+        """
+        dir_index: Dict[str, int] = {}
+        suffix_index: Dict[str, int] = {}
+        dir_ids, suffix_ids, stems = [], [], []
+        for path in paths:
+            head, sep, name = path.rpartition('/')
+            # os.path.splitext semantics, leading dots do not start a suffix
+            stem, dot, suffix = name.rpartition('.')
+            if stem.lstrip('.'):
+                suffix = dot + suffix
+            else:
+                stem, suffix = name, ''
+            dir_ids.append(dir_index.setdefault(head + sep, len(dir_index)))
+            suffix_ids.append(suffix_index.setdefault(suffix, len(suffix_index)))
+            stems.append(stem)
+
+        blob = np.frombuffer(''.join(x + '\0' for x in stems).encode(), dtype=np.uint8)
+        offsets = np.zeros(len(stems) + 1, dtype=np.int64)
+        offsets[1:] = np.flatnonzero(blob == 0) + 1
+        return cls(list(dir_index), np.array(dir_ids, dtype=np.int32), blob, offsets,
+                   list(suffix_index), np.array(suffix_ids, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.dir_ids)
+
+    def stems(self) -> List[str]:
+        if len(self.blob) == 0:
+            return []
+        return self.blob.tobytes().decode().split('\0')[:-1]
+
+    def names(self) -> List[str]:
+        """
+        basenames of the paths
+        """
+        return [stem + self.suffixes[i] for stem, i in zip(self.stems(), self.suffix_ids.tolist())]
+
+    def to_list(self) -> List[str]:
+        dirs, suffixes = self.dirs, self.suffixes
+        return [dirs[d] + stem + suffixes[s]
+                for d, stem, s in zip(self.dir_ids.tolist(), self.stems(), self.suffix_ids.tolist())]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_list())
+
+    def __getitem__(self, idx: int) -> str:
+        stem = self.blob[self.offsets[idx]:self.offsets[idx + 1] - 1].tobytes().decode()
+        return self.dirs[self.dir_ids[idx]] + stem + self.suffixes[self.suffix_ids[idx]]
+
+    def nbytes(self) -> int:
+        """
+        approximate memory use in bytes
+        """
+        strings = sum(len(x) for x in self.dirs) + sum(len(x) for x in self.suffixes)
+        return self.dir_ids.nbytes + self.blob.nbytes + self.offsets.nbytes + self.suffix_ids.nbytes + strings
+
+    def select(self, rows: np.ndarray) -> 'PathTable':
+        """
+        new table of a subset of the rows
+        :param rows:  row indices or boolean mask
+        :return:  PathTable sharing the interned directories and suffixes
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return PathTable(self.dirs, self.dir_ids[rows], self.blob[positions], offsets, self.suffixes,
+                         self.suffix_ids[rows])
+
+    def suffix_mask(self, extensions: List[str]) -> np.ndarray:
+        """
+        endswith semantics as match_file, so "jpg" and ".tar.gz" work as well as ".jpg"
+        :param extensions:  list of extensions, such as [".jpg", ".png"]
+        :return:  boolean mask of the paths ending with one of the extensions
+        """
+        extensions = tuple(extensions)
+        matched = np.array([x.endswith(extensions) for x in self.suffixes], dtype=bool)
+        # an extension longer than the interned suffix, such as ".tar.gz" for ".gz", is checked on the paths
+        partial = np.array([not hit and any(len(e) > len(x) and e.endswith(x) for e in extensions)
+                            for x, hit in zip(self.suffixes, matched)], dtype=bool)
+        mask = matched[self.suffix_ids]
+        rows = np.flatnonzero(partial[self.suffix_ids])
+        mask[rows] = [self[i].endswith(extensions) for i in rows.tolist()]
+        return mask
+
+    def contains_mask(self, substring: str) -> np.ndarray:
+        """
+        :param substring:  substring to search
+        :return:  boolean mask of the paths containing substring
+        """
+        if '/' in substring:
+            return np.array([substring in x for x in self.to_list()], dtype=bool)
+        dir_hit = np.array([substring in x for x in self.dirs], dtype=bool)
+        mask = dir_hit[self.dir_ids] if len(self.dirs) else np.zeros(len(self), dtype=bool)
+        rest = np.flatnonzero(~mask)
+        names = self.names()
+        mask[rest] = [substring in names[i] for i in rest.tolist()]
+        return mask
+
+    def filter(self,
+               exclude: Optional[List[str]] = None,
+               extensions: Optional[List[str]] = None) -> 'PathTable':
+        """
+        same filters as list_files_mlpro
+        :param exclude:  list of strings, paths containing any of them are removed
+        :param extensions:  list of extensions, paths not ending with any of them are removed
+        :return:  filtered PathTable
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if extensions is not None:
+            keep &= self.suffix_mask(extensions)
+        for substring in exclude or []:
+            keep &= ~self.contains_mask(substring)
+        return self.select(keep)
+
+    def component_ids(self, index: int) -> Tuple[np.ndarray, List[str]]:
+        """
+        the index-th component of each path, as in path.split('/')[index]
+        :param index:  component index, negative values count from the basename
+        :return:  (component id of each path, component values)
+        """
+        values: Dict[str, int] = {}
+        per_dir = np.full(len(self.dirs), -1, dtype=np.int64)
+        # only the directories used by the rows, a selected table shares the directories of its parent
+        for dir_idx in np.unique(self.dir_ids).tolist():
+            dir_str = self.dirs[dir_idx]
+            parts = dir_str.split('/')
+            # the last part of a directory with its trailing '/' is where the basename goes
+            position = index if index >= 0 else len(parts) + index
+            if position < 0 or position >= len(parts):
+                raise IndexError('component {} out of range for {}'.format(index, dir_str))
+            if position < len(parts) - 1:
+                per_dir[dir_idx] = values.setdefault(parts[position], len(values))
+
+        ids = per_dir[self.dir_ids]
+        basename_rows = np.flatnonzero(ids < 0)
+        if len(basename_rows):
+            names = self.names()
+            ids[basename_rows] = [values.setdefault(names[i], len(values)) for i in basename_rows.tolist()]
+        return ids, list(values)
+
+    def group_by_component(self, index: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        group paths by their index-th component, such as the id of a bio dataset
+        such as:
+            keys, order, offsets = table.group_by_component(3)
+            rows_of_first_key = order[offsets[0]:offsets[1]]
+        :param index:  component index
+        :return:  (sorted keys, row order grouping the paths by key, CSR offsets of shape (K + 1,))
+        """
+        ids, values = self.component_ids(index)
+        key_order = sorted(range(len(values)), key=values.__getitem__)
+        rank = np.empty(len(values), dtype=np.int64)
+        rank[key_order] = np.arange(len(values))
+        ranked = rank[ids]
+        order = np.argsort(ranked, kind='stable')
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ranked, minlength=len(values)), out=offsets[1:])
+        return [values[i] for i in key_order], order, offsets
+
+    def replace_root(self, src_root: str, dst_root: str) -> 'PathTable':
+        """
+        rewrite the root of all paths, only the interned directories are rewritten
+        :param src_root:  source root directory, all paths should be under it
+        :param dst_root:  destination root directory
+        :return:  PathTable
+        """
+        src_prefix = src_root.rstrip('/') + '/'
+        dst_prefix = dst_root.rstrip('/') + '/'
+        dirs = []
+        for dir_str in self.dirs:
+            if not dir_str.startswith(src_prefix):
+                raise ValueError('{} is not under {}'.format(dir_str, src_root))
+            dirs.append(dst_prefix + dir_str[len(src_prefix):])
+        return PathTable(dirs, self.dir_ids, self.blob, self.offsets, self.suffixes, self.suffix_ids)
+
+    def replace_suffix(self, dst_extension: str, allowed_extensions: List[str]) -> 'PathTable':
+        """
+        replace the suffix of the paths whose suffix is in allowed_extensions, as replace_suffix
+        :param dst_extension:  new suffix, such as ".png"
+        :param allowed_extensions:  suffixes to replace
+        :return:  PathTable
+        """
+        suffixes = list(self.suffixes)
+        if dst_extension not in suffixes:
+            suffixes.append(dst_extension)
+        mapping = np.array([suffixes.index(dst_extension) if x in allowed_extensions else i
+                            for i, x in enumerate(self.suffixes)], dtype=np.int32)
+        suffix_ids = mapping[self.suffix_ids] if len(mapping) else self.suffix_ids
+        return PathTable(self.dirs, self.dir_ids, self.blob, self.offsets, suffixes, suffix_ids)
+
+    def save(self, path: str) -> None:
+        """
+        save to a .npz file
+        """
+        np.savez(path, dirs=np.array(self.dirs, dtype=str), dir_ids=self.dir_ids, blob=self.blob,
+                 offsets=self.offsets, suffixes=np.array(self.suffixes, dtype=str), suffix_ids=self.suffix_ids)
+
+    @classmethod
+    def load(cls, path: str) -> 'PathTable':
+        """
+        load a table saved by save
+        """
+        data = np.load(path)
+        return cls(data['dirs'].tolist(), data['dir_ids'], data['blob'], data['offsets'], data['suffixes'].tolist(),
+                   data['suffix_ids'])
+
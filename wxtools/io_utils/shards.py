@@ -0,0 +1,207 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from wxtools.io_utils.dedup import stat_worker
+from wxtools.logger.utils import colorstr
+from wxtools.utils.mlpro_utils import run_mlpro
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_DTYPE = np.dtype([('offset', np.uint64), ('size', np.uint64)])
+
+# a shard is made of three files:
+#   shard-00000.data       concatenated file contents
+#   shard-00000.index.npy  (offset, size) per record, loaded with mmap
+#   shard-00000.keys.txt   one key per line, in record order
+
+
+def shard_name(shard_idx: int) -> str:
+    return 'shard-{:05d}'.format(shard_idx)
+
+
+def plan_shards(sizes: List[int], shard_size: int) -> List[Tuple[int, int]]:
+    """
+    split records into consecutive shards of about shard_size bytes
+    :param sizes:  size of each record
+    :param shard_size:  target shard size in bytes
+    :return:  list of (start, end) record ranges
+    """
+    ranges = []
+    start, total = 0, 0
+    for idx, size in enumerate(sizes):
+        if total > 0 and total + size > shard_size:
+            ranges.append((start, idx))
+            start, total = idx, 0
+        total += size
+    if start < len(sizes):
+        ranges.append((start, len(sizes)))
+    return ranges
+
+
+def shard_writer_worker(arg):
+    shard_idx, paths, keys, dst_root = arg
+    name = shard_name(shard_idx)
+    data_path = os.path.join(dst_root, name + '.data')
+
+    index = []
+    written_keys = []
+    offset = 0
+    with open(data_path + '.tmp', 'wb') as out:
+        for path, key in zip(paths, keys):
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            except OSError as e:
+                logger.info(colorstr('red', e))
+                continue
+            out.write(content)
+            index.append((offset, len(content)))
+            written_keys.append(key)
+            offset += len(content)
+
+    np.save(os.path.join(dst_root, name + '.index.npy'), np.array(index, dtype=INDEX_DTYPE))
+    with open(os.path.join(dst_root, name + '.keys.txt'), 'w') as f:
+        f.write('\n'.join(written_keys))
+    # the data file is renamed last, a shard without .data is incomplete
+    os.replace(data_path + '.tmp', data_path)
+
+    return shard_idx, len(written_keys), offset
+
+
+def pack_shards(file_paths: List[str],
+                dst_root: str,
+                src_root: Optional[str] = None,
+                shard_size: int = 1 << 30,
+                process_num: int = 10) -> dict:
+    """
+    pack many small files into a few large shards, shards are written in parallel
+    such as:
+        paths = list_files_mlpro("/data/images", 10)
+        pack_shards(paths, "/data/images_shards", src_root="/data/images")
+        reader = ShardReader("/data/images_shards")
+        img = cv2.imdecode(reader.get_array("id1/1.jpg"), cv2.IMREAD_COLOR)
+    :param file_paths:  list of file paths
+    :param dst_root:  output directory
+    :param src_root:  keys are paths relative to src_root, None to use the paths as keys
+    :param shard_size:  target shard size in bytes
+    :param process_num:  number of processes
+    :return:  manifest dict, also written to dst_root/manifest.json
+    """
+    os.makedirs(dst_root, exist_ok=True)
+
+    chunksize = max(1, min(256, len(file_paths) // (process_num * 4)))
+    identities = dict(run_mlpro(stat_worker, file_paths, process_num, chunksize=chunksize))
+    file_paths = [x for x in file_paths if x in identities]
+    sizes = [identities[x][3] for x in file_paths]
+    keys = [os.path.relpath(x, src_root) if src_root is not None else x for x in file_paths]
+    assert all('\n' not in x for x in keys), "keys should not contain newlines"
+
+    ranges = plan_shards(sizes, shard_size)
+    logger.info(colorstr('green', 'Packing {} files ({} bytes) into {} shards'.format(
+        len(file_paths), sum(sizes), len(ranges))))
+
+    args = [(idx, file_paths[start:end], keys[start:end], dst_root) for idx, (start, end) in enumerate(ranges)]
+    written = sorted(run_mlpro(shard_writer_worker, args, process_num))
+
+    manifest = {
+        'version': 1,
+        'num_records': sum(x[1] for x in written),
+        'shards': [{'name': shard_name(idx), 'count': count, 'bytes': num_bytes} for idx, count, num_bytes in written],
+    }
+    with open(os.path.join(dst_root, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+class ShardReader:
+    """
+    read shards written by pack_shards, supports random access by key and sequential streaming
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.names = [x['name'] for x in self.manifest['shards']]
+        self.indices = [np.load(os.path.join(root, x + '.index.npy'), mmap_mode='r') for x in self.names]
+        self._data = [None] * len(self.names)
+        self._lookup = None
+
+    def __len__(self) -> int:
+        return self.manifest['num_records']
+
+    def _read_keys(self, shard_idx: int) -> List[str]:
+        with open(os.path.join(self.root, self.names[shard_idx] + '.keys.txt')) as f:
+            content = f.read()
+        return content.split('\n') if content else []
+
+    def _data_map(self, shard_idx: int) -> np.ndarray:
+        if self._data[shard_idx] is None:
+            path = os.path.join(self.root, self.names[shard_idx] + '.data')
+            if os.path.getsize(path) == 0:
+                self._data[shard_idx] = np.zeros(0, dtype=np.uint8)
+            else:
+                self._data[shard_idx] = np.memmap(path, dtype=np.uint8, mode='r')
+        return self._data[shard_idx]
+
+    @property
+    def lookup(self) -> Dict[str, Tuple[int, int]]:
+        """
+        dict of {key: (shard index, record index)}, built on first random access
+        """
+        if self._lookup is None:
+            self._lookup = {}
+            for shard_idx in range(len(self.names)):
+                for record_idx, key in enumerate(self._read_keys(shard_idx)):
+                    self._lookup[key] = (shard_idx, record_idx)
+        return self._lookup
+
+    def keys(self) -> Iterator[str]:
+        for shard_idx in range(len(self.names)):
+            yield from self._read_keys(shard_idx)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.lookup
+
+    def get_array(self, key: str) -> np.ndarray:
+        """
+        zero-copy view of a record, e.g. for cv2.imdecode
+        :param key:  record key
+        :return:  read-only uint8 array
+        """
+        shard_idx, record_idx = self.lookup[key]
+        offset, size = self.indices[shard_idx][record_idx]
+        return self._data_map(shard_idx)[int(offset):int(offset) + int(size)]
+
+    def get(self, key: str) -> bytes:
+        """
+        read a record
+        :param key:  record key
+        :return:  record content
+        """
+        return self.get_array(key).tobytes()
+
+    def __getitem__(self, key: str) -> bytes:
+        return self.get(key)
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        stream all records in storage order with sequential reads
+        """
+        for shard_idx, name in enumerate(self.names):
+            keys = self._read_keys(shard_idx)
+            index = self.indices[shard_idx]
+            with open(os.path.join(self.root, name + '.data'), 'rb') as f:
+                for key, (offset, size) in zip(keys, index):
+                    yield key, f.read(int(size))
@@ -0,0 +1,117 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import json
+import os
+from collections import Counter
+from typing import List, Optional, Union
+
+from wxtools.io_utils.dedup import full_hash
+from wxtools.io_utils.io_utils import build_copy_args, resolve_copy_path
+from wxtools.logger.utils import colorstr
+from wxtools.utils.mlpro_utils import run_mlpro
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
+
+# status of a file pair in the verify report
+#   missing         destination does not exist
+#   missing_source  source does not exist
+#   truncated       destination is smaller than the source
+#   size_mismatch   destination is larger than the source
+#   stale           source was modified after the destination was written (size and mtime mode only)
+#   differing       contents differ (checksum mode only)
+#   error           a file could not be read
+VERIFY_STATUSES = ('missing', 'missing_source', 'truncated', 'size_mismatch', 'stale', 'differing', 'error')
+
+
+def verify_worker(arg):
+    """
+    compare a source file with its destination
+    :return:  None if the pair matches, else a report entry
+    """
+    src_path, dst_path, checksum = arg
+    entry = {'src': src_path, 'dst': dst_path}
+    try:
+        src_stat = os.stat(src_path)
+    except FileNotFoundError:
+        return dict(entry, status='missing_source')
+    except OSError as e:
+        return dict(entry, status='error', error=str(e))
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return dict(entry, status='missing')
+    except OSError as e:
+        return dict(entry, status='error', error=str(e))
+
+    entry.update(src_size=src_stat.st_size, dst_size=dst_stat.st_size)
+    if dst_stat.st_size < src_stat.st_size:
+        return dict(entry, status='truncated')
+    if dst_stat.st_size > src_stat.st_size:
+        return dict(entry, status='size_mismatch')
+
+    if checksum:
+        try:
+            if full_hash(src_path) != full_hash(dst_path):
+                return dict(entry, status='differing')
+        except OSError as e:
+            return dict(entry, status='error', error=str(e))
+    elif src_stat.st_mtime_ns > dst_stat.st_mtime_ns:
+        return dict(entry, status='stale', src_mtime_ns=src_stat.st_mtime_ns, dst_mtime_ns=dst_stat.st_mtime_ns)
+    return None
+
+
+def verify_copy(file_list: Union[str, List[str]] = None,
+                src: Union[str, List[str]] = None,
+                dst: Union[str, List[str]] = None,
+                checksum: bool = False,
+                process_num: int = 10,
+                chunksize: Optional[int] = None,
+                report_path: Optional[str] = None) -> dict:
+    """
+    verify a copy made by copy_file_mlpro, takes the same file_list, src and dst.
+    by default only sizes and mtimes are compared, which needs one stat per file,
+    checksum=True compares the full contents with hashes instead.
+    such as:
+        copy_file_mlpro(paths, "/data/src", "/mnt/dst", process_num=32)
+        report = verify_copy(paths, "/data/src", "/mnt/dst", process_num=32, report_path="verify.json")
+        bad = [x['src'] for x in report['files']]
+    :param file_list:  list of file paths or txt file of paths, None if src and dst are List of paths
+    :param src:  source root directory OR list of source paths
+    :param dst:  destination root directory OR list of destination paths
+    :param checksum:  compare file contents instead of size and mtime
+    :param process_num:  number of processes
+    :param chunksize:  number of files per task sent to a worker, None to choose from the number of files
+    :param report_path:  path of the JSON report, None to only return it
+    :return:  report dict with num_files, num_ok, counts per status and the files that do not match
+    """
+    args = build_copy_args(file_list, src, dst)
+    if file_list is not None:
+        args = [resolve_copy_path(*arg) for arg in args]
+    if chunksize is None:
+        chunksize = max(1, min(1024, len(args) // (process_num * 4)))
+
+    files = run_mlpro(verify_worker, [(s, d, checksum) for s, d in args], process_num, chunksize=chunksize)
+    files.sort(key=lambda x: x['src'])
+    counts = Counter(x['status'] for x in files)
+
+    report = {
+        'src': src if isinstance(src, str) else None,
+        'dst': dst if isinstance(dst, str) else None,
+        'checksum': checksum,
+        'num_files': len(args),
+        'num_ok': len(args) - len(files),
+        'counts': {status: counts.get(status, 0) for status in VERIFY_STATUSES},
+        'files': files,
+    }
+    if report_path is not None:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    color = 'green' if not files else 'red'
+    logger.info(colorstr(color, 'Verified {} files: {} ok, {}'.format(
+        len(args), report['num_ok'], ', '.join('{} {}'.format(n, s) for s, n in counts.items()) or 'no errors')))
+    return report
@@ -0,0 +1,230 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from wxtools.utils.mlpro_utils import run_mlpro
+
+# groups are described CSR style: the samples of group g are features[offsets[g]:offsets[g + 1]]
+
+
+def offsets_from_dict(mat_dict: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    convert {id: np.array n*x} into a flat feature matrix and group offsets
+    :param mat_dict:  {id: np.array n*x(x dim features)}
+    :return:  (features (N, x), offsets (K + 1,), ids)
+    """
+    keys = list(mat_dict.keys())
+    counts = [len(mat_dict[key]) for key in keys]
+    features = np.concatenate([np.asarray(mat_dict[key]).reshape(-1, np.shape(mat_dict[key])[-1]) for key in keys])
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return features, offsets, keys
+
+
+def offsets_from_labels(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    group a label per sample into CSR offsets
+    such as:
+        order, offsets, ids = offsets_from_labels(labels)
+        stats = clean_groups(features[order], offsets)
+    :param labels:  label of each sample
+    :return:  (order that sorts samples by group, offsets (K + 1,), unique labels)
+    """
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    unique, counts = np.unique(labels[order], return_counts=True)
+    offsets = np.zeros(len(unique) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return order, offsets, unique
+
+
+def _normalize(features: np.ndarray) -> np.ndarray:
+    dtype = features.dtype if features.dtype in (np.float32, np.float64) else np.float32
+    features = np.asarray(features, dtype=dtype)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, np.finfo(dtype).tiny)
+
+
+def _segment_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    sum values of each group, empty groups are zero
+    """
+    counts = np.diff(offsets)
+    output = np.zeros((len(counts),) + values.shape[1:], dtype=values.dtype)
+    nonempty = counts > 0
+    if nonempty.any():
+        output[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty], axis=0)
+    return output
+
+
+def group_centroids(features: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    unit-norm centroid of each group, the mean direction of its unit-norm samples
+    :param features:  features of shape (N, d), sorted by group
+    :param offsets:  CSR group offsets of shape (K + 1,)
+    :return:  centroids of shape (K, d), zero for empty groups
+    """
+    sums = _segment_sum(_normalize(features), np.asarray(offsets, dtype=np.int64))
+    return _normalize(sums)
+
+
+def group_rows(offsets: np.ndarray, groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    row indices of the samples of several groups
+    :param offsets:  CSR group offsets
+    :param groups:  group indices
+    :return:  (row indices, position in groups of the group owning each row)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    counts = offsets[groups + 1] - offsets[groups]
+    owner = np.repeat(np.arange(len(groups)), counts)
+    rows = offsets[groups][owner] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, owner
+
+
+def group_similarity_stats(features: np.ndarray,
+                           offsets: np.ndarray,
+                           block_size: int = 65536) -> Dict[str, np.ndarray]:
+    """
+    per-sample similarity statistics within groups, in one vectorized pass without any n*n similarity matrix.
+    with unit vectors x_i and group sum S_g, the sum of similarities of x_i to the rest of its group is x_i . S_g - 1
+    :param features:  features of shape (N, d), sorted by group
+    :param offsets:  CSR group offsets of shape (K + 1,)
+    :param block_size:  number of rows processed at once, bounds memory
+    :return:  dict of
+              centroid_sim (N,): cosine similarity of each sample to its group centroid
+              intra_mean (N,): mean cosine similarity of each sample to the other samples of its group, nan for singletons
+              group_size (K,): number of samples per group
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    assert offsets[0] == 0 and offsets[-1] == len(features), "offsets should start at 0 and end at len(features)"
+
+    normed = _normalize(features)
+    counts = np.diff(offsets)
+    group_ids = np.repeat(np.arange(len(counts)), counts)
+    sums = _segment_sum(normed, offsets)
+    sum_norms = np.linalg.norm(sums, axis=1)
+
+    dots = np.empty(len(normed), dtype=normed.dtype)
+    for start in range(0, len(normed), block_size):
+        end = start + block_size
+        dots[start:end] = np.einsum('ij,ij->i', normed[start:end], sums[group_ids[start:end]])
+
+    sizes = counts[group_ids]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centroid_sim = dots / sum_norms[group_ids]
+        intra_mean = np.where(sizes > 1, (dots - 1.0) / (sizes - 1), np.nan)
+
+    return {'centroid_sim': centroid_sim, 'intra_mean': intra_mean, 'group_size': counts}
+
+
+def flag_outliers(stats: Dict[str, np.ndarray],
+                  offsets: np.ndarray,
+                  min_centroid_sim: Optional[float] = None,
+                  min_intra_mean: Optional[float] = None,
+                  max_zscore: Optional[float] = None,
+                  min_group_size: int = 3) -> np.ndarray:
+    """
+    flag outliers from group_similarity_stats, a sample is an outlier if any enabled rule fails
+    :param stats:  output of group_similarity_stats
+    :param offsets:  CSR group offsets
+    :param min_centroid_sim:  samples below this similarity to their centroid are outliers
+    :param min_intra_mean:  samples below this mean similarity to their group are outliers
+    :param max_zscore:  samples whose centroid similarity is more than max_zscore stds below their group mean
+    :param min_group_size:  groups smaller than this are never flagged
+    :return:  boolean outlier mask of shape (N,)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    group_ids = np.repeat(np.arange(len(counts)), counts)
+    centroid_sim = stats['centroid_sim']
+
+    outlier = np.zeros(len(centroid_sim), dtype=bool)
+    if min_centroid_sim is not None:
+        outlier |= centroid_sim < min_centroid_sim
+    if min_intra_mean is not None:
+        outlier |= stats['intra_mean'] < min_intra_mean
+    if max_zscore is not None:
+        safe_counts = np.maximum(counts, 1)
+        mean = _segment_sum(centroid_sim, offsets) / safe_counts
+        var = _segment_sum(centroid_sim ** 2, offsets) / safe_counts - mean ** 2
+        std = np.sqrt(np.maximum(var, 0))[group_ids]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = (centroid_sim - mean[group_ids]) / std
+        outlier |= np.nan_to_num(zscore, nan=0.0) < -max_zscore
+
+    outlier &= counts[group_ids] >= min_group_size
+    return outlier
+
+
+def partition_groups(offsets: np.ndarray, num_parts: int) -> List[Tuple[int, int]]:
+    """
+    split groups into contiguous ranges with about the same number of samples
+    :param offsets:  CSR group offsets
+    :param num_parts:  number of ranges
+    :return:  list of (first group, last group + 1)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    targets = np.linspace(0, offsets[-1], num_parts + 1)[1:-1]
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(offsets, targets), [len(offsets) - 1]]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def group_stats_worker(arg):
+    part_idx, features, offsets, block_size = arg
+    if isinstance(features, str):
+        features = np.load(features, mmap_mode='r')
+    features = features[offsets[0]:offsets[-1]]
+    return part_idx, group_similarity_stats(features, offsets - offsets[0], block_size)
+
+
+def clean_groups(features: Union[np.ndarray, str],
+                 offsets: np.ndarray,
+                 min_centroid_sim: Optional[float] = None,
+                 min_intra_mean: Optional[float] = None,
+                 max_zscore: Optional[float] = 3.0,
+                 min_group_size: int = 3,
+                 process_num: int = 1,
+                 block_size: int = 65536) -> Dict[str, np.ndarray]:
+    """
+    identity-cluster outlier cleaning on grouped features
+    such as:
+        features, offsets, ids = offsets_from_dict({id: np.array n*x})
+        result = clean_groups(features, offsets, min_centroid_sim=0.3, process_num=8)
+        outlier_rows = np.flatnonzero(result['outlier'])
+    :param features:  features of shape (N, d) sorted by group, or the path of a .npy file (e.g. from extract_features)
+                      which is memory mapped by the workers instead of being pickled
+    :param offsets:  CSR group offsets of shape (K + 1,)
+    :param min_centroid_sim:  see flag_outliers
+    :param min_intra_mean:  see flag_outliers
+    :param max_zscore:  see flag_outliers
+    :param min_group_size:  see flag_outliers
+    :param process_num:  number of processes, groups are split into ranges with similar sample counts
+    :param block_size:  number of rows processed at once
+    :return:  dict of centroid_sim, intra_mean, group_size and outlier arrays
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    if process_num <= 1:
+        if isinstance(features, str):
+            features = np.load(features, mmap_mode='r')
+        stats = group_similarity_stats(features, offsets, block_size)
+    else:
+        parts = partition_groups(offsets, process_num * 4)
+        args = []
+        for idx, (a, b) in enumerate(parts):
+            part_features = features if isinstance(features, str) else features[offsets[a]:offsets[b]]
+            part_offsets = offsets[a:b + 1] if isinstance(features, str) else offsets[a:b + 1] - offsets[a]
+            args.append((idx, part_features, part_offsets, block_size))
+        results = dict(run_mlpro(group_stats_worker, args, process_num, shared_memory=True))
+        stats = {key: np.concatenate([results[idx][key] for idx in range(len(parts))])
+                 for key in ('centroid_sim', 'intra_mean', 'group_size')}
+
+    stats['outlier'] = flag_outliers(stats, offsets, min_centroid_sim, min_intra_mean, max_zscore, min_group_size)
+    return stats
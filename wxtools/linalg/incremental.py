@@ -0,0 +1,218 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _unit(features: np.ndarray) -> np.ndarray:
+    features = np.asarray(features, dtype=np.float32)
+    if features.ndim == 1:
+        features = features[np.newaxis, :]
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def _group_deltas(gids: np.ndarray, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    sum vectors per group, only for the groups present in gids
+    :param gids:  (M,) group id of each vector
+    :param vectors:  (M, d) vectors
+    :return:  (sorted unique group ids, (len(touched), d) float64 sums)
+    """
+    touched, inverse = np.unique(gids, return_inverse=True)
+    deltas = np.zeros((len(touched), vectors.shape[1]), dtype=np.float64)
+    np.add.at(deltas, inverse, vectors.astype(np.float64))
+    return touched, deltas
+
+
+class IncrementalSimilarity:
+    """
+    incremental mean cosine similarity of a gallery, optionally within groups (e.g. identities).
+
+    for unit vectors x_i and the sum vector S_g of their group, the sum of similarities of x_i to the rest of
+    its group is x_i . S_g - 1. the per-row sums, the group sums and the group counts are kept up to date,
+    so adding or removing M vectors costs O(M * d) plus one dot product per row of the affected groups,
+    instead of recomputing the O(N^2 * d) similarity matrix.
+
+    mean_similarity() matches cosine_similarity_mean on each group (self similarity excluded, mean over n).
+
+    such as:
+        engine = IncrementalSimilarity()
+        engine.add(names, features, groups=ids)
+        engine.save("gallery.npz")
+        engine = IncrementalSimilarity.load("gallery.npz")
+        engine.add(new_names, new_features, groups=new_ids)
+        engine.remove(bad_names)
+        scores = engine.scores()
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.group_keys: List[str] = []
+        self.group_index: Dict[str, int] = {}
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.groups = np.zeros(0, dtype=np.int64)
+        self.row_sums = np.zeros(0, dtype=np.float64)
+        self.group_sums = np.zeros((0, dim or 0), dtype=np.float64)
+        self.group_counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _group_ids(self, groups: Optional[List[str]], num: int) -> np.ndarray:
+        if groups is None:
+            groups = [''] * num
+        assert len(groups) == num, "groups should have the same length as names"
+
+        for key in groups:
+            if key not in self.group_index:
+                self.group_index[key] = len(self.group_keys)
+                self.group_keys.append(key)
+
+        num_groups = len(self.group_keys)
+        if num_groups > len(self.group_counts):
+            grow = num_groups - len(self.group_counts)
+            self.group_sums = np.concatenate([self.group_sums,
+                                              np.zeros((grow, self.vectors.shape[1]), dtype=np.float64)])
+            self.group_counts = np.concatenate([self.group_counts, np.zeros(grow, dtype=np.int64)])
+        return np.array([self.group_index[key] for key in groups], dtype=np.int64)
+
+    def _update_rows(self, touched: np.ndarray, deltas: np.ndarray, sign: float) -> None:
+        """
+        add sign * x_i . deltas[g_i] to the row sums of the rows in the touched groups
+        """
+        position = np.full(len(self.group_keys), -1, dtype=np.int64)
+        position[touched] = np.arange(len(touched))
+        rows = np.flatnonzero(position[self.groups] >= 0)
+        if len(rows):
+            self.row_sums[rows] += sign * np.einsum('ij,ij->i', self.vectors[rows].astype(np.float64),
+                                                    deltas[position[self.groups[rows]]])
+
+    def add(self, names: List[str], features: np.ndarray, groups: Optional[List[str]] = None) -> None:
+        """
+        add vectors to the gallery
+        :param names:  unique name of each vector
+        :param features:  features of shape (M, d)
+        :param groups:  group of each vector, None to put all vectors in one group
+        :return:  None
+        """
+        vectors = _unit(features)
+        assert len(names) == len(vectors), "names and features should have the same length"
+        if len(self.names) == 0 and self.vectors.shape[1] == 0:
+            self.vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            self.group_sums = np.zeros((len(self.group_keys), vectors.shape[1]), dtype=np.float64)
+        if vectors.shape[1] != self.vectors.shape[1]:
+            raise ValueError('features should have dimension {}'.format(self.vectors.shape[1]))
+        duplicated = [x for x in names if x in self.index]
+        if duplicated or len(set(names)) != len(names):
+            raise ValueError('names already in the gallery or duplicated: {}'.format(duplicated[:10]))
+
+        gids = self._group_ids(groups, len(names))
+        touched, deltas = _group_deltas(gids, vectors)
+
+        # existing rows gain their similarities to the new vectors of their group
+        self._update_rows(touched, deltas, 1.0)
+        self.group_sums[touched] += deltas
+        self.group_counts += np.bincount(gids, minlength=len(self.group_keys))
+
+        vectors64 = vectors.astype(np.float64)
+        new_rows = np.einsum('ij,ij->i', vectors64, self.group_sums[gids]) - \
+            np.einsum('ij,ij->i', vectors64, vectors64)
+
+        for name in names:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.groups = np.concatenate([self.groups, gids])
+        self.row_sums = np.concatenate([self.row_sums, new_rows])
+
+    def remove(self, names: List[str]) -> None:
+        """
+        remove vectors from the gallery
+        :param names:  unique names of the vectors to remove
+        :return:  None
+        """
+        if len(set(names)) != len(names):
+            raise ValueError('names should be unique, a duplicated name would be removed twice')
+        rows = np.array([self.index[x] for x in names], dtype=np.int64)
+        if len(rows) == 0:
+            return
+
+        keep = np.ones(len(self.names), dtype=bool)
+        keep[rows] = False
+        touched, deltas = _group_deltas(self.groups[rows], self.vectors[rows])
+
+        self.group_sums[touched] -= deltas
+        self.group_counts -= np.bincount(self.groups[rows], minlength=len(self.group_keys))
+
+        self.names = [x for x, k in zip(self.names, keep) if k]
+        self.index = {x: i for i, x in enumerate(self.names)}
+        self.vectors = self.vectors[keep]
+        self.groups = self.groups[keep]
+        self.row_sums = self.row_sums[keep]
+        # remaining rows lose their similarities to the removed vectors of their group
+        self._update_rows(touched, deltas, -1.0)
+
+    def refresh(self) -> None:
+        """
+        recompute the group sums and row sums from the vectors, removes accumulated floating point drift
+        """
+        vectors64 = self.vectors.astype(np.float64)
+        self.group_sums = np.zeros((len(self.group_keys), self.vectors.shape[1]), dtype=np.float64)
+        np.add.at(self.group_sums, self.groups, vectors64)
+        self.group_counts = np.bincount(self.groups, minlength=len(self.group_keys)).astype(np.int64)
+        self.row_sums = np.einsum('ij,ij->i', vectors64, self.group_sums[self.groups]) - \
+            np.einsum('ij,ij->i', vectors64, vectors64)
+
+    def mean_similarity(self) -> np.ndarray:
+        """
+        mean cosine similarity of each vector to its group, as cosine_similarity_mean
+        :return:  array of shape (N,)
+        """
+        return self.row_sums / self.group_counts[self.groups]
+
+    def scores(self) -> Dict[str, float]:
+        """
+        map names to their mean cosine similarity, as get_mean_cosine_similarity
+        """
+        return dict(zip(self.names, self.mean_similarity()))
+
+    def save(self, path: str) -> None:
+        """
+        persist the gallery state to a .npz file
+        :param path:  output path
+        :return:  None
+        """
+        np.savez(path,
+                 names=np.array(self.names, dtype=str),
+                 group_keys=np.array(self.group_keys, dtype=str),
+                 vectors=self.vectors,
+                 groups=self.groups,
+                 row_sums=self.row_sums,
+                 group_sums=self.group_sums,
+                 group_counts=self.group_counts)
+
+    @classmethod
+    def load(cls, path: str) -> 'IncrementalSimilarity':
+        """
+        load a gallery state saved by save
+        :param path:  .npz path
+        :return:  IncrementalSimilarity
+        """
+        data = np.load(path)
+        engine = cls()
+        engine.names = data['names'].tolist()
+        engine.index = {x: i for i, x in enumerate(engine.names)}
+        engine.group_keys = data['group_keys'].tolist()
+        engine.group_index = {x: i for i, x in enumerate(engine.group_keys)}
+        engine.vectors = data['vectors']
+        engine.groups = data['groups']
+        engine.row_sums = data['row_sums']
+        engine.group_sums = data['group_sums']
+        engine.group_counts = data['group_counts']
+        return engine
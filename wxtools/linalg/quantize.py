@@ -0,0 +1,203 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from wxtools.linalg.similarity import merge_topk
+
+# int8 dot products are accumulated in float32 while they are exact integers, i.e. d * 127 * 127 < 2 ** 24
+_FLOAT32_EXACT_DIM = (1 << 24) // (127 * 127)
+
+
+def _unit(features: np.ndarray) -> np.ndarray:
+    features = np.asarray(features, dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def quantize_fp16(features: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """
+    store features as float16, 4x smaller than float64
+    :param features:  features of shape (N, d)
+    :param normalize:  normalize rows to unit length first, so that dot products are cosine similarities
+    :return:  float16 array of shape (N, d)
+    """
+    features = _unit(features) if normalize else np.asarray(features, dtype=np.float32)
+    return features.astype(np.float16)
+
+
+def quantize_int8(features: np.ndarray, normalize: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    symmetric per-vector int8 quantization, x ~= q * scale, 8x smaller than float64
+    :param features:  features of shape (N, d)
+    :param normalize:  normalize rows to unit length first
+    :return:  (int8 array of shape (N, d), float32 scales of shape (N,))
+    """
+    features = _unit(features) if normalize else np.asarray(features, dtype=np.float32)
+    scales = np.abs(features).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    q = np.rint(features / scales[:, np.newaxis])
+    return np.clip(q, -127, 127).astype(np.int8), scales
+
+
+def dequantize_int8(q: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """
+    :param q:  int8 array of shape (N, d)
+    :param scales:  scales of shape (N,)
+    :return:  float32 array of shape (N, d)
+    """
+    return q.astype(np.float32) * scales[:, np.newaxis]
+
+
+def _sim_blocks(mat1: np.ndarray,
+                mat2: np.ndarray,
+                acc_dtype: np.dtype,
+                block_size: int,
+                col_block_size: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    dot products of mat1 and mat2 block by block, rows and columns are upcast one slice at a time into reused
+    scratch buffers instead of converting the whole gallery
+    :return:  iterator of (row start, column start, block), the block buffer is reused by the next iteration
+    """
+    d = mat1.shape[1]
+    block_size, col_block_size = max(1, min(block_size, len(mat1))), max(1, min(col_block_size, len(mat2)))
+    rows_buf = np.empty((block_size, d), dtype=acc_dtype)
+    cols_buf = np.empty((col_block_size, d), dtype=acc_dtype)
+    out_buf = np.empty(block_size * col_block_size, dtype=acc_dtype)
+    for col in range(0, len(mat2), col_block_size):
+        cols = cols_buf[:len(mat2[col:col + col_block_size])]
+        np.copyto(cols, mat2[col:col + col_block_size])
+        for start in range(0, len(mat1), block_size):
+            rows = rows_buf[:len(mat1[start:start + block_size])]
+            np.copyto(rows, mat1[start:start + block_size])
+            block = out_buf[:len(rows) * len(cols)].reshape(len(rows), len(cols))
+            yield start, col, np.dot(rows, cols.T, out=block)
+
+
+def _collect(blocks: Iterator[Tuple[int, int, np.ndarray]],
+             shape: Tuple[int, int],
+             top_k: Optional[int]) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    write the similarity blocks into a matrix, or keep a running top-k per row
+    """
+    if top_k is None:
+        output = np.empty(shape, dtype=np.float32)
+        for start, col, block in blocks:
+            output[start:start + len(block), col:col + block.shape[1]] = block
+        return output
+
+    top_k = min(top_k, shape[1])
+    best_sim = np.full((shape[0], top_k), -np.inf, dtype=np.float32)
+    best_idx = np.zeros((shape[0], top_k), dtype=np.int64)
+    for start, col, block in blocks:
+        end = start + len(block)
+        best_sim[start:end], best_idx[start:end] = merge_topk(best_sim[start:end], best_idx[start:end], block, col)
+    order = np.argsort(-best_sim, axis=1, kind='stable')
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_sim, order, axis=1)
+
+
+def cos_sim_fp16(mat1: np.ndarray,
+                 mat2: Optional[np.ndarray] = None,
+                 block_size: int = 4096,
+                 col_block_size: int = 16384,
+                 top_k: Optional[int] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    similarity matrix of float16 unit vectors, computed in row and column blocks with float32 accumulation
+    :param mat1:  float16 array of shape (M, d)
+    :param mat2:  float16 array of shape (N, d), None for mat1
+    :param block_size:  number of rows converted to float32 at once
+    :param col_block_size:  number of mat2 rows converted to float32 at once
+    :param top_k:  return the top_k most similar columns of each row instead of the matrix, the (M, N) matrix is
+                   never built. with mat2 None each row finds itself first
+    :return:  float32 similarity matrix of shape (M, N), or (int64 column indices, float32 similarities) of shape
+              (M, top_k) sorted by decreasing similarity
+    """
+    mat2 = mat1 if mat2 is None else mat2
+    blocks = _sim_blocks(mat1, mat2, np.float32, block_size, col_block_size)
+    return _collect(blocks, (len(mat1), len(mat2)), top_k)
+
+
+def cos_sim_int8(q1: np.ndarray,
+                 scales1: np.ndarray,
+                 q2: Optional[np.ndarray] = None,
+                 scales2: Optional[np.ndarray] = None,
+                 block_size: int = 4096,
+                 col_block_size: int = 16384,
+                 top_k: Optional[int] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    similarity matrix of int8 quantized vectors, computed in row and column blocks.
+    integer dot products are accumulated with BLAS in float32 when that is exact (d <= 1040), otherwise in float64,
+    which stays exact and about 2x slower, numpy has no BLAS for int32
+    :param q1:  int8 array of shape (M, d)
+    :param scales1:  scales of shape (M,)
+    :param q2:  int8 array of shape (N, d), None for q1
+    :param scales2:  scales of shape (N,), None for scales1
+    :param block_size:  number of rows processed at once
+    :param col_block_size:  number of q2 rows converted at once
+    :param top_k:  return the top_k most similar columns of each row instead of the matrix, see cos_sim_fp16
+    :return:  float32 similarity matrix of shape (M, N), or (column indices, similarities) of shape (M, top_k)
+    """
+    if q2 is None:
+        q2, scales2 = q1, scales1
+    acc_dtype = np.float32 if q1.shape[1] <= _FLOAT32_EXACT_DIM else np.float64
+
+    def scaled(blocks):
+        for start, col, block in blocks:
+            block *= scales1[start:start + len(block), np.newaxis]
+            block *= scales2[np.newaxis, col:col + block.shape[1]]
+            yield start, col, block
+
+    blocks = _sim_blocks(q1, q2, acc_dtype, block_size, col_block_size)
+    return _collect(scaled(blocks), (len(q1), len(q2)), top_k)
+
+
+def _topk(sims: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-sims, k - 1, axis=1)[:, :k]
+
+
+def quantization_report(features: np.ndarray,
+                        num_queries: int = 1000,
+                        k: int = 10,
+                        seed: int = 0) -> Dict[str, dict]:
+    """
+    measure the accuracy loss of float16 and int8 storage against exact float32 cosine similarity
+    :param features:  gallery features of shape (N, d)
+    :param num_queries:  number of gallery rows used as queries
+    :param k:  k of recall@k, the fraction of the exact top-k neighbours found by the quantized top-k
+    :param seed:  random seed for the query sample
+    :return:  {"fp16": {...}, "int8": {...}} with max_abs_err, mean_abs_err, recall@k and bytes_per_vector
+    """
+    unit = _unit(features)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(unit), min(num_queries, len(unit)), replace=False)
+    k = min(k, len(unit) - 1)
+
+    exact = np.dot(unit[queries], unit.T)
+    exact[np.arange(len(queries)), queries] = -np.inf
+    exact_topk = _topk(exact, k)
+
+    fp16 = quantize_fp16(unit, normalize=False)
+    q, scales = quantize_int8(unit, normalize=False)
+    approx = {
+        'fp16': (cos_sim_fp16(fp16[queries], fp16), fp16.shape[1] * 2),
+        'int8': (cos_sim_int8(q[queries], scales[queries], q, scales), q.shape[1] + 4),
+    }
+
+    report = {}
+    finite = np.isfinite(exact)
+    for name, (sims, num_bytes) in approx.items():
+        error = np.abs(sims - exact)[finite]
+        sims[np.arange(len(queries)), queries] = -np.inf
+        hits = [len(np.intersect1d(a, b)) for a, b in zip(exact_topk, _topk(sims, k))]
+        report[name] = {
+            'max_abs_err': float(error.max()),
+            'mean_abs_err': float(error.mean()),
+            'recall@{}'.format(k): float(np.sum(hits)) / (k * len(queries)),
+            'bytes_per_vector': num_bytes,
+            'compression_vs_float32': unit.shape[1] * 4 / num_bytes,
+        }
+    return report
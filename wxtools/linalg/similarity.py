@@ -3,9 +3,21 @@ Project: wxtools
 Author: Terance Jiang
 Date: 1/16/2024
 """""""""""""""""""""""""""""
+from typing import Dict, Optional, Tuple, Union
+
 import numpy as np
 from tqdm import tqdm
 
+from wxtools.linalg.group_clean import offsets_from_dict, group_centroids, group_rows
+
+# (id_a, id_b, i, j, sim) records returned by feature_cross_sims_centroid
+CROSS_SIM_DTYPE = np.dtype([('id_a', np.int64), ('id_b', np.int64), ('i', np.int64), ('j', np.int64),
+                            ('sim', np.float32)])
+
+# memory budget of the similarity block of centroid_candidates, and the smallest row block it uses
+CANDIDATE_BLOCK_BYTES = 1 << 28
+CANDIDATE_MIN_ROWS = 256
+
 
 def base_cos_sim(vec1: np.ndarray, vec2: np.ndarray) -> float:
     """
@@ -95,31 +107,158 @@ def feature_cross_sims(mat_dict, threshold=0.9):
     """
     features = []
     id_indices = []
-    id_keys = []
-    feature_indices = []
     output = {}
 
     for idx, (key, val) in tqdm(enumerate(mat_dict.items())):
-        for feature_id, feature in enumerate(val):
+        for feature in val:
             features.append(feature)  # feature is a vector
             id_indices.append(idx)  # id_indices is a list of id index
-            feature_indices.append(feature_id)  # feature_indices is a list of feature index
-            id_keys.append(key)  # id_keys is a list of id
     features = np.vstack(features)
 
     similarity_matrix = mat_cos_sim(features)
 
-    for i, id1 in tqdm(id_keys):
-        for j, id2 in enumerate(id_keys):
+    id_indices = np.array(id_indices)
+    keys = list(mat_dict.keys())
+    for i, id1 in tqdm(enumerate(keys), total=len(keys)):
+        for j, id2 in enumerate(keys):
             if i != j:
-                mask_i = np.array(id_indices) == i
-                mask_j = np.array(id_indices) == j
+                mask_i = id_indices == i
+                mask_j = id_indices == j
                 cos_similarities = similarity_matrix[np.ix_(mask_i, mask_j)]
 
                 # Filtering based on threshold
                 high_similarity_indices = np.where(cos_similarities > threshold)
-                feature_pairs = [(feature_indices[x], feature_indices[y]) for x, y in zip(*high_similarity_indices)]
+                feature_pairs = [(int(x), int(y)) for x, y in zip(*high_similarity_indices)]
                 if feature_pairs:
                     output[(id1, id2)] = feature_pairs
 
     return output
+
+
+def merge_topk(best_sim: np.ndarray,
+               best_idx: np.ndarray,
+               block: np.ndarray,
+               offset: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    merge a column block of similarities into a running per-row top-k, partitioning the block directly
+    :param best_sim:  running top-k similarities of shape (M, k), -inf where empty
+    :param best_idx:  column indices of best_sim, shape (M, k)
+    :param block:  similarities of shape (M, n) of the columns offset to offset + n
+    :param offset:  index of the first column of the block
+    :return:  (best_sim, best_idx) of shape (M, k), unordered within a row
+    """
+    k = best_sim.shape[1]
+    if block.shape[1] > k:
+        idx = np.argpartition(block, -k, axis=1)[:, -k:]
+        block = np.take_along_axis(block, idx, axis=1)
+    else:
+        idx = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+    merged_sim = np.concatenate([best_sim, block], axis=1)
+    merged_idx = np.concatenate([best_idx, idx + offset], axis=1)
+    keep = np.argpartition(merged_sim, -k, axis=1)[:, -k:]
+    return np.take_along_axis(merged_sim, keep, axis=1), np.take_along_axis(merged_idx, keep, axis=1)
+
+
+def centroid_candidates(centroids: np.ndarray,
+                        top_k: int = 10,
+                        min_sim: Optional[float] = None,
+                        block_size: Optional[int] = None,
+                        max_bytes: int = CANDIDATE_BLOCK_BYTES) -> np.ndarray:
+    """
+    candidate identity pairs from a top-k search over unit-norm centroids.
+    a block of rows is compared with the centroids one column block at a time, keeping a running top-k per row,
+    so at most max_bytes of similarities exist at once whatever the number of identities.
+    :param centroids:  unit-norm centroids of shape (K, d)
+    :param top_k:  number of nearest identities kept per identity
+    :param min_sim:  optional minimal centroid similarity of a candidate pair
+    :param block_size:  number of centroids searched at once, None to derive it from K and max_bytes
+    :param max_bytes:  memory budget of a block of similarities and their partition indices
+    :return:  unique pairs (a, b) with a < b, shape (P, 2)
+    """
+    num_ids = len(centroids)
+    top_k = min(top_k, num_ids - 1)
+    if top_k <= 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    dtype = np.result_type(centroids.dtype, np.float32)
+    # a similarity and its int64 partition index
+    entry_bytes = dtype.itemsize + 8
+    if block_size is None:
+        # whole rows when they fit the budget, otherwise a fixed row block and several column blocks
+        block_size = min(num_ids, max(CANDIDATE_MIN_ROWS, max_bytes // (entry_bytes * num_ids)))
+    col_block = min(num_ids, max(top_k, max_bytes // (entry_bytes * block_size)))
+
+    pairs = []
+    for start in range(0, num_ids, block_size):
+        rows = np.arange(start, min(start + block_size, num_ids))
+        best_sim = np.full((len(rows), top_k), -np.inf, dtype=dtype)
+        best_idx = np.zeros((len(rows), top_k), dtype=np.int64)
+        for col in range(0, num_ids, col_block):
+            block = np.dot(centroids[rows], centroids[col:col + col_block].T)
+            own = rows[(rows >= col) & (rows < col + len(block[0]))]
+            block[own - start, own - col] = -np.inf
+            best_sim, best_idx = merge_topk(best_sim, best_idx, block, col)
+
+        a = np.repeat(rows, top_k)
+        b = best_idx.ravel()
+        if min_sim is not None:
+            keep = best_sim.ravel() >= min_sim
+            a, b = a[keep], b[keep]
+        pairs.append(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1))
+
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def feature_cross_sims_centroid(features: Union[np.ndarray, Dict[str, np.ndarray]],
+                                offsets: Optional[np.ndarray] = None,
+                                threshold: float = 0.9,
+                                top_k: int = 10,
+                                centroid_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    two stage variant of feature_cross_sims for many identities.
+    identity centroids are searched first (top-k per identity), and samples are only compared exactly
+    for the candidate identity pairs, instead of comparing all samples of all identities.
+    pairs of identities that are not among each other's top_k nearest centroids are missed, raise top_k for recall.
+
+    such as:
+        features, offsets, ids = offsets_from_dict(mat_dict)
+        pairs = feature_cross_sims_centroid(features, offsets, threshold=0.8)
+        for id_a, id_b, i, j, sim in pairs: mat_dict[ids[id_a]][i] is similar to mat_dict[ids[id_b]][j]
+
+    :param features:  features of shape (N, d) sorted by identity, or a dict {id: np.array n*x}
+    :param offsets:  CSR identity offsets of shape (K + 1,), None if features is a dict
+    :param threshold:  sample similarity threshold
+    :param top_k:  number of candidate identities per identity
+    :param centroid_threshold:  optional minimal centroid similarity of a candidate identity pair
+    :return:  structured array with fields (id_a, id_b, i, j, sim), id_a < id_b, i and j index within each identity
+    """
+    if isinstance(features, dict):
+        features, offsets, _ = offsets_from_dict(features)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    normed = np.asarray(features, dtype=np.float32)
+    normed = normed / np.linalg.norm(normed, axis=1, keepdims=True)
+    candidates = centroid_candidates(group_centroids(normed, offsets), top_k, centroid_threshold)
+
+    output = []
+    # one matmul per identity against the samples of all its candidates
+    starts = np.searchsorted(candidates[:, 0], np.arange(len(offsets)), side='left')
+    for a in tqdm(np.unique(candidates[:, 0])):
+        others = candidates[starts[a]:starts[a + 1], 1]
+        rows, owner = group_rows(offsets, others)
+        sims = np.dot(normed[offsets[a]:offsets[a + 1]], normed[rows].T)
+        i, k = np.nonzero(sims > threshold)
+        if len(i) == 0:
+            continue
+
+        records = np.zeros(len(i), dtype=CROSS_SIM_DTYPE)
+        records['id_a'] = a
+        records['id_b'] = others[owner[k]]
+        records['i'] = i
+        records['j'] = rows[k] - offsets[records['id_b']]
+        records['sim'] = sims[i, k]
+        output.append(records)
+
+    if not output:
+        return np.zeros(0, dtype=CROSS_SIM_DTYPE)
+    return np.concatenate(output)
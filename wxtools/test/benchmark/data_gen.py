@@ -0,0 +1,95 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SEED = 0
+
+
+def make_file_tree(root: str,
+                   num_dirs: int,
+                   files_per_dir: int,
+                   depth: int = 2,
+                   file_size: int = 1024,
+                   extensions: Tuple[str, ...] = ('.jpg', '.png', '.txt')) -> List[str]:
+    """
+    create a synthetic file tree root/d0/.../d{depth-1}/file
+    :param root:  root directory
+    :param num_dirs:  number of leaf directories
+    :param files_per_dir:  number of files per leaf directory
+    :param depth:  depth of the leaf directories
+    :param file_size:  file size in bytes
+    :param extensions:  file extensions, used round robin
+    :return:  list of created file paths
+    """
+    rng = np.random.default_rng(SEED)
+    content = rng.integers(0, 256, file_size, dtype=np.uint8).tobytes()
+    paths = []
+    for d in range(num_dirs):
+        parts = ['id{:05d}'.format(d)] + ['sub{}'.format(level) for level in range(depth - 1)]
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        for f in range(files_per_dir):
+            path = os.path.join(directory, '{:06d}{}'.format(f, extensions[f % len(extensions)]))
+            with open(path, 'wb') as fp:
+                fp.write(content)
+            paths.append(path)
+    return paths
+
+
+def make_bin_frames(root: str, num_frames: int, img_size: Tuple[int, int] = (600, 800)) -> List[str]:
+    """
+    create raw .bin frames as consumed by bin2img
+    :param root:  output directory
+    :param num_frames:  number of frames
+    :param img_size:  frame size in (width, height)
+    :return:  list of created .bin paths
+    """
+    rng = np.random.default_rng(SEED)
+    os.makedirs(root, exist_ok=True)
+    width, height = img_size
+    frame = rng.integers(0, 256, width * height, dtype=np.uint8)
+    paths = []
+    for idx in range(num_frames):
+        path = os.path.join(root, '{:06d}.bin'.format(idx))
+        frame.tofile(path)
+        paths.append(path)
+    return paths
+
+
+def make_images(num_images: int, height: int, width: int, channel: int = 3) -> np.ndarray:
+    """
+    create smooth random uint8 images
+    :param num_images:  number of images
+    :param height:  image height
+    :param width:  image width
+    :param channel:  number of channels, 1 for (n, h, w) grayscale images
+    :return:  uint8 array of shape (n, h, w, c) or (n, h, w)
+    """
+    rng = np.random.default_rng(SEED)
+    shape = (num_images, height, width) + ((channel,) if channel > 1 else ())
+    base = rng.integers(0, 256, shape, dtype=np.uint8)
+    # a ramp keeps the images from being pure noise, which matters for blur based kernels
+    ramp = np.linspace(0, 64, width, dtype=np.float32).astype(np.uint8)
+    ramp = ramp.reshape((1, 1, width) + ((1,) if channel > 1 else ()))
+    return (base // 2 + ramp).astype(np.uint8)
+
+
+def make_embeddings(num_ids: int, per_id: int, dim: int = 512, noise: float = 0.3) -> Dict[str, np.ndarray]:
+    """
+    create clustered embeddings, one cluster per identity
+    :param num_ids:  number of identities
+    :param per_id:  number of samples per identity
+    :param dim:  feature dimension
+    :param noise:  within-identity noise level
+    :return:  dict of {id: float32 array of shape (per_id, dim)}
+    """
+    rng = np.random.default_rng(SEED)
+    centers = rng.standard_normal((num_ids, dim)).astype(np.float32)
+    samples = centers[:, np.newaxis, :] + noise * rng.standard_normal((num_ids, per_id, dim)).astype(np.float32)
+    return {'id{:06d}'.format(i): samples[i] for i in range(num_ids)}
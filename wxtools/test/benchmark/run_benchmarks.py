@@ -0,0 +1,203 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from wxtools.cv.bin2png import bin2img
+from wxtools.cv.img_quality import contrast_boost
+from wxtools.cv.img_utils import preprocess_2gray
+from wxtools.io_utils import list_files_mlpro, copy_file_mlpro
+from wxtools.linalg.similarity import mat_cos_sim, feature_cross_sims
+from wxtools.logger.utils import colorstr
+from wxtools.test.benchmark.data_gen import make_file_tree, make_bin_frames, make_images, make_embeddings
+
+# example:
+#   python -m wxtools.test.benchmark.run_benchmarks --scales small medium --save-baseline
+#   python -m wxtools.test.benchmark.run_benchmarks --scales small medium --compare
+# baselines/baseline.json holds the small scale, recorded on a single cpu, save a new one for your machine
+
+SCALES = ('small', 'medium', 'large')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'baseline.json')
+PROCESS_NUM = min(8, multiprocessing.cpu_count())
+
+
+def bench_list_files(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_dirs, files_per_dir = {'small': (10, 50), 'medium': (50, 200), 'large': (200, 500)}[scale]
+    root = os.path.join(work_dir, 'tree')
+    make_file_tree(root, num_dirs, files_per_dir)
+    return lambda: list_files_mlpro(root, process_num=PROCESS_NUM, max_depth=1), num_dirs * files_per_dir
+
+
+def bench_copy_files(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_dirs, files_per_dir = {'small': (10, 50), 'medium': (50, 100), 'large': (100, 200)}[scale]
+    src_root = os.path.join(work_dir, 'src')
+    paths = make_file_tree(src_root, num_dirs, files_per_dir, file_size=64 * 1024)
+    file_list = [os.path.relpath(x, src_root) for x in paths]
+    counter = iter(range(sys.maxsize))
+
+    def run():
+        # a fresh destination per repeat, copy_worker skips existing files
+        copy_file_mlpro(file_list, src_root, os.path.join(work_dir, 'dst{}'.format(next(counter))), PROCESS_NUM)
+
+    return run, len(paths)
+
+
+def bench_bin2img(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_frames = {'small': 20, 'medium': 100, 'large': 400}[scale]
+    paths = make_bin_frames(os.path.join(work_dir, 'bin'), num_frames)
+    output_dst = os.path.join(work_dir, 'png')
+    return lambda: bin2img(paths, img_size=(600, 800), output_dst=output_dst), num_frames
+
+
+def bench_preprocess_2gray(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_images = {'small': 100, 'medium': 500, 'large': 2000}[scale]
+    images = make_images(num_images, 480, 640)
+    return lambda: [preprocess_2gray(x, (112, 112)) for x in images], num_images
+
+
+def bench_mat_cos_sim(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_rows = {'small': 1000, 'medium': 4000, 'large': 10000}[scale]
+    features = np.concatenate(list(make_embeddings(num_rows // 10, 10).values()))
+    return lambda: mat_cos_sim(features), num_rows
+
+
+def bench_feature_cross_sims(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    num_ids = {'small': 20, 'medium': 60, 'large': 150}[scale]
+    mat_dict = make_embeddings(num_ids, 10)
+    return lambda: feature_cross_sims(mat_dict, threshold=0.9), num_ids * 10
+
+
+def bench_contrast_boost(work_dir: str, scale: str) -> Tuple[Callable, int]:
+    size = {'small': 512, 'medium': 1024, 'large': 2048}[scale]
+    img = make_images(1, size, size, channel=1)[0]
+    return lambda: (contrast_boost(img, 1), contrast_boost(img, 2)), size * size
+
+
+BENCHMARKS = {
+    'list_files_mlpro': bench_list_files,
+    'copy_file_mlpro': bench_copy_files,
+    'bin2img': bench_bin2img,
+    'preprocess_2gray': bench_preprocess_2gray,
+    'mat_cos_sim': bench_mat_cos_sim,
+    'feature_cross_sims': bench_feature_cross_sims,
+    'contrast_boost': bench_contrast_boost,
+}
+
+
+def environment_info() -> dict:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+    }
+
+
+def run_benchmarks(names: List[str], scales: List[str], repeat: int = 3) -> Dict[str, dict]:
+    """
+    run benchmarks, each (benchmark, scale) pair gets its own synthetic data in a temporary directory
+    :param names:  benchmark names, see BENCHMARKS
+    :param scales:  scales to run, see SCALES
+    :param repeat:  number of timed runs, the first run is preceded by an untimed warm-up
+    :return:  dict of {"name/scale": {"min": s, "median": s, "items": n, "items_per_s": x}}
+    """
+    results = {}
+    for name in names:
+        for scale in scales:
+            work_dir = tempfile.mkdtemp(prefix='wxtools_bench_')
+            try:
+                run, items = BENCHMARKS[name](work_dir, scale)
+                run()
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            key = '{}/{}'.format(name, scale)
+            results[key] = {'min': min(times), 'median': float(np.median(times)),
+                            'items': items, 'items_per_s': items / min(times)}
+            print(colorstr('green', '{:<32} {:>10.4f}s {:>14.1f} items/s'.format(key, min(times), items / min(times))))
+    return results
+
+
+def compare_results(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = 0.2) -> List[str]:
+    """
+    compare results with a baseline, a benchmark regresses if its min time is more than (1 + tolerance) x baseline
+    :param results:  current results
+    :param baseline:  baseline results
+    :param tolerance:  allowed relative slowdown
+    :return:  list of regressed benchmark keys
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result['min'] / baseline[key]['min']
+        color = 'red' if ratio > 1 + tolerance else 'green'
+        print(colorstr(color, '{:<32} {:>6.2f}x baseline'.format(key, ratio)))
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark wxtools io_utils, cv and linalg hot paths.')
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument('--scales', nargs='+', default=['small'], choices=SCALES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=str, default=None, help='Write results to this json file')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Baseline json file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare the results with the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.scales, args.repeat)
+    report = {'environment': environment_info(), 'results': results}
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {'environment': report['environment'], 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # merge, so that scales can be recorded in separate runs
+        baseline['environment'] = report['environment']
+        baseline['results'].update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(colorstr('red', 'Regressions: {}'.format(', '.join(regressions))))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
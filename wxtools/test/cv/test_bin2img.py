@@ -90,7 +90,7 @@ class TestBin2Img(TestCase):
     def test_incorrect_size(self):
         # Test with incorrect size parameter
         with self.assertRaises(ValueError):
-            bin2img(self.valid_image_path, size=(100, 100))
+            bin2img(self.valid_image_path, img_size=(1000, 1000))
 
 
 if __name__ == "__main__":
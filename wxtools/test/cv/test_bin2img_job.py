@@ -0,0 +1,57 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.cv.bin2png import Bin2ImgJob
+
+
+class TestBin2ImgJob(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.temp_dir, 'bins')
+        self.dst = os.path.join(self.temp_dir, 'png')
+        os.makedirs(self.src)
+        for idx in range(20):
+            np.full((8, 6), idx, dtype=np.uint8).tofile(os.path.join(self.src, '{:02d}.bin'.format(idx)))
+        # truncated frame
+        np.zeros(10, dtype=np.uint8).tofile(os.path.join(self.src, 'broken.bin'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_run_with_progress(self):
+        progress = []
+        job = Bin2ImgJob(self.src, self.dst, img_size=(6, 8), num_workers=3, chunksize=4,
+                         progress_callback=lambda processed, total: progress.append((processed, total)))
+        result = job.start().wait(timeout=30)
+        self.assertEqual(result['converted'], 20)
+        self.assertEqual([os.path.basename(x[0]) for x in result['failed']], ['broken.bin'])
+        self.assertFalse(result['cancelled'])
+        self.assertEqual(progress[-1], (21, 21))
+        self.assertEqual(len(os.listdir(self.dst)), 20)
+
+    def test_cancel(self):
+        job = Bin2ImgJob(self.src, self.dst, img_size=(6, 8), num_workers=1, chunksize=1)
+        job.progress_callback = lambda processed, total: job.cancel()
+        result = job.run()
+        self.assertTrue(result['cancelled'])
+        self.assertLess(result['converted'], 20)
+
+    def test_headless_import(self):
+        # importing bin2png must not import tkinter
+        code = 'import sys, wxtools.cv.bin2png; assert "tkinter" not in sys.modules'
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
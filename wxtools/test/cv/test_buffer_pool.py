@@ -0,0 +1,70 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.cv.bin2png import bin2img
+from wxtools.cv.buffer_pool import BufferPool
+from wxtools.cv.img_utils import preprocess_2gray, draw_bbox, draw_landmarks
+
+
+class TestBufferPool(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = rng.integers(0, 256, (3, 48, 64, 3), dtype=np.uint8)
+
+    def test_pool_reuses_buffers(self):
+        pool = BufferPool()
+        a = pool.get('a', (4, 5), np.float32)
+        self.assertIs(pool.get('a', (4, 5), np.float32), a)
+        self.assertIsNot(pool.get('b', (4, 5), np.float32), a)
+        self.assertIsNot(pool.get('a', (4, 5), np.uint8), a)
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(pool.nbytes, 80 + 80 + 20)
+
+    def test_preprocess_2gray_out(self):
+        pool = BufferPool()
+        batch = np.empty((3, 1, 28, 32), dtype=np.float32)
+        for idx, frame in enumerate(self.frames):
+            result = preprocess_2gray(frame, (32, 28), out=batch[idx:idx + 1], pool=pool)
+            self.assertTrue(np.shares_memory(result, batch))
+            np.testing.assert_array_equal(result, preprocess_2gray(frame, (32, 28)))
+        num_buffers = len(pool)
+
+        result = preprocess_2gray(self.frames[0], (32, 28), pool=pool)
+        self.assertIs(preprocess_2gray(self.frames[1], (32, 28), pool=pool), result)
+        self.assertEqual(len(pool), num_buffers + 1)
+
+    def test_draw_dst(self):
+        dst = np.empty_like(self.frames[0])
+        original = self.frames[0].copy()
+        result = draw_landmarks(self.frames[0], [(10, 10), (20, 30)], dst=dst)
+        self.assertIs(result, dst)
+        np.testing.assert_array_equal(self.frames[0], original)
+        self.assertIs(draw_bbox(self.frames[0], [1, 2, 20, 30], dst=dst), dst)
+
+    def test_bin2img_out(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            paths = []
+            for idx, frame in enumerate(self.frames):
+                paths.append(os.path.join(temp_dir, '{}.bin'.format(idx)))
+                frame.tofile(paths[-1])
+            out = np.empty((3, 48, 64, 3), dtype=np.uint8)
+            result = bin2img(paths, img_size=(64, 48), channel=3, out=out)
+            np.testing.assert_array_equal(out, self.frames)
+            self.assertTrue(all(np.shares_memory(x, out) for x in result))
+            np.testing.assert_array_equal(np.stack(bin2img(paths, img_size=(64, 48), channel=3)), self.frames)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
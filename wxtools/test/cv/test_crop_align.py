@@ -0,0 +1,80 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.buffer_pool import BufferPool
+from wxtools.cv.crop_align import FIVE_POINT_TEMPLATE, box_matrices, crop_align, crops_2gray
+from wxtools.cv.geometry import invert_affine, rotation_matrices, transform_points
+from wxtools.cv.img_utils import preprocess_2gray
+
+
+class TestCropAlign(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = rng.integers(0, 256, (2, 240, 320, 3), dtype=np.uint8)
+        self.boxes = np.array([[10, 20, 110, 140], [200, 50, 260, 90], [0, 0, 320, 240]], dtype=np.float64)
+
+    def test_box_crops(self):
+        image_index = np.array([0, 1, 0])
+        crops, matrices = crop_align(self.frames, boxes=self.boxes, size=(64, 64), image_index=image_index,
+                                     num_threads=2)
+        self.assertEqual(crops.shape, (3, 64, 64, 3))
+        for i in range(3):
+            expected = cv2.warpAffine(self.frames[image_index[i]], matrices[i], (64, 64))
+            np.testing.assert_array_equal(crops[i], expected)
+        box_center = transform_points(self.boxes.reshape(-1, 2, 2).mean(axis=1, keepdims=True), matrices)
+        np.testing.assert_allclose(box_center[:, 0], 32)
+
+        # a 60x40 box is padded to a square crop, or stretched without keep_aspect
+        np.testing.assert_allclose(box_matrices(self.boxes[1:2], (64, 64))[0, :, :2], np.diag([64 / 60] * 2))
+        np.testing.assert_allclose(box_matrices(self.boxes[1:2], (64, 64), keep_aspect=False)[0, :, :2],
+                                   np.diag([64 / 60, 64 / 40]))
+        np.testing.assert_allclose(box_matrices(self.boxes[1:2], (64, 64), margin=0.6)[0, :, :2],
+                                   np.diag([64 / 96] * 2))
+
+        xywh = self.boxes.copy()
+        xywh[:, 2:] -= xywh[:, :2]
+        np.testing.assert_allclose(box_matrices(xywh, (64, 64), xywh=True), box_matrices(self.boxes, (64, 64)))
+
+    def test_landmark_crops(self):
+        # faces rotated and scaled in the frame are aligned back onto the template
+        matrices = rotation_matrices([[160, 120], [150, 100]], [25, -40], [0.5, 0.8])
+        placed = invert_affine(matrices)
+        landmarks = transform_points(FIVE_POINT_TEMPLATE, placed)
+        crops, estimated = crop_align([self.frames[0]], landmarks=landmarks, image_index=[0, 0])
+        self.assertEqual(crops.shape, (2, 112, 112, 3))
+        np.testing.assert_allclose(transform_points(landmarks, estimated),
+                                   np.broadcast_to(FIVE_POINT_TEMPLATE, landmarks.shape), atol=1e-6)
+
+        out = np.empty((2, 224, 224, 3), dtype=np.uint8)
+        crops, estimated = crop_align([self.frames[0]], landmarks=landmarks, size=(224, 224),
+                                      image_index=[0, 0], out=out)
+        self.assertIs(crops, out)
+        np.testing.assert_allclose(transform_points(landmarks, estimated),
+                                   np.broadcast_to(FIVE_POINT_TEMPLATE * 2, landmarks.shape), atol=1e-6)
+
+    def test_empty(self):
+        crops, matrices = crop_align(self.frames, boxes=np.zeros((0, 4)), size=(32, 32), image_index=[])
+        self.assertEqual(crops.shape, (0, 32, 32, 3))
+        self.assertEqual(crops_2gray(crops).shape, (0, 1, 32, 32))
+        with self.assertRaises(ValueError):
+            crop_align(self.frames)
+
+    def test_crops_2gray(self):
+        crops, _ = crop_align(self.frames, boxes=self.boxes, size=(48, 32), image_index=[0, 1, 1])
+        pool = BufferPool()
+        for kwargs in ({}, {'pool': pool}, {'out': np.empty((3, 1, 32, 48), np.float32)}):
+            batch = crops_2gray(crops, **kwargs)
+            self.assertEqual(batch.shape, (3, 1, 32, 48))
+            for i in range(3):
+                np.testing.assert_array_equal(batch[i], preprocess_2gray(crops[i])[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
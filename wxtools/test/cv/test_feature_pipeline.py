@@ -0,0 +1,120 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from wxtools.cv.feature_pipeline import extract_features, STATUS_NAME, DONE, FAILED
+from wxtools.cv.img_utils import get_onnx_session, preprocess_2gray
+
+try:
+    import onnx
+    from onnx import helper, TensorProto, numpy_helper
+except ImportError:
+    onnx = None
+
+
+def make_linear_model(path: str, weight: np.ndarray) -> None:
+    """
+    write an onnx model computing flatten(x) @ weight
+    """
+    graph = helper.make_graph(
+        [helper.make_node('Flatten', ['x'], ['flat']), helper.make_node('MatMul', ['flat', 'w'], ['y'])],
+        'linear',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, ['n', 1, 16, 16])],
+        [helper.make_tensor_value_info('y', TensorProto.FLOAT, ['n', weight.shape[1]])],
+        [numpy_helper.from_array(weight, 'w')])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+@unittest.skipIf(onnx is None, 'onnx is required to build the test model')
+class DynamicOutputSession:
+    """
+    session whose output does not declare the feature dimension
+    """
+
+    def __init__(self, sess):
+        self.sess = sess
+
+    def get_inputs(self):
+        return self.sess.get_inputs()
+
+    def get_outputs(self):
+        return [SimpleNamespace(name=x.name, shape=[x.shape[0], 'd']) for x in self.sess.get_outputs()]
+
+    def run(self, *args, **kwargs):
+        return self.sess.run(*args, **kwargs)
+
+
+class TestExtractFeatures(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.weight = rng.standard_normal((256, 8)).astype(np.float32)
+        self.model_path = os.path.join(self.root, 'model.onnx')
+        make_linear_model(self.model_path, self.weight)
+
+        self.paths = []
+        for i in range(23):
+            path = os.path.join(self.root, 'images', '{}.png'.format(i))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cv2.imwrite(path, rng.integers(0, 256, (20, 24, 3), dtype=np.uint8))
+            self.paths.append(path)
+        self.paths.insert(5, os.path.join(self.root, 'images', 'missing.png'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def expected(self, path):
+        return (preprocess_2gray(cv2.imread(path), (16, 16)).reshape(1, -1) @ self.weight)[0]
+
+    def test_extract_and_resume(self):
+        output_dir = os.path.join(self.root, 'features')
+        features = extract_features(self.paths, self.model_path, output_dir, batch_size=4, size=(16, 16),
+                                    num_decode_threads=2, prefetch_batches=2)
+        self.assertEqual(features.shape, (len(self.paths), 8))
+        status = np.load(os.path.join(output_dir, STATUS_NAME))
+        self.assertEqual(status[5], FAILED)
+        for i, path in enumerate(self.paths):
+            if i != 5:
+                self.assertEqual(status[i], DONE)
+                np.testing.assert_allclose(features[i], self.expected(path), rtol=1e-4, atol=1e-4)
+
+        # resume after losing part of the results
+        status = np.load(os.path.join(output_dir, STATUS_NAME), mmap_mode='r+')
+        status[10:] = 0
+        status.flush()
+        features[10:] = 0
+        features.flush()
+        del status, features
+        features = extract_features(self.paths, self.model_path, output_dir, batch_size=4, size=(16, 16))
+        np.testing.assert_allclose(features[20], self.expected(self.paths[20]), rtol=1e-4, atol=1e-4)
+
+        with self.assertRaises(ValueError):
+            extract_features(self.paths[:-1], self.model_path, output_dir)
+
+    def test_leading_failures(self):
+        # whole batches of unreadable images before the first feature, across a periodic flush. the features are
+        # only allocated with the first output when the model does not declare their dimension
+        paths = [os.path.join(self.root, 'missing{}.png'.format(i)) for i in range(8)] + self.paths[:3]
+        output_dir = os.path.join(self.root, 'features_failed')
+        features = extract_features(paths, DynamicOutputSession(get_onnx_session(self.model_path)), output_dir,
+                                    batch_size=2, size=(16, 16),
+                                    num_decode_threads=1, flush_every=1)
+        status = np.load(os.path.join(output_dir, STATUS_NAME))
+        self.assertTrue(np.all(status[:8] == FAILED))
+        np.testing.assert_allclose(features[9], self.expected(paths[9]), rtol=1e-4, atol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.frame_source import VideoFrameSource, ImageFolderSource, BinSequenceSource
+
+
+class TestFrameSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.frames = rng.integers(0, 256, (10, 8, 6, 1), dtype=np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_bin_files(self):
+        for idx, frame in enumerate(self.frames):
+            frame.tofile(os.path.join(self.temp_dir, 'frame_{:02d}.bin'.format(idx)))
+
+        source = BinSequenceSource(self.temp_dir, img_size=(6, 8), num_buffers=2)
+        seen = [(idx, frame.copy()) for idx, frame in source]
+        self.assertEqual([x[0] for x in seen], list(range(10)))
+        np.testing.assert_array_equal(np.stack([x[1] for x in seen]), self.frames)
+
+        source = BinSequenceSource(self.temp_dir, img_size=(6, 8), stride=3, start=1)
+        batches = [(indices, batch.copy()) for indices, batch in source.batches(2)]
+        self.assertEqual([x[0].tolist() for x in batches], [[1, 4], [7]])
+        np.testing.assert_array_equal(batches[0][1], self.frames[[1, 4]])
+
+    def test_bin_stream_and_buffer_reuse(self):
+        path = os.path.join(self.temp_dir, 'stream.bin')
+        self.frames.tofile(path)
+
+        source = BinSequenceSource(path, img_size=(6, 8), max_frames=7, num_buffers=2)
+        views = []
+        for idx, frame in source:
+            np.testing.assert_array_equal(frame, self.frames[idx])
+            views.append(frame)
+        self.assertEqual(len(views), 7)
+        # frames are views into a ring of two buffers
+        self.assertTrue(np.shares_memory(views[0], views[2]))
+
+    def test_image_folder(self):
+        for idx, frame in enumerate(self.frames):
+            cv2.imwrite(os.path.join(self.temp_dir, '{:02d}.png'.format(idx)), frame)
+        with open(os.path.join(self.temp_dir, '99.png'), 'w') as f:
+            f.write('broken')
+
+        source = ImageFolderSource(self.temp_dir, read_flag=cv2.IMREAD_GRAYSCALE)
+        indices, batch = next(source.batches(16))
+        self.assertEqual(indices.tolist(), list(range(10)))
+        np.testing.assert_array_equal(batch, self.frames[..., 0])
+
+        source = ImageFolderSource(self.temp_dir, size=(3, 4), stride=2)
+        shapes = [(idx, frame.shape) for idx, frame in source]
+        self.assertEqual(shapes, [(idx, (4, 3, 3)) for idx in range(0, 10, 2)])
+
+    def test_video(self):
+        path = os.path.join(self.temp_dir, 'video.avi')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (32, 24))
+        if not writer.isOpened():
+            self.skipTest('no video writer available')
+        for idx in range(12):
+            writer.write(np.full((24, 32, 3), idx * 20, dtype=np.uint8))
+        writer.release()
+
+        seen = [(idx, int(frame.mean())) for idx, frame in VideoFrameSource(path, stride=4)]
+        self.assertEqual([x[0] for x in seen], [0, 4, 8])
+        for idx, mean in seen:
+            self.assertAlmostEqual(mean, idx * 20, delta=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
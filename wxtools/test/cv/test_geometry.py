@@ -0,0 +1,93 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.geometry import estimate_similarity, invert_affine, rotation_matrices, transform_points, \
+    warp_affine_batch
+from wxtools.cv.img_utils import rotate_point
+
+
+class TestGeometry(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.centers = rng.random((6, 2)) * 100
+        self.angles = rng.random(6) * 360 - 180
+        self.scales = rng.random(6) + 0.5
+        self.points = rng.random((6, 68, 2)) * 200
+        self.images = rng.integers(0, 256, (6, 120, 160, 3), dtype=np.uint8)
+
+    def test_rotation_matrices(self):
+        matrices = rotation_matrices(self.centers, self.angles, self.scales)
+        for i in range(len(matrices)):
+            expected = cv2.getRotationMatrix2D(tuple(self.centers[i]), self.angles[i], self.scales[i])
+            # opencv computes the angle in float32
+            np.testing.assert_allclose(matrices[i], expected, rtol=1e-6, atol=1e-5)
+        np.testing.assert_allclose(rotation_matrices(self.centers, 30)[:, :, :2],
+                                   np.broadcast_to(cv2.getRotationMatrix2D((0, 0), 30, 1)[:, :2], (6, 2, 2)))
+
+    def test_invert(self):
+        matrices = rotation_matrices(self.centers, self.angles, self.scales)
+        inverse = invert_affine(matrices)
+        for i in range(len(matrices)):
+            np.testing.assert_allclose(inverse[i], cv2.invertAffineTransform(matrices[i]), atol=1e-9)
+        np.testing.assert_allclose(invert_affine(matrices[0]), inverse[0])
+
+    def test_transform_points(self):
+        matrices = rotation_matrices(self.centers, self.angles, self.scales)
+        result = transform_points(self.points, matrices)
+        self.assertEqual(result.shape, self.points.shape)
+        for i in range(len(matrices)):
+            np.testing.assert_allclose(result[i], cv2.transform(self.points[i][np.newaxis], matrices[i])[0])
+            self.assertEqual(rotate_point(self.points[i, 0], matrices[i]), tuple(int(x) for x in result[i, 0]))
+
+        # one set of points through every matrix, and one matrix for every set of points
+        np.testing.assert_allclose(transform_points(self.points[0], matrices)[2],
+                                   transform_points(self.points[0], matrices[2]))
+        np.testing.assert_allclose(transform_points(self.points, matrices[1])[1], result[1])
+
+        out = np.empty_like(self.points)
+        self.assertIs(transform_points(self.points, matrices, out=out), out)
+        np.testing.assert_allclose(out, result)
+
+    def test_estimate_similarity(self):
+        matrices = rotation_matrices(self.centers, self.angles, self.scales)
+        dst = transform_points(self.points, matrices)
+        np.testing.assert_allclose(estimate_similarity(self.points, dst), matrices, atol=1e-8)
+
+        # a shared template, compared with opencv on noisy points
+        noisy = self.points + np.random.default_rng(1).normal(0, 2, self.points.shape)
+        template = dst[0]
+        estimated = estimate_similarity(noisy, template)
+        for i in range(len(noisy)):
+            residual = np.linalg.norm(transform_points(noisy[i], estimated[i]) - template, axis=1).mean()
+            expected, _ = cv2.estimateAffinePartial2D(noisy[i], template, method=cv2.LMEDS)
+            reference = np.linalg.norm(transform_points(noisy[i], expected) - template, axis=1).mean()
+            self.assertLessEqual(residual, reference + 1e-6)
+
+        rigid = estimate_similarity(self.points, dst, estimate_scale=False)
+        np.testing.assert_allclose(np.linalg.det(rigid[:, :, :2]), 1)
+
+    def test_warp_affine_batch(self):
+        matrices = rotation_matrices(self.centers, self.angles, self.scales)
+        for num_threads in (1, 4):
+            warped = warp_affine_batch(self.images, matrices, (64, 48), num_threads=num_threads)
+            self.assertEqual(warped.shape, (6, 48, 64, 3))
+            for i in range(len(matrices)):
+                np.testing.assert_array_equal(warped[i], cv2.warpAffine(self.images[i], matrices[i], (64, 48)))
+
+        # images of different sizes and a gray buffer with a channel axis
+        gray = [self.images[0, :, :, 0], self.images[1, :100, :90, 1]]
+        out = np.zeros((2, 48, 64, 1), dtype=np.uint8)
+        self.assertIs(warp_affine_batch(gray, matrices[:2], (64, 48), out=out), out)
+        for i in range(2):
+            np.testing.assert_array_equal(out[i, :, :, 0], cv2.warpAffine(gray[i], matrices[i], (64, 48)))
+
+
+if __name__ == '__main__':
+    unittest.main()
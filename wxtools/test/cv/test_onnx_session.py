@@ -0,0 +1,72 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.cv.img_utils import get_onnx_session, init_onnx_worker, clear_onnx_sessions, infer_onnx_model, \
+    _ONNX_SESSIONS
+from wxtools.utils.mlpro_utils import run_mlpro
+
+try:
+    import onnx
+    from wxtools.test.cv.test_feature_pipeline import make_linear_model
+except ImportError:
+    onnx = None
+
+
+def session_worker(batch):
+    model_path, options, x = batch
+    # number of sessions created in this worker before the task, 1 if the initializer loaded the model
+    cached = len(_ONNX_SESSIONS)
+    return cached, infer_onnx_model(get_onnx_session(model_path, **options), x)[0]
+
+
+@unittest.skipIf(onnx is None, 'onnx is required to build the test model')
+class TestOnnxSession(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.weight = np.random.default_rng(0).standard_normal((256, 8)).astype(np.float32)
+        self.model_path = os.path.join(self.root, 'model.onnx')
+        make_linear_model(self.model_path, self.weight)
+        self.x = np.random.default_rng(1).standard_normal((3, 1, 16, 16)).astype(np.float32)
+        clear_onnx_sessions()
+
+    def tearDown(self):
+        clear_onnx_sessions()
+        shutil.rmtree(self.root)
+
+    def test_cache(self):
+        sess = get_onnx_session(self.model_path, warmup_shapes=[(4, 1, 16, 16)])
+        self.assertIs(get_onnx_session(self.model_path), sess)
+        self.assertIsNot(get_onnx_session(self.model_path, intra_op_num_threads=1), sess)
+        np.testing.assert_allclose(infer_onnx_model(sess, self.x)[0], self.x.reshape(3, -1) @ self.weight, rtol=1e-5)
+
+    def test_optimized_model(self):
+        optimized_path = os.path.join(self.root, 'model.opt.onnx')
+        expected = infer_onnx_model(get_onnx_session(self.model_path, optimized_model_path=optimized_path), self.x)
+        self.assertTrue(os.path.exists(optimized_path))
+        self.assertEqual([x for x in os.listdir(self.root) if x.endswith('.tmp')], [])
+
+        clear_onnx_sessions()
+        sess = get_onnx_session(self.model_path, optimized_model_path=optimized_path)
+        np.testing.assert_allclose(infer_onnx_model(sess, self.x)[0], expected[0], rtol=1e-6)
+
+    def test_initializer(self):
+        options = dict(intra_op_num_threads=1)
+        tasks = [(self.model_path, options, self.x)] * 6
+        results = run_mlpro(session_worker, tasks, 2, initializer=init_onnx_worker,
+                            initargs=(self.model_path, dict(options, warmup_shapes=[(3, 1, 16, 16)])))
+        self.assertEqual([cached for cached, _ in results], [1] * 6)
+        for _, output in results:
+            np.testing.assert_allclose(output, self.x.reshape(3, -1) @ self.weight, rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.phash import hash_images, compute_image_hashes, find_near_duplicates, hamming_distance
+
+
+class TestPHash(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        base = cv2.GaussianBlur(rng.integers(0, 256, (64, 64), dtype=np.uint8), (0, 0), 4)
+        self.image = cv2.resize(base, (256, 256))
+        self.other = cv2.resize(cv2.GaussianBlur(rng.integers(0, 256, (64, 64), dtype=np.uint8), (0, 0), 4),
+                                (256, 256))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_resized_copy_is_near_duplicate(self):
+        for method in ('phash', 'dhash'):
+            hashes = hash_images([self.image, cv2.resize(self.image, (180, 180)), self.other], method)
+            self.assertLessEqual(int(hamming_distance(hashes[0], hashes[1])), 4)
+            self.assertGreater(int(hamming_distance(hashes[0], hashes[2])), 10)
+
+    def test_compute_image_hashes(self):
+        paths = [os.path.join(self.temp_dir, '{}.jpg'.format(i)) for i in range(3)]
+        cv2.imwrite(paths[0], self.image)
+        cv2.imwrite(paths[1], cv2.resize(self.image, (200, 200)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+        cv2.imwrite(paths[2], self.other)
+        hashes, valid = compute_image_hashes(paths + ['missing.jpg'], process_num=2, batch_size=2)
+        self.assertEqual(valid.tolist(), [True, True, True, False])
+
+        pairs = find_near_duplicates(hashes[valid], max_distance=6)
+        self.assertEqual([(x['i'], x['j']) for x in pairs], [(0, 1)])
+
+        # the full decode path gives the hashes of hash_images, small images are never reduced
+        for method in ('phash', 'dhash'):
+            expected = hash_images([cv2.imread(x) for x in paths], method)
+            hashes, _ = compute_image_hashes(paths, method, process_num=2, reduced=False)
+            np.testing.assert_array_equal(hashes, expected)
+        tiny = os.path.join(self.temp_dir, 'tiny.jpg')
+        cv2.imwrite(tiny, cv2.resize(self.image, (100, 100)))
+        hashes, _ = compute_image_hashes([tiny], process_num=1)
+        np.testing.assert_array_equal(hashes, hash_images([cv2.imread(tiny)]))
+
+    def test_find_near_duplicates_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        hashes = rng.integers(0, 2 ** 63, 500, dtype=np.uint64)
+        # plant near duplicates by flipping a few bits
+        flips = np.array([sum(1 << int(b) for b in rng.choice(64, k, replace=False)) for k in rng.integers(0, 7, 200)],
+                         dtype=np.uint64)
+        hashes = np.concatenate([hashes, hashes[:200] ^ flips])
+
+        for max_distance, num_chunks in [(3, 4), (6, 4), (6, 8)]:
+            pairs = find_near_duplicates(hashes, max_distance=max_distance, num_chunks=num_chunks, block_size=97)
+            distance = hamming_distance(hashes[:, np.newaxis], hashes[np.newaxis, :])
+            i, j = np.nonzero(np.triu(distance <= max_distance, k=1))
+            self.assertEqual(sorted(zip(pairs['i'].tolist(), pairs['j'].tolist())), sorted(zip(i.tolist(), j.tolist())))
+            np.testing.assert_array_equal(pairs['distance'], distance[pairs['i'], pairs['j']])
+
+        queries = hashes[:10] ^ np.uint64(1)
+        pairs = find_near_duplicates(hashes, max_distance=1, queries=queries)
+        self.assertTrue(set((k, k) for k in range(10)) <= set(zip(pairs['i'].tolist(), pairs['j'].tolist())))
+
+
+if __name__ == '__main__':
+    unittest.main()
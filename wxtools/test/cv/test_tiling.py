@@ -0,0 +1,58 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.img_quality import contrast_boost, is_bright_zone_large, is_dark_zone_large
+from wxtools.cv.tiling import contrast_boost_tiled, zone_fractions_tiled, is_bright_zone_large_tiled, \
+    is_dark_zone_large_tiled
+
+
+class TestTiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.gray = rng.integers(0, 256, (301, 257), dtype=np.uint8)
+        self.color = cv2.GaussianBlur(rng.integers(0, 256, (190, 230, 3), dtype=np.uint8), (0, 0), 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_contrast_boost_matches(self):
+        for img in (self.gray, self.color):
+            for mode in (1, 2):
+                expected = contrast_boost(img, mode)
+                result = contrast_boost_tiled(img, mode, tile_size=64, num_threads=4)
+                np.testing.assert_array_equal(result, expected)
+
+    def test_memmap_input_output(self):
+        src = os.path.join(self.temp_dir, 'img.npy')
+        dst = os.path.join(self.temp_dir, 'out.npy')
+        np.save(src, self.gray)
+        contrast_boost_tiled(src, 2, tile_size=100, out=dst)
+        np.testing.assert_array_equal(np.load(dst), contrast_boost(self.gray, 2))
+
+        with self.assertRaises(ValueError):
+            contrast_boost_tiled(self.gray, 3)
+
+    def test_zone_fractions(self):
+        fractions = zone_fractions_tiled(self.gray, tile_size=50)
+        self.assertAlmostEqual(fractions['bright'], np.count_nonzero(self.gray > 240) / self.gray.size)
+        self.assertAlmostEqual(fractions['dark'], np.count_nonzero(self.gray <= 40) / self.gray.size)
+        for threshold in (0.05, 0.1, 0.2):
+            self.assertEqual(is_bright_zone_large_tiled(self.gray, threshold, tile_size=50),
+                             is_bright_zone_large(self.gray, threshold))
+            self.assertEqual(is_dark_zone_large_tiled(self.gray, threshold, tile_size=50),
+                             is_dark_zone_large(self.gray, threshold))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+from wxtools.io_utils import copy_file_aio, list_files_aio
+
+
+class TestAsyncIO(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, 'src')
+        self.dst_root = os.path.join(self.root, 'dst')
+        self.file_list = []
+        for i in range(20):
+            name = os.path.join('id{}'.format(i % 3), 'sub{}'.format(i % 2), '{}.{}'.format(i, 'jpg' if i % 4 else 'txt'))
+            os.makedirs(os.path.join(self.src_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.src_root, name), 'w') as f:
+                f.write(str(i))
+            self.file_list.append(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_list_files_aio(self):
+        result = list_files_aio(self.src_root, num_threads=4)
+        self.assertCountEqual(result, [os.path.join(self.src_root, x) for x in self.file_list])
+
+        result = list_files_aio(self.src_root, num_threads=4, exclude=['sub1'], extensions=['.jpg'])
+        expected = [os.path.join(self.src_root, x) for x in self.file_list if 'sub1' not in x and x.endswith('.jpg')]
+        self.assertCountEqual(result, expected)
+
+    def test_list_files_aio_symlinks(self):
+        # a symlinked directory is neither listed as a file nor descended, a symlinked file is listed, as os.walk
+        os.symlink(os.path.join(self.src_root, 'id0'), os.path.join(self.src_root, 'id1', 'link_dir'))
+        os.symlink(os.path.join(self.src_root, self.file_list[1]), os.path.join(self.src_root, 'link.jpg'))
+        expected = [os.path.join(root, x) for root, _, files in os.walk(self.src_root) for x in files]
+        self.assertIn(os.path.join(self.src_root, 'link.jpg'), expected)
+        self.assertCountEqual(list_files_aio(self.src_root, num_threads=4), expected)
+
+    def test_copy_file_aio(self):
+        copy_file_aio(self.file_list, self.src_root, self.dst_root, num_threads=4, max_inflight=3)
+        for name in self.file_list:
+            with open(os.path.join(self.dst_root, name)) as f:
+                self.assertEqual(f.read(), os.path.basename(name).split('.')[0])
+
+        src = [os.path.join(self.src_root, x) for x in self.file_list]
+        dst = [os.path.join(self.root, 'dst2', x) for x in self.file_list]
+        copy_file_aio(src=src, dst=dst, num_threads=2)
+        self.assertTrue(all(os.path.exists(x) for x in dst))
+
+
+if __name__ == '__main__':
+    unittest.main()
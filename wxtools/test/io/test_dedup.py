@@ -0,0 +1,84 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from wxtools.io_utils import copy_file_mlpro
+from wxtools.io_utils.dedup import find_duplicates, HashCache, HASH_BLOCK_SIZE, stat_worker
+
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, 'src')
+        self.dst_root = os.path.join(self.root, 'dst')
+        contents = {
+            'a/1.jpg': b'same content',
+            'b/2.jpg': b'same content',
+            'c/3.jpg': b'other content',
+            'd/4.jpg': b'x' * (3 * HASH_BLOCK_SIZE),
+            'e/5.jpg': b'x' * HASH_BLOCK_SIZE + b'y' + b'x' * (2 * HASH_BLOCK_SIZE - 1),
+            'f/6.jpg': b'x' * (3 * HASH_BLOCK_SIZE),
+        }
+        self.src_paths = []
+        for name, content in contents.items():
+            path = os.path.join(self.src_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.src_paths.append(path)
+        self.dst_paths = [x.replace(self.src_root, self.dst_root) for x in self.src_paths]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_find_duplicates(self):
+        cache_path = os.path.join(self.root, 'hash_cache.db')
+        for _ in range(2):
+            duplicates = find_duplicates(self.src_paths, process_num=2, cache_path=cache_path)
+            self.assertEqual(duplicates, {self.src_paths[1]: self.src_paths[0],
+                                          self.src_paths[5]: self.src_paths[3]})
+
+    def test_hash_cache_device(self):
+        cache_path = os.path.join(self.root, 'hash_cache.db')
+        # a cache written before the device was part of the key is discarded
+        conn = sqlite3.connect(cache_path)
+        conn.execute('CREATE TABLE hashes (ino INTEGER, mtime_ns INTEGER, size INTEGER, kind TEXT, digest TEXT)')
+        conn.commit()
+        conn.close()
+
+        _, identity = stat_worker(self.src_paths[0])
+        self.assertEqual(identity[0], os.stat(self.src_paths[0]).st_dev)
+        cache = HashCache(cache_path)
+        try:
+            cache.put_many([(identity, 'abc')], 'full')
+            self.assertEqual(cache.get(identity, 'full'), 'abc')
+            # the same inode on another device is another file
+            self.assertIsNone(cache.get((identity[0] + 1,) + identity[1:], 'full'))
+        finally:
+            cache.close()
+
+    def test_copy_hardlink(self):
+        copy_file_mlpro(src=self.src_paths, dst=self.dst_paths, process_num=2, dedup='hardlink')
+        for src_path, dst_path in zip(self.src_paths, self.dst_paths):
+            with open(src_path, 'rb') as f1, open(dst_path, 'rb') as f2:
+                self.assertEqual(f1.read(), f2.read())
+        self.assertTrue(os.path.samefile(self.dst_paths[0], self.dst_paths[1]))
+        self.assertTrue(os.path.samefile(self.dst_paths[3], self.dst_paths[5]))
+
+    def test_copy_skip(self):
+        file_list = [os.path.relpath(x, self.src_root) for x in self.src_paths]
+        copy_file_mlpro(file_list, self.src_root, self.dst_root, process_num=2, dedup='skip')
+        self.assertTrue(os.path.exists(self.dst_paths[0]))
+        self.assertFalse(os.path.exists(self.dst_paths[1]))
+        self.assertTrue(os.path.exists(self.dst_paths[4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+from wxtools.io_utils import list_files_mlpro, partition_directories
+from wxtools.io_utils.io_utils import _split_units, list_unit_worker
+
+
+def walk_files(root_dir, extensions=None):
+    paths = []
+    for root, _, files in os.walk(root_dir):
+        paths.extend(os.path.join(root, x) for x in files
+                     if extensions is None or any(x.endswith(e) for e in extensions))
+    return sorted(paths)
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+
+
+class TestListFiles(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # files at every depth, a few small identities and one huge one
+        touch(os.path.join(self.root, 'top.jpg'))
+        touch(os.path.join(self.root, 'a', 'shallow.jpg'))
+        touch(os.path.join(self.root, 'a', 'notes.txt'))
+        for i in range(5):
+            for j in range(3):
+                touch(os.path.join(self.root, 'a', 'id{}'.format(i), 'sub{}'.format(j), '{}.jpg'.format(j)))
+        for j in range(40):
+            for k in range(10):
+                touch(os.path.join(self.root, 'b', 'big', 'sub{:02d}'.format(j), '{}.jpg'.format(k)))
+        os.makedirs(os.path.join(self.root, 'b', 'empty'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_split_units(self):
+        self.assertEqual(_split_units([], 4), [])
+        self.assertEqual(_split_units(['a', 'b', 'c'], 2), [['a', 'c'], ['b']])
+        self.assertEqual(_split_units(['a'], 4), [['a']])
+
+    def test_partition(self):
+        files, dirs = partition_directories(self.root, 2, extensions=['.jpg'])
+        self.assertEqual(sorted(files), [os.path.join(self.root, 'a', 'shallow.jpg'),
+                                         os.path.join(self.root, 'top.jpg')])
+        self.assertEqual(dirs, sorted(dirs))
+        self.assertIn(os.path.join(self.root, 'b', 'big'), dirs)
+        self.assertIn(os.path.join(self.root, 'b', 'empty'), dirs)
+
+    def test_unit_budget(self):
+        big = os.path.join(self.root, 'b', 'big')
+        paths, leftover = list_unit_worker(([big], None, None, 25))
+        self.assertTrue(leftover)
+        self.assertLess(len(paths), 400)
+        paths, leftover = list_unit_worker(([big], None, None, 10 ** 6))
+        self.assertEqual(leftover, [])
+        self.assertEqual(sorted(paths), walk_files(big))
+
+    def test_matches_walk(self):
+        for max_depth in (1, 2, 3):
+            for unit_entries in (7, 20000):
+                paths = list_files_mlpro(self.root, 2, max_depth, extensions=['.jpg'], unit_entries=unit_entries)
+                self.assertEqual(sorted(paths), walk_files(self.root, ['.jpg']), (max_depth, unit_entries))
+        self.assertEqual(sorted(list_files_mlpro(self.root, 2)), walk_files(self.root))
+
+    def test_empty_tree(self):
+        empty = os.path.join(self.root, 'b', 'empty')
+        self.assertEqual(list_files_mlpro(empty, 2), [])
+        os.makedirs(os.path.join(empty, 'x', 'y'))
+        self.assertEqual(list_files_mlpro(empty, 2, 2), [])
+
+    def test_worker_error(self):
+        # an invalid exclude fails in the workers, the pool has to shut down instead of waiting for more units
+        with self.assertRaises(TypeError):
+            list_files_mlpro(os.path.join(self.root, 'b'), 2, exclude=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
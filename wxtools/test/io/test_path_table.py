@@ -0,0 +1,64 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.io_utils import PathTable, replace_root_extension, match_file
+
+
+class TestPathTable(unittest.TestCase):
+    def setUp(self):
+        self.paths = ['/data/images/id{}/{}/{}.{}'.format(i % 5, 'ab'[i % 2], i, ['jpg', 'png', 'tar.gz'][i % 3])
+                      for i in range(60)]
+        self.paths += ['/data/images/id9/.hidden', '/data/images/id9/é.jpg']
+        self.table = PathTable.from_paths(self.paths)
+
+    def test_round_trip(self):
+        self.assertEqual(self.table.to_list(), self.paths)
+        self.assertEqual(self.table[61], self.paths[61])
+        self.assertEqual(self.table.names(), [os.path.basename(x) for x in self.paths])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'table.npz')
+            self.table.save(path)
+            self.assertEqual(PathTable.load(path).to_list(), self.paths)
+
+    def test_select_filter(self):
+        rows = np.array([61, 3, 0])
+        self.assertEqual(self.table.select(rows).to_list(), [self.paths[i] for i in rows])
+
+        exclude, extensions = ['id1', '/b/'], ['.jpg', '.gz']
+        expected = [x for x in self.paths if match_file(x, exclude, extensions)]
+        self.assertEqual(self.table.filter(exclude, extensions).to_list(), expected)
+
+        # extensions without the dot, longer than the interned suffix, or matching the whole name
+        for extensions in (['jpg'], ['.tar.gz'], ['ar.gz', 'png'], ['hidden'], ['.gz', '9/é.jpg'], ['']):
+            expected = [x for x in self.paths if match_file(x, None, extensions)]
+            self.assertEqual(self.table.filter(extensions=extensions).to_list(), expected, extensions)
+
+    def test_group_by_component(self):
+        keys, order, offsets = self.table.group_by_component(3)
+        self.assertEqual(keys, ['id0', 'id1', 'id2', 'id3', 'id4', 'id9'])
+        for k, key in enumerate(keys):
+            rows = order[offsets[k]:offsets[k + 1]]
+            self.assertEqual([self.paths[i] for i in rows], [x for x in self.paths if x.split('/')[3] == key])
+
+        keys, _, offsets = self.table.group_by_component(-1)
+        self.assertEqual(len(keys), len(self.paths))
+
+    def test_replace_root_extension(self):
+        expected = replace_root_extension(self.paths, '/data/images', '/mnt/out', ['.jpg', '.gz'], '.png')
+        result = replace_root_extension(self.table, '/data/images', '/mnt/out', ['.jpg', '.gz'], '.png')
+        self.assertIsInstance(result, PathTable)
+        self.assertEqual(result.to_list(), expected)
+        with self.assertRaises(ValueError):
+            self.table.replace_root('/other', '/mnt/out')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from wxtools.io_utils import PathTable, iter_restructure_pairs, restructure_bio_dataset
+
+
+def reference_pairs(image_paths, dst_root, id_index):
+    """
+    sort by id and keep the path after the id, as the original implementation
+    """
+    paths = sorted(image_paths, key=lambda x: x.split('/')[id_index])
+    return [(x, os.path.join(dst_root, x.split('/')[id_index], '/'.join(x.split('/')[id_index:]))) for x in paths]
+
+
+class TestRestructure(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.dst_root = os.path.join(self.root, 'dst')
+        rng = random.Random(0)
+        self.paths = ['/data/{}/id{:02d}/{}/{}.jpg'.format(rng.choice('ab'), rng.randrange(20),
+                                                            rng.choice(['x', 'y/z']), i) for i in range(500)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_restructure(self):
+        paths = list(self.paths)
+        for id_index in (3, -3):
+            dst_root = os.path.join(self.dst_root, str(id_index))
+            src_paths, dst_paths = restructure_bio_dataset(paths, dst_root, id_index)
+            self.assertEqual(paths, self.paths)
+            self.assertEqual(list(zip(src_paths, dst_paths)), reference_pairs(self.paths, dst_root, id_index))
+            self.assertEqual(sorted(os.listdir(dst_root)), sorted({x.split('/')[id_index] for x in self.paths}))
+
+        # the id is the file name
+        names = ['/data/a/1.jpg', 'x/0.jpg', '/2.jpg', '0.jpg']
+        self.assertEqual(list(iter_restructure_pairs(names, self.dst_root, -1, make_dirs=False)),
+                         reference_pairs(names, self.dst_root, -1))
+
+    def test_path_table(self):
+        names = ['/data/a/1.jpg', 'x/0.jpg', '/2.jpg', '0.jpg']
+        # the ids come from the interned directories, the table is never expanded to a list
+        with mock.patch.object(PathTable, 'to_list', side_effect=AssertionError('to_list called')):
+            for id_index in (3, -3, 0):
+                pairs = list(iter_restructure_pairs(PathTable.from_paths(self.paths), self.dst_root, id_index,
+                                                    make_dirs=False))
+                self.assertEqual(pairs, reference_pairs(self.paths, self.dst_root, id_index))
+            pairs = list(iter_restructure_pairs(PathTable.from_paths(names), self.dst_root, -1, make_dirs=False))
+            self.assertEqual(pairs, reference_pairs(names, self.dst_root, -1))
+        self.assertFalse(os.path.exists(self.dst_root))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+from wxtools.io_utils import pack_shards, ShardReader
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, 'src')
+        self.contents = {}
+        for i in range(30):
+            key = os.path.join('id{}'.format(i % 4), '{}.jpg'.format(i))
+            path = os.path.join(self.src_root, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            content = os.urandom(100 + i * 10)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.contents[key] = content
+        open(os.path.join(self.src_root, 'empty.jpg'), 'wb').close()
+        self.contents['empty.jpg'] = b''
+        self.paths = [os.path.join(self.src_root, x) for x in self.contents]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_pack_and_read(self):
+        dst_root = os.path.join(self.root, 'shards')
+        manifest = pack_shards(self.paths, dst_root, src_root=self.src_root, shard_size=1000, process_num=2)
+        self.assertEqual(manifest['num_records'], len(self.contents))
+        self.assertGreater(len(manifest['shards']), 1)
+
+        reader = ShardReader(dst_root)
+        self.assertEqual(len(reader), len(self.contents))
+        for key, content in self.contents.items():
+            self.assertEqual(reader[key], content)
+        self.assertEqual(dict(iter(reader)), self.contents)
+        self.assertEqual(list(reader.keys()), list(self.contents))
+        self.assertNotIn('missing.jpg', reader)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wxtools.io_utils import copy_file_mlpro, verify_copy
+
+
+class TestVerifyCopy(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, 'src')
+        self.dst_root = os.path.join(self.root, 'dst')
+        self.file_list = ['a/{}.jpg'.format(i) for i in range(6)]
+        for idx, name in enumerate(self.file_list):
+            path = os.path.join(self.src_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'content %d' % idx * 10)
+        copy_file_mlpro(self.file_list, self.src_root, self.dst_root, process_num=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def dst(self, name):
+        return os.path.join(self.dst_root, name)
+
+    def test_clean_copy(self):
+        report = verify_copy(self.file_list, self.src_root, self.dst_root, process_num=2)
+        self.assertEqual(report['num_ok'], 6)
+        self.assertEqual(report['files'], [])
+
+    def test_problems(self):
+        os.remove(self.dst('a/0.jpg'))
+        with open(self.dst('a/1.jpg'), 'r+b') as f:
+            f.truncate(3)
+        with open(self.dst('a/2.jpg'), 'ab') as f:
+            f.write(b'extra')
+        with open(self.dst('a/3.jpg'), 'r+b') as f:
+            f.write(b'X')
+        src_path = os.path.join(self.src_root, 'a/4.jpg')
+        st = os.stat(self.dst('a/4.jpg'))
+        os.utime(src_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+        report_path = os.path.join(self.root, 'report.json')
+        report = verify_copy(self.file_list, self.src_root, self.dst_root, process_num=2, report_path=report_path)
+        statuses = {os.path.basename(x['src']): x['status'] for x in report['files']}
+        self.assertEqual(statuses, {'0.jpg': 'missing', '1.jpg': 'truncated', '2.jpg': 'size_mismatch',
+                                    '4.jpg': 'stale'})
+        with open(report_path) as f:
+            self.assertEqual(json.load(f)['counts']['missing'], 1)
+
+        report = verify_copy(self.file_list, self.src_root, self.dst_root, checksum=True, process_num=2)
+        statuses = {os.path.basename(x['src']): x['status'] for x in report['files']}
+        self.assertEqual(statuses, {'0.jpg': 'missing', '1.jpg': 'truncated', '2.jpg': 'size_mismatch',
+                                    '3.jpg': 'differing'})
+        self.assertEqual(report['num_ok'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
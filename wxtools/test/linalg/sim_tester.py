@@ -7,6 +7,9 @@ Date: 1/17/2024
 import numpy as np
 
 from wxtools.linalg.similarity import get_mean_cosine_similarity
+from wxtools.logger.logger import setup_logger
+
+logger = setup_logger(__name__, log_file=None, log_level='INFO')
 
 
 # The function definitions from the previous message would go here
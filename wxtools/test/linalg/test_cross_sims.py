@@ -0,0 +1,64 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import unittest
+
+import numpy as np
+
+from wxtools.linalg.group_clean import offsets_from_dict
+from wxtools.linalg.similarity import centroid_candidates, feature_cross_sims, feature_cross_sims_centroid
+
+
+class TestCrossSims(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((12, 64))
+        # identities 3 and 7 are the same person
+        centers[7] = centers[3] + 0.05 * rng.standard_normal(64)
+        self.mat_dict = {'id{}'.format(i): centers[i] + 0.3 * rng.standard_normal((4 + i % 3, 64)) for i in range(12)}
+
+    def test_matches_exhaustive(self):
+        expected = feature_cross_sims(self.mat_dict, threshold=0.8)
+        keys = list(self.mat_dict)
+        expected = sorted((keys.index(a), keys.index(b), i, j) for (a, b), pairs in expected.items()
+                          for i, j in pairs if keys.index(a) < keys.index(b))
+        self.assertTrue(expected)
+
+        features, offsets, ids = offsets_from_dict(self.mat_dict)
+        result = feature_cross_sims_centroid(features, offsets, threshold=0.8, top_k=11)
+        self.assertEqual(sorted(zip(result['id_a'].tolist(), result['id_b'].tolist(),
+                                    result['i'].tolist(), result['j'].tolist())), expected)
+
+        # the colliding identities are each other's nearest centroid
+        result = feature_cross_sims_centroid(self.mat_dict, threshold=0.8, top_k=1)
+        self.assertEqual(set(zip(result['id_a'].tolist(), result['id_b'].tolist())), {(3, 7)})
+        for record in result:
+            a = self.mat_dict[ids[record['id_a']]][record['i']]
+            b = self.mat_dict[ids[record['id_b']]][record['j']]
+            self.assertAlmostEqual(float(record['sim']), a @ b / np.linalg.norm(a) / np.linalg.norm(b), places=5)
+
+    def test_centroid_candidates_blocks(self):
+        rng = np.random.default_rng(1)
+        centroids = rng.standard_normal((300, 16)).astype(np.float32)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        sims = centroids @ centroids.T
+        np.fill_diagonal(sims, -np.inf)
+        nearest = np.argsort(-sims, axis=1)[:, :5]
+        a, b = np.repeat(np.arange(300), 5), nearest.ravel()
+        expected = np.unique(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1), axis=0)
+        keep = sims[a, b] >= 0.5
+        expected_min = np.unique(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1)[keep], axis=0)
+
+        # whole rows, small row blocks, and row blocks split into column blocks smaller than the matrix
+        for block_size, max_bytes in ((None, 1 << 28), (7, 1 << 28), (7, 12 * 7 * 13), (None, 12 * 256 * 40)):
+            np.testing.assert_array_equal(centroid_candidates(centroids, 5, block_size=block_size,
+                                                              max_bytes=max_bytes), expected)
+            np.testing.assert_array_equal(centroid_candidates(centroids, 5, 0.5, block_size=block_size,
+                                                              max_bytes=max_bytes), expected_min)
+        np.testing.assert_array_equal(centroid_candidates(centroids[:2], 5), [[0, 1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
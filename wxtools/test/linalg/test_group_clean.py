@@ -0,0 +1,64 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.linalg.group_clean import offsets_from_dict, offsets_from_labels, group_similarity_stats, clean_groups
+from wxtools.linalg.similarity import cosine_similarity_mean
+
+
+class TestGroupClean(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.mat_dict = {}
+        for i, n in enumerate([5, 1, 8, 0, 12, 3]):
+            center = rng.standard_normal(32)
+            self.mat_dict['id{}'.format(i)] = center + 0.2 * rng.standard_normal((n, 32))
+        # plant an outlier in id4
+        self.mat_dict['id4'][7] = rng.standard_normal(32) * 3
+        self.features, self.offsets, self.keys = offsets_from_dict(self.mat_dict)
+
+    def test_stats_match_dense(self):
+        stats = group_similarity_stats(self.features, self.offsets, block_size=7)
+        for g, key in enumerate(self.keys):
+            group = self.mat_dict[key]
+            start, end = self.offsets[g], self.offsets[g + 1]
+            if len(group) > 1:
+                # cosine_similarity_mean averages over n with a zeroed diagonal
+                expected = cosine_similarity_mean(group) * len(group) / (len(group) - 1)
+                np.testing.assert_allclose(stats['intra_mean'][start:end], expected, atol=1e-10)
+            if len(group) > 0:
+                centroid = (group / np.linalg.norm(group, axis=1, keepdims=True)).mean(axis=0)
+                expected = group @ centroid / np.linalg.norm(group, axis=1) / np.linalg.norm(centroid)
+                np.testing.assert_allclose(stats['centroid_sim'][start:end], expected, atol=1e-10)
+        self.assertTrue(np.isnan(stats['intra_mean'][self.offsets[1]]))
+
+    def test_clean_groups(self):
+        result = clean_groups(self.features, self.offsets, max_zscore=2.5)
+        self.assertEqual(np.flatnonzero(result['outlier']).tolist(), [self.offsets[4] + 7])
+
+        parallel = clean_groups(self.features, self.offsets, max_zscore=2.5, process_num=2)
+        for key in ('centroid_sim', 'intra_mean', 'outlier'):
+            np.testing.assert_allclose(parallel[key], result[key])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'features.npy')
+            np.save(path, self.features)
+            from_file = clean_groups(path, self.offsets, max_zscore=2.5, process_num=2)
+            np.testing.assert_allclose(from_file['centroid_sim'], result['centroid_sim'])
+
+    def test_offsets_from_labels(self):
+        order, offsets, ids = offsets_from_labels(np.array(['b', 'a', 'b', 'c', 'a']))
+        self.assertEqual(ids.tolist(), ['a', 'b', 'c'])
+        self.assertEqual(offsets.tolist(), [0, 2, 4, 5])
+        self.assertEqual(order.tolist(), [1, 4, 0, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
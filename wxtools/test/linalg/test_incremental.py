@@ -0,0 +1,78 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from wxtools.linalg.incremental import IncrementalSimilarity
+from wxtools.linalg.similarity import cosine_similarity_mean
+
+
+class TestIncrementalSimilarity(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.features = rng.standard_normal((120, 32))
+        self.names = ['img_{}'.format(i) for i in range(120)]
+        self.groups = ['id_{}'.format(i % 4) for i in range(120)]
+
+    def expected(self, rows):
+        result = {}
+        for key in sorted(set(self.groups[i] for i in rows)):
+            members = [i for i in rows if self.groups[i] == key]
+            result.update(zip([self.names[i] for i in members], cosine_similarity_mean(self.features[members])))
+        return result
+
+    def assert_scores(self, engine, rows):
+        expected = self.expected(rows)
+        scores = engine.scores()
+        self.assertEqual(set(scores), set(expected))
+        for name, value in expected.items():
+            self.assertAlmostEqual(scores[name], value, places=6)
+
+    def test_global(self):
+        engine = IncrementalSimilarity()
+        engine.add(self.names[:100], self.features[:100])
+        engine.add(self.names[100:], self.features[100:])
+        np.testing.assert_allclose(engine.mean_similarity(), cosine_similarity_mean(self.features), atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            engine.add(self.names[:1], self.features[:1])
+
+    def test_grouped_add_remove(self):
+        engine = IncrementalSimilarity()
+        engine.add(self.names[:90], self.features[:90], groups=self.groups[:90])
+        engine.add(self.names[90:], self.features[90:], groups=self.groups[90:])
+        self.assert_scores(engine, list(range(120)))
+
+        removed = [3, 7, 50, 119]
+        engine.remove([self.names[i] for i in removed])
+        rows = [i for i in range(120) if i not in removed]
+        self.assert_scores(engine, rows)
+
+        # a duplicated name would subtract its vector twice from the group sums
+        with self.assertRaises(ValueError):
+            engine.remove([self.names[10], self.names[10]])
+        self.assert_scores(engine, rows)
+
+        before = engine.mean_similarity()
+        engine.refresh()
+        np.testing.assert_allclose(engine.mean_similarity(), before, atol=1e-9)
+
+    def test_save_load(self):
+        engine = IncrementalSimilarity()
+        engine.add(self.names[:60], self.features[:60], groups=self.groups[:60])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'gallery.npz')
+            engine.save(path)
+            engine = IncrementalSimilarity.load(path)
+        engine.add(self.names[60:], self.features[60:], groups=self.groups[60:])
+        self.assert_scores(engine, list(range(120)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import unittest
+
+import numpy as np
+
+from wxtools.linalg.quantize import quantize_fp16, quantize_int8, dequantize_int8, cos_sim_fp16, cos_sim_int8, \
+    quantization_report
+from wxtools.linalg.similarity import mat_cos_sim
+
+
+class TestQuantize(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.features = rng.standard_normal((300, 128))
+        self.exact = mat_cos_sim(self.features)
+
+    def test_fp16(self):
+        fp16 = quantize_fp16(self.features)
+        self.assertEqual(fp16.dtype, np.float16)
+        sims = cos_sim_fp16(fp16, block_size=64)
+        self.assertEqual(sims.dtype, np.float32)
+        self.assertLess(np.abs(sims - self.exact).max(), 2e-3)
+        # float32 sums depend on the block shape
+        np.testing.assert_allclose(cos_sim_fp16(fp16, block_size=64, col_block_size=70), sims, atol=1e-5)
+        self.assertEqual(cos_sim_fp16(fp16[:0], fp16).shape, (0, 300))
+
+    def test_int8(self):
+        q, scales = quantize_int8(self.features)
+        self.assertEqual(q.dtype, np.int8)
+        self.assertLess(np.abs(dequantize_int8(q, scales) - self.features /
+                               np.linalg.norm(self.features, axis=1, keepdims=True)).max(), 0.01)
+        sims = cos_sim_int8(q, scales, block_size=64)
+        self.assertLess(np.abs(sims - self.exact).max(), 0.02)
+
+        np.testing.assert_array_equal(cos_sim_int8(q, scales, block_size=64, col_block_size=70), sims)
+
+        # float64 accumulation for large dimensions is exact as well
+        wide = np.tile(self.features[:20], (1, 10))
+        q, scales = quantize_int8(wide)
+        expected = (q.astype(np.int64) @ q.T.astype(np.int64)) * scales[:, np.newaxis] * scales[np.newaxis, :]
+        np.testing.assert_allclose(cos_sim_int8(q, scales, col_block_size=7), expected, rtol=1e-6)
+        np.testing.assert_allclose(cos_sim_int8(q, scales), mat_cos_sim(wide), atol=0.02)
+
+    def test_top_k(self):
+        q, scales = quantize_int8(self.features)
+        fp16 = quantize_fp16(self.features)
+        for sims, (idx, top) in ((cos_sim_int8(q[:40], scales[:40], q, scales),
+                                  cos_sim_int8(q[:40], scales[:40], q, scales, 16, 50, top_k=5)),
+                                 (cos_sim_fp16(fp16[:40], fp16),
+                                  cos_sim_fp16(fp16[:40], fp16, block_size=16, col_block_size=3, top_k=5))):
+            self.assertEqual(idx.shape, (40, 5))
+            np.testing.assert_allclose(top, np.sort(sims, axis=1)[:, ::-1][:, :5], atol=1e-5)
+            np.testing.assert_allclose(np.take_along_axis(sims, idx, axis=1), top, atol=1e-5)
+            # each row finds itself first
+            np.testing.assert_array_equal(idx[:, 0], np.arange(40))
+
+    def test_report(self):
+        report = quantization_report(self.features, num_queries=50, k=5)
+        self.assertGreater(report['fp16']['recall@5'], 0.95)
+        self.assertGreater(report['int8']['recall@5'], 0.8)
+        self.assertEqual(report['fp16']['compression_vs_float32'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cv.img_utils import read_thumbnail
+from wxtools.cv.tiling import zone_fractions_file
+from wxtools.utils.artifact_cache import ArtifactCache, artifact_key, cached_artifact, file_identity
+from wxtools.utils.mlpro_utils import run_mlpro
+
+CALLS = []
+
+
+@cached_artifact()
+def file_length(path, scale=1):
+    CALLS.append(path)
+    with open(path, 'rb') as f:
+        return np.array([len(f.read()) * scale])
+
+
+def zone_worker(arg):
+    path, cache = arg
+    return zone_fractions_file(path, cache=cache)
+
+
+class TestArtifactCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.root, 'cache')
+        self.path = os.path.join(self.root, 'a.png')
+        cv2.imwrite(self.path, np.random.default_rng(0).integers(0, 256, (40, 50, 3), dtype=np.uint8))
+        CALLS.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_put_get_evict(self):
+        cache = ArtifactCache(self.cache_dir, max_bytes=3000)
+        keys = [artifact_key('test', file_identity(self.path), {'i': i}) for i in range(4)]
+        cache.put(keys[0], np.arange(100, dtype=np.int64))
+        cache.put(keys[1], {'bright': 0.5, 'ok': True, 'values': np.ones(3)})
+        np.testing.assert_array_equal(cache.get(keys[0]), np.arange(100))
+        self.assertEqual(cache.get(keys[1])['bright'], 0.5)
+        self.assertIs(cache.get(keys[1])['ok'], True)
+        self.assertIsNone(cache.get(keys[2]))
+
+        # keys[1] was read last, keys[0] is the least recently used
+        cache.put(keys[2], np.zeros(150))
+        cache.put(keys[3], np.zeros(150))
+        self.assertNotIn(keys[0], cache)
+        self.assertIn(keys[3], cache)
+        self.assertLessEqual(cache.total_bytes(), 3000)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_shared_total(self):
+        # two handles on the same directory, as two worker processes, evict by their combined size
+        caches = [ArtifactCache(self.cache_dir, max_bytes=3000) for _ in range(2)]
+        keys = [artifact_key('test', file_identity(self.path), {'i': i}) for i in range(4)]
+        for i, key in enumerate(keys):
+            caches[i % 2].put(key, np.zeros(100))
+            self.assertLessEqual(caches[0].total_bytes(), 3000)
+            self.assertEqual(caches[0].total_bytes(), caches[1].total_bytes())
+        self.assertLess(len(caches[0]), 4)
+        # replacing an artifact does not count it twice
+        total = caches[1].total_bytes()
+        caches[1].put(keys[3], np.zeros(100))
+        self.assertEqual(caches[0].total_bytes(), total)
+        for cache in caches:
+            cache.close()
+
+    def test_key_params(self):
+        identity = file_identity(self.path)
+
+        def key(value):
+            return artifact_key('test', identity, {'f': value})
+
+        offset = 1
+        self.assertNotEqual(key(lambda x: x + 1), key(lambda x: x * 2))
+        self.assertEqual(key(lambda x: x + 1), key(lambda x: x + 1))
+        self.assertNotEqual(key(lambda x: x + offset), key((lambda o: lambda x: x + o)(2)))
+        self.assertNotEqual(key(lambda x, y=1: x + y), key(lambda x, y=2: x + y))
+        self.assertNotEqual(key(functools.partial(np.clip, a_min=0)), key(functools.partial(np.clip, a_min=1)))
+        self.assertEqual(key(functools.partial(np.clip, a_min=0)), key(functools.partial(np.clip, a_min=0)))
+        self.assertNotEqual(key(np.zeros(2000)), key(np.r_[np.zeros(1999), 1]))
+        with self.assertRaises(ValueError):
+            key(object())
+
+    def test_decorator(self):
+        np.testing.assert_array_equal(file_length(self.path, 2, cache=self.cache_dir), file_length(self.path, 2))
+        self.assertEqual(len(CALLS), 2)
+        file_length(self.path, scale=2, cache=self.cache_dir)
+        self.assertEqual(len(CALLS), 2)
+        file_length(self.path, 3, cache=self.cache_dir)
+        self.assertEqual(len(CALLS), 3)
+
+        # a modified file gets a new key
+        with open(self.path, 'ab') as f:
+            f.write(b'0')
+        os.utime(self.path, ns=(1, 1))
+        self.assertEqual(file_length(self.path, cache=self.cache_dir)[0], os.path.getsize(self.path))
+        self.assertEqual(len(CALLS), 4)
+
+        thumb = read_thumbnail(self.path, (16, 8), cache=self.cache_dir)
+        np.testing.assert_array_equal(read_thumbnail(self.path, (16, 8), cache=self.cache_dir), thumb)
+        self.assertEqual(thumb.shape, (8, 16, 3))
+        self.assertIsNone(read_thumbnail(os.path.join(self.root, 'missing.png'), cache=self.cache_dir))
+
+    def test_workers(self):
+        cache = ArtifactCache(self.cache_dir)
+        expected = zone_fractions_file(self.path)
+        for _ in range(2):
+            results = run_mlpro(zone_worker, [(self.path, cache)] * 4, 2)
+            self.assertEqual(results, [expected] * 4)
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.utils.cam_overlay import upsample_heatmaps, overlay_heatmaps, colormap_lut, export_overlays
+
+
+class TestCamOverlay(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.heatmaps = rng.random((4, 7, 7)).astype(np.float32)
+        self.images = rng.integers(0, 256, (4, 56, 64, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_upsample_matches_cv2(self):
+        result = upsample_heatmaps(self.heatmaps, (64, 56))
+        self.assertEqual(result.shape, (4, 56, 64))
+        for heatmap, upsampled in zip(self.heatmaps, result):
+            expected = cv2.resize(heatmap, (64, 56), interpolation=cv2.INTER_LINEAR)
+            np.testing.assert_allclose(upsampled, expected, atol=1e-4)
+
+    def test_overlay_matches_per_image_blend(self):
+        result = overlay_heatmaps(self.images, self.heatmaps, alpha=0.5)
+        self.assertEqual(result.shape, self.images.shape)
+
+        heatmap = cv2.resize(self.heatmaps[0], (64, 56))
+        colored = cv2.applyColorMap(np.uint8(np.clip(heatmap * 255 + 0.5, 0, 255)), cv2.COLORMAP_JET)
+        expected = cv2.addWeighted(self.images[0], 0.5, colored, 0.5, 0)
+        self.assertLessEqual(np.abs(result[0].astype(int) - expected.astype(int)).max(), 2)
+
+    def test_colormap_lut(self):
+        lut = colormap_lut()
+        self.assertEqual(lut.shape, (256, 3))
+        self.assertEqual(lut.dtype, np.uint8)
+
+    def test_export_overlays(self):
+        images = list(self.images) + [np.zeros((30, 40, 3), dtype=np.uint8)]
+        heatmaps = list(self.heatmaps) + [self.heatmaps[0]]
+        paths = [os.path.join(self.output_dir, 'sub', '{}.png'.format(i)) for i in range(len(images))]
+        export_overlays(images, heatmaps, paths, num_threads=2, batch_size=2)
+        for path, image in zip(paths, images):
+            self.assertEqual(cv2.imread(path).shape, image.shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from wxtools.cli import main
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src_root = os.path.join(self.root, 'src')
+        rng = np.random.default_rng(0)
+        self.paths = []
+        for identity in ('id1', 'id2'):
+            for idx in range(3):
+                path = os.path.join(self.src_root, identity, 'x', '{}.png'.format(idx))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                cv2.imwrite(path, rng.integers(0, 256, (16, 16), dtype=np.uint8))
+                self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def run_cli(self, argv, stdin=''):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        old_stdin = sys.stdin
+        sys.stdin = io.StringIO(stdin)
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                self.assertEqual(main(argv), 0)
+        finally:
+            sys.stdin = old_stdin
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_list_copy(self):
+        stdout, stderr = self.run_cli(['list', self.src_root, '--workers', '2', '--extensions', '.png'])
+        self.assertEqual(sorted(stdout.split()), sorted(self.paths))
+        self.assertIn('list: 6 items', stderr)
+
+        dst_root = os.path.join(self.root, 'dst')
+        report = os.path.join(self.root, 'report.json')
+        self.run_cli(['copy', '--src', self.src_root, '--dst', dst_root, '--workers', '2', '--verify',
+                      '--report', report], stdin=stdout)
+        self.assertTrue(os.path.exists(report))
+        for path in self.paths:
+            self.assertTrue(os.path.exists(path.replace(self.src_root, dst_root)))
+
+    def test_restructure_quality(self):
+        id_index = len(self.src_root.split('/'))
+        dst_root = os.path.join(self.root, 'restructured')
+        stdout, _ = self.run_cli(['restructure', '--dst-root', dst_root, '--id-index', str(id_index), '--copy',
+                                  '--workers', '2'], stdin='\n'.join(self.paths))
+        pairs = [x.split('\t') for x in stdout.splitlines()]
+        self.assertEqual(len(pairs), 6)
+        self.assertTrue(all(dst.startswith(dst_root) and os.path.exists(dst) for _, dst in pairs))
+
+        stdout, stderr = self.run_cli(['quality', '--workers', '2'], stdin='\n'.join(self.paths))
+        lines = stdout.splitlines()
+        self.assertEqual(lines[0].split('\t')[0], 'path')
+        self.assertEqual(sorted(x.split('\t')[0] for x in lines[1:]), sorted(self.paths))
+        self.assertIn('quality: 6 items', stderr)
+
+    def test_bin2png(self):
+        bin_dir = os.path.join(self.root, 'bins')
+        os.makedirs(bin_dir)
+        for idx in range(3):
+            np.zeros((8, 6), dtype=np.uint8).tofile(os.path.join(bin_dir, '{}.bin'.format(idx)))
+        output = os.path.join(self.root, 'png')
+        self.run_cli(['bin2png', bin_dir, '--output', output, '--size', '6', '8', '--workers', '2'])
+        self.assertEqual(sorted(os.listdir(output)), ['0.png', '1.png', '2.png'])
+
+    def test_convert(self):
+        # 'jp' is a prefix of 'jp2_more' but not its root, files keep their path below the matching input
+        inputs = [os.path.join(self.root, 'jp'), os.path.join(self.root, 'jp2_more') + '/']
+        for directory in (os.path.join(inputs[0], 'a'), os.path.join(inputs[1], 'b')):
+            os.makedirs(directory)
+            cv2.imwrite(os.path.join(directory, 'x.jp2'), np.zeros((64, 64, 3), dtype=np.uint8))
+        output = os.path.join(self.root, 'converted')
+        stdout, _ = self.run_cli(['convert'] + inputs + ['--output', output, '--ext', 'png', '--workers', '2'])
+        self.assertEqual(stdout, '')
+        self.assertTrue(os.path.exists(os.path.join(output, 'a', 'x.png')))
+        self.assertTrue(os.path.exists(os.path.join(output, 'b', 'x.png')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'jp2_more', 'b', 'x.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
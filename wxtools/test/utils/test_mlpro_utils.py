@@ -0,0 +1,66 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+import time
+import unittest
+
+import numpy as np
+
+from wxtools.utils.mlpro_utils import iter_mlpro, run_mlpro, to_shared, from_shared, SharedArray, SharedStrings
+
+
+def large_result_worker(idx):
+    return idx, np.full((300, 100), idx, dtype=np.float32), ['/data/{}/{}.jpg'.format(idx, i) for i in range(5000)]
+
+
+def small_result_worker(idx):
+    return {'idx': idx, 'values': np.arange(3)}
+
+
+def list_shm():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+class TestSharedMemoryTransport(unittest.TestCase):
+    def test_round_trip(self):
+        result = (np.arange(100000, dtype=np.int64).reshape(100, 1000), ['a', 'b' * 70000], {'x': [1, 2]})
+        handles = to_shared(result)
+        self.assertIsInstance(handles[0], SharedArray)
+        self.assertIsInstance(handles[1], SharedStrings)
+        decoded = from_shared(handles)
+        np.testing.assert_array_equal(decoded[0], result[0])
+        self.assertTrue(decoded[0].flags.writeable)
+        self.assertEqual(decoded[1:], result[1:])
+
+        # strings containing the separator are pickled as usual
+        strings = ['a\0b'] * 40000
+        self.assertIs(to_shared(strings), strings)
+
+    def test_run_mlpro(self):
+        before = list_shm()
+        expected = sorted(run_mlpro(large_result_worker, list(range(6)), 2), key=lambda x: x[0])
+        results = sorted(run_mlpro(large_result_worker, list(range(6)), 2, shared_memory=True), key=lambda x: x[0])
+        for (idx, arr, paths), (e_idx, e_arr, e_paths) in zip(results, expected):
+            self.assertEqual(idx, e_idx)
+            np.testing.assert_array_equal(arr, e_arr)
+            self.assertEqual(paths, e_paths)
+        self.assertEqual(list_shm() - before, set())
+
+        results = run_mlpro(small_result_worker, [1, 2], 2, shared_memory=True)
+        self.assertEqual(sorted(x['idx'] for x in results), [1, 2])
+
+    def test_iter_mlpro_early_stop(self):
+        before = list_shm()
+        results = iter_mlpro(large_result_worker, range(6), 2, shared_memory=True)
+        self.assertEqual(len(next(results)), 3)
+        # let the other tasks finish, their blocks are waiting in the pool
+        time.sleep(1)
+        results.close()
+        self.assertEqual(list_shm() - before, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
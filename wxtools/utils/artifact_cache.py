@@ -0,0 +1,350 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import functools
+import hashlib
+import inspect
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from wxtools.io_utils.dedup import full_hash
+
+# access times are written to the index in batches of this size, instead of one transaction per hit
+TOUCH_BATCH_SIZE = 256
+
+# eviction removes the least recently used artifacts until the cache is below this fraction of max_bytes
+EVICT_LOW_WATER = 0.9
+
+# caches opened from a root directory by cached_artifact, one per process
+_CACHES: Dict[Tuple[str, Optional[int]], 'ArtifactCache'] = {}
+
+
+def file_identity(path: str, identity: str = 'stat') -> Tuple:
+    """
+    :param path:  file path
+    :param identity:  'stat' for (absolute path, size, mtime), 'content' for the hash of the file contents,
+                      which also matches copies and moved files but reads the whole file
+    :return:  identity tuple
+    """
+    if identity == 'stat':
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+    if identity == 'content':
+        return (full_hash(path),)
+    raise ValueError("identity should be 'stat' or 'content', got {}".format(identity))
+
+
+def _importable(value: Any) -> bool:
+    """
+    whether value is found by its module and qualified name
+    """
+    module = sys.modules.get(getattr(value, '__module__', None) or '')
+    obj = module
+    for name in getattr(value, '__qualname__', '<locals>').split('.'):
+        obj = getattr(obj, name, None)
+    return module is not None and obj is value
+
+
+def _code_key(code) -> Tuple:
+    consts = tuple(_code_key(x) if inspect.iscode(x) else _param_key(x) for x in code.co_consts)
+    return code.co_code, consts, code.co_names
+
+
+def _param_key(value: Any) -> Any:
+    """
+    stable representation of a parameter, the same value in another process gives the same representation
+    """
+    if isinstance(value, functools.partial):
+        return ('partial', _param_key(value.func), _param_key(value.args), _param_key(value.keywords))
+    if inspect.isfunction(value):
+        # lambdas share a qualified name, the bytecode, defaults and closure contents tell them apart
+        closure = tuple(_param_key(x.cell_contents) for x in value.__closure__ or ())
+        return ('function', value.__module__, value.__qualname__, _code_key(value.__code__),
+                _param_key(value.__defaults__), _param_key(value.__kwdefaults__), closure)
+    if callable(value) and _importable(value):
+        # builtins and other compiled callables, such as numpy ufuncs and cv2 functions
+        return 'callable', value.__module__, value.__qualname__
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_param_key(x) for x in value)
+    if isinstance(value, (set, frozenset)):
+        # the iteration order of a set of strings changes with the hash seed of the process
+        return type(value).__name__, tuple(sorted(repr(_param_key(x)) for x in value))
+    if isinstance(value, dict):
+        return 'dict', tuple(sorted((repr(k), _param_key(v)) for k, v in value.items()))
+    if isinstance(value, np.ndarray):
+        # the repr of large arrays is abbreviated
+        return 'ndarray', value.dtype.str, value.shape, hashlib.blake2b(np.ascontiguousarray(value)).hexdigest()
+    text = repr(value)
+    if ' at 0x' in text:
+        raise ValueError('Parameter {} has no stable representation and cannot be part of an artifact key'.format(
+            text))
+    return text
+
+
+def artifact_key(name: str, identity: Tuple, params: Dict[str, Any]) -> str:
+    """
+    :param name:  artifact name, such as the qualified name of the function computing it
+    :param identity:  file identity, see file_identity
+    :param params:  parameters of the computation. functions are represented by their bytecode, defaults and closure
+                    contents, partials by their function and arguments, and other values by their repr. values
+                    whose repr is an address, such as arbitrary objects or bound methods, raise a ValueError
+    :return:  hex key
+    """
+    text = repr((name, identity, sorted((k, _param_key(v)) for k, v in params.items())))
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class ArtifactCache:
+    """
+    on-disk cache of per-file derived artifacts, such as preprocessed tensors, thumbnails or quality scores.
+    ndarrays are stored as .npy files and returned memory mapped, dicts of arrays and scalars as .npz files.
+    a sqlite index keeps the size and last access time of each artifact, the least recently used ones are
+    evicted when the cache grows above max_bytes.
+    the cache can be shared by several threads and processes and pickled into run_mlpro workers, each process opens
+    its own connection to the index.
+
+    such as:
+        cache = ArtifactCache("/data/cache/artifacts", max_bytes=50 << 30)
+        key = artifact_key("thumbnail", file_identity(path), {"size": (64, 64)})
+        thumb = cache.get(key)
+        if thumb is None:
+            thumb = cache.put(key, make_thumbnail(path))
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._pid = None
+        self._touched = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        return {'root': self.root, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'], state['max_bytes'])
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                os.makedirs(os.path.join(self.root, 'data'), exist_ok=True)
+                self._conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=60,
+                                             check_same_thread=False)
+                # readers do not block the writer of another process
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                # a lost commit after a power failure only loses cache entries
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS artifacts ('
+                                   'key TEXT PRIMARY KEY, file TEXT, nbytes INTEGER, last_access REAL)')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS artifacts_access ON artifacts (last_access)')
+                # the total size is kept up to date by triggers, so every process sees the puts of the others
+                self._conn.execute('CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY, nbytes INTEGER)')
+                self._conn.execute('INSERT OR IGNORE INTO totals '
+                                   'SELECT 0, COALESCE(SUM(nbytes), 0) FROM artifacts')
+                self._conn.execute('CREATE TRIGGER IF NOT EXISTS artifacts_insert AFTER INSERT ON artifacts '
+                                   'BEGIN UPDATE totals SET nbytes = nbytes + NEW.nbytes WHERE id = 0; END')
+                self._conn.execute('CREATE TRIGGER IF NOT EXISTS artifacts_delete AFTER DELETE ON artifacts '
+                                   'BEGIN UPDATE totals SET nbytes = nbytes - OLD.nbytes WHERE id = 0; END')
+                self._conn.commit()
+                self._pid = os.getpid()
+                self._touched = {}
+            return self._conn
+
+    def _path(self, file: str) -> str:
+        return os.path.join(self.root, 'data', file[:2], file)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM artifacts').fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self.conn.execute('SELECT 1 FROM artifacts WHERE key=?', (key,)).fetchone() is not None
+
+    def total_bytes(self) -> int:
+        """
+        :return:  size of all artifacts, written by any process
+        """
+        with self._lock:
+            return self.conn.execute('SELECT nbytes FROM totals WHERE id = 0').fetchone()[0]
+
+    def get(self, key: str, mmap: bool = True) -> Any:
+        """
+        :param key:  artifact key
+        :param mmap:  memory map .npy artifacts instead of reading them
+        :return:  the artifact, or None if it is not cached
+        """
+        with self._lock:
+            row = self.conn.execute('SELECT file FROM artifacts WHERE key=?', (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            if row[0].endswith('.npy'):
+                value = np.load(self._path(row[0]), mmap_mode='r' if mmap else None)
+            else:
+                with np.load(self._path(row[0])) as data:
+                    value = {k: v.item() if v.ndim == 0 else v for k, v in data.items()}
+        except (OSError, ValueError):
+            # evicted by another process, or a file that was removed by hand
+            with self._lock:
+                self.conn.execute('DELETE FROM artifacts WHERE key=?', (key,))
+                self.conn.commit()
+            return None
+
+        with self._lock:
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self.flush()
+        return value
+
+    def put(self, key: str, value: Union[np.ndarray, Dict[str, Any]]) -> Any:
+        """
+        :param key:  artifact key
+        :param value:  ndarray, or dict of ndarrays and scalars
+        :return:  value
+        """
+        if isinstance(value, dict):
+            file, save = key + '.npz', lambda f: np.savez(f, **value)
+        elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            file, save = key + '.npy', lambda f: np.save(f, value)
+        else:
+            raise ValueError('Only ndarrays and dicts can be cached, got {}'.format(type(value)))
+
+        path = self._path(file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written to a private file and renamed, a reader never sees a partial artifact
+        tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            save(f)
+        nbytes = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            # delete and insert instead of a replace, which would not run the delete trigger
+            self.conn.execute('DELETE FROM artifacts WHERE key=?', (key,))
+            self.conn.execute('INSERT INTO artifacts VALUES (?, ?, ?, ?)', (key, file, nbytes, time.time()))
+            self.conn.commit()
+            if self.max_bytes is not None and self.total_bytes() > self.max_bytes:
+                self.evict()
+        return value
+
+    def flush(self) -> None:
+        """
+        write the pending access times to the index
+        """
+        with self._lock:
+            if self._touched:
+                self.conn.executemany('UPDATE artifacts SET last_access=? WHERE key=?',
+                                      [(t, key) for key, t in self._touched.items()])
+                self.conn.commit()
+                self._touched = {}
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        remove the least recently used artifacts
+        :param max_bytes:  size limit, None for the max_bytes of the cache
+        :return:  number of removed artifacts
+        """
+        with self._lock:
+            max_bytes = self.max_bytes if max_bytes is None else max_bytes
+            self.flush()
+            total = self.total_bytes()
+            target = max_bytes * EVICT_LOW_WATER
+            removed = []
+            for key, file, nbytes in self.conn.execute('SELECT key, file, nbytes FROM artifacts ORDER BY last_access'):
+                if total <= target:
+                    break
+                removed.append((key, file))
+                total -= nbytes
+
+            self.conn.executemany('DELETE FROM artifacts WHERE key=?', [(key,) for key, _ in removed])
+            self.conn.commit()
+            for _, file in removed:
+                try:
+                    os.remove(self._path(file))
+                except FileNotFoundError:
+                    pass
+            return len(removed)
+
+    def clear(self) -> None:
+        self.evict(0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self.flush()
+                self._conn.close()
+            self._conn = None
+
+
+def open_artifact_cache(cache: Union[ArtifactCache, str], max_bytes: Optional[int] = None) -> ArtifactCache:
+    """
+    :param cache:  ArtifactCache or its root directory, directories are opened once per process
+    :param max_bytes:  see ArtifactCache, only used when cache is a directory
+    :return:  ArtifactCache
+    """
+    if isinstance(cache, ArtifactCache):
+        return cache
+    key = (os.path.abspath(cache), max_bytes)
+    if key not in _CACHES:
+        _CACHES[key] = ArtifactCache(cache, max_bytes)
+    return _CACHES[key]
+
+
+def cached_artifact(name: Optional[str] = None, identity: str = 'stat') -> Callable:
+    """
+    decorator for functions computing an artifact from a file, the first argument of the function is the file path.
+    the decorated function takes an extra cache keyword argument, an ArtifactCache or its root directory.
+    without it the function is called as usual, with it the result is looked up by the file identity, the
+    function name and the other arguments (defaults included), and computed and stored on a miss.
+    None results, such as images that cannot be read, are not cached.
+
+    such as:
+        @cached_artifact()
+        def read_thumbnail(path, size=(64, 64)):
+            ...
+
+        thumb = read_thumbnail(path, (64, 64), cache="/data/cache/artifacts")
+    :param name:  artifact name in the key, None for the qualified name of the function
+    :param identity:  'stat' or 'content', see file_identity
+    :return:  decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        artifact_name = name or '{}.{}'.format(func.__module__, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, cache: Union[ArtifactCache, str, None] = None, **kwargs):
+            if cache is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            path = params.pop(next(iter(signature.parameters)))
+            try:
+                key = artifact_key(artifact_name, file_identity(path, identity), params)
+            except OSError:
+                return func(*args, **kwargs)
+
+            cache = open_artifact_cache(cache)
+            value = cache.get(key)
+            if value is None:
+                value = func(*args, **kwargs)
+                if value is not None:
+                    cache.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
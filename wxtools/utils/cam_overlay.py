@@ -0,0 +1,194 @@
+"""""""""""""""""""""""""""""
+Project: wxtools
+Author: Terance Jiang
+Date: 10/19/2026
+"""""""""""""""""""""""""""""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Tuple, Union, Sequence
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+
+def _to_numpy(heatmaps) -> np.ndarray:
+    """
+    convert heatmaps (torch tensor, ndarray or list of them) to a float32 array of shape (n, h, w)
+    :param heatmaps:  heatmap or list of heatmaps
+    :return:  float32 array of shape (n, h, w)
+    """
+    if isinstance(heatmaps, (list, tuple)):
+        heatmaps = np.stack([_to_numpy(x)[0] for x in heatmaps])
+    elif hasattr(heatmaps, 'detach'):
+        # torch tensor, imported lazily so this module does not depend on torch
+        heatmaps = heatmaps.detach().cpu().numpy()
+
+    heatmaps = np.asarray(heatmaps, dtype=np.float32)
+    if heatmaps.ndim == 2:
+        heatmaps = heatmaps[np.newaxis, ...]
+    if heatmaps.ndim != 3:
+        raise ValueError('heatmaps should have shape (h, w) or (n, h, w)')
+
+    return heatmaps
+
+
+@lru_cache(maxsize=None)
+def _interp_matrix(src_len: int, dst_len: int) -> np.ndarray:
+    """
+    build a (dst_len, src_len) linear interpolation matrix, using the same pixel-center convention as cv2.INTER_LINEAR
+    :param src_len:  source length
+    :param dst_len:  destination length
+    :return:  interpolation matrix
+    """
+    scale = src_len / dst_len
+    pos = (np.arange(dst_len, dtype=np.float64) + 0.5) * scale - 0.5
+    pos = np.clip(pos, 0, src_len - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, src_len - 1)
+    frac = pos - lo
+
+    mat = np.zeros((dst_len, src_len), dtype=np.float32)
+    rows = np.arange(dst_len)
+    np.add.at(mat, (rows, lo), 1.0 - frac)
+    np.add.at(mat, (rows, hi), frac)
+    return mat
+
+
+@lru_cache(maxsize=None)
+def colormap_lut(colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
+    """
+    precompute a colormap lookup table
+    :param colormap:  cv2 colormap id
+    :return:  uint8 array of shape (256, 3) in BGR order
+    """
+    lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(-1, 1), colormap)
+    lut = lut.reshape(256, 3)
+    lut.setflags(write=False)
+    return lut
+
+
+def upsample_heatmaps(heatmaps, size: Tuple[int, int]) -> np.ndarray:
+    """
+    upsample a batch of heatmaps to (width, height) with bilinear interpolation.
+    the whole batch is resized with two matrix multiplications instead of a cv2.resize call per heatmap.
+    :param heatmaps:  heatmaps of shape (n, h, w) or (h, w), ndarray or torch tensor
+    :param size:  output size in (width, height)
+    :return:  float32 array of shape (n, height, width)
+    """
+    heatmaps = _to_numpy(heatmaps)
+    width, height = size
+    _, h, w = heatmaps.shape
+
+    mat_y = _interp_matrix(h, height)
+    mat_x = _interp_matrix(w, width)
+
+    # (H, h) @ (n, h, w) @ (w, W) -> (n, H, W)
+    return np.matmul(np.matmul(mat_y, heatmaps), mat_x.T)
+
+
+def overlay_heatmaps(images: np.ndarray,
+                     heatmaps,
+                     alpha: float = 0.5,
+                     colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
+    """
+    upsample heatmaps to the image resolution, colorize them and alpha-blend onto the images
+    :param images:  uint8 images of shape (n, h, w, 3) or (n, h, w), all with the same size
+    :param heatmaps:  heatmaps in [0, 1] of shape (n, h', w')
+    :param alpha:  weight of the heatmap in the blend
+    :param colormap:  cv2 colormap id
+    :return:  uint8 overlays of shape (n, h, w, 3)
+    """
+    images = np.asarray(images)
+    if images.ndim == 3:
+        images = np.repeat(images[..., np.newaxis], 3, axis=-1)
+    if images.ndim != 4 or images.shape[-1] != 3:
+        raise ValueError('images should have shape (n, h, w, 3) or (n, h, w)')
+
+    heatmaps = _to_numpy(heatmaps)
+    if len(heatmaps) != len(images):
+        raise ValueError('images and heatmaps should have the same length')
+
+    height, width = images.shape[1:3]
+    heatmaps = upsample_heatmaps(heatmaps, (width, height))
+    indices = np.clip(heatmaps * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    colored = colormap_lut(colormap)[indices]
+
+    # integer blend, (a * x + b * y + 128) >> 8 with a + b = 256
+    weight = int(round(alpha * 256))
+    blended = images.astype(np.uint16) * (256 - weight)
+    blended += colored.astype(np.uint16) * weight
+    blended += 128
+    blended >>= 8
+    return blended.astype(np.uint8)
+
+
+def _group_by_shape(images: Sequence[np.ndarray]) -> List[List[int]]:
+    """
+    group image indices by image shape, so that each group can be processed as one batch
+    :param images:  list of images
+    :return:  list of index groups
+    """
+    groups = {}
+    for idx, image in enumerate(images):
+        groups.setdefault(image.shape, []).append(idx)
+    return list(groups.values())
+
+
+def _write_image(arg) -> None:
+    path, image = arg
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if not cv2.imwrite(path, image):
+        raise IOError('Failed to write image: {}'.format(path))
+
+
+def export_overlays(images: Union[np.ndarray, List[np.ndarray]],
+                    heatmaps,
+                    output_paths: List[str],
+                    alpha: float = 0.5,
+                    colormap: int = cv2.COLORMAP_JET,
+                    batch_size: int = 64,
+                    num_threads: int = 8) -> None:
+    """
+    generate grad cam overlays in batches and write them with a thread pool
+    such as:
+        heatmaps = [grad_cam.generate_heatmap(x, None) for x in tensors]
+        export_overlays(images, heatmaps, ["/dst/1.jpg", "/dst/2.jpg", ...])
+    :param images:  list of uint8 images (sizes may differ), or an array of shape (n, h, w, 3)
+    :param heatmaps:  list of heatmaps or an array of shape (n, h', w'), ndarray or torch tensor
+    :param output_paths:  output path of each overlay
+    :param alpha:  weight of the heatmap in the blend
+    :param colormap:  cv2 colormap id
+    :param batch_size:  number of images blended at once
+    :param num_threads:  number of encoder threads
+    :return:  None
+    """
+    assert len(images) == len(heatmaps) == len(output_paths), \
+        "images, heatmaps and output_paths should have the same length"
+
+    if not isinstance(heatmaps, (list, tuple)):
+        heatmaps = _to_numpy(heatmaps)
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        pending = deque()
+        pbar = tqdm(total=len(images))
+        for group in _group_by_shape(images):
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                overlays = overlay_heatmaps(np.stack([images[i] for i in batch]),
+                                            _to_numpy([heatmaps[i] for i in batch]),
+                                            alpha=alpha, colormap=colormap)
+
+                # cv2.imwrite releases the GIL, so encoding overlaps with blending the next batch
+                pending.extend(executor.submit(_write_image, (output_paths[i], x)) for i, x in zip(batch, overlays))
+
+                # keep at most a few batches in flight to bound memory
+                while len(pending) > batch_size * 4:
+                    pending.popleft().result()
+                pbar.update(len(batch))
+
+        for future in pending:
+            future.result()
+        pbar.close()
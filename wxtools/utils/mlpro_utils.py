@@ -4,30 +4,172 @@ Author: Terance Jiang
 Date: 1/16/2024
 """""""""""""""""""""""""""""
 import multiprocessing
+import os
+from collections import namedtuple
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 
+import numpy as np
 from tqdm import tqdm
-from typing import Callable
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 from wxtools.logger.logger import setup_logger
 
 logger = setup_logger(__name__, log_file=None, log_level='INFO')
 
+# payloads smaller than this are pickled as usual, a shared memory block costs a few syscalls
+SHARED_MEMORY_MIN_BYTES = 1 << 16
 
-def run_mlpro(worker: Callable, data: list, num_process: int = 10) -> list:
+# handles sent back through the pool pipe instead of the payloads
+SharedArray = namedtuple('SharedArray', ['name', 'shape', 'dtype'])
+SharedStrings = namedtuple('SharedStrings', ['name', 'size'])
+
+
+def _write_shared(data: memoryview) -> str:
+    """
+    copy data into a new shared memory block, the block is unlinked by the process reading it
+    """
+    shm = SharedMemory(create=True, size=max(1, data.nbytes))
+    shm.buf[:data.nbytes] = data
+    shm.close()
+    if os.name == 'posix':
+        # the reading process owns the block, it must not be cleaned up when this worker exits.
+        # the tracker registers posix blocks under their path, the name with a leading slash
+        resource_tracker.unregister('/' + shm.name.lstrip('/'), 'shared_memory')
+    return shm.name
+
+
+def _read_shared(name: str, size: int) -> bytearray:
+    shm = SharedMemory(name=name)
+    try:
+        return bytearray(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def to_shared(result: Any, min_bytes: int = SHARED_MEMORY_MIN_BYTES) -> Any:
+    """
+    move the large parts of a worker result into shared memory.
+    ndarrays and lists of strings are replaced by handles, tuples and dicts are converted recursively.
+    :param result:  worker result
+    :param min_bytes:  payloads smaller than this are left as they are
+    :return:  result with handles
+    """
+    if isinstance(result, np.ndarray) and result.nbytes >= min_bytes and not result.dtype.hasobject:
+        data = np.ascontiguousarray(result)
+        return SharedArray(_write_shared(memoryview(data).cast('B')), data.shape, data.dtype.str)
+    if isinstance(result, list) and len(result) > 0 and all(isinstance(x, str) for x in result):
+        data = '\0'.join(result).encode()
+        # strings containing '\0' cannot be packed
+        if len(data) >= min_bytes and data.count(b'\0') == len(result) - 1:
+            return SharedStrings(_write_shared(memoryview(data)), len(data))
+        return result
+    if type(result) is tuple:
+        return tuple(to_shared(x, min_bytes) for x in result)
+    if type(result) is dict:
+        return {k: to_shared(v, min_bytes) for k, v in result.items()}
+    return result
+
+
+def from_shared(result: Any) -> Any:
+    """
+    inverse of to_shared, reads and unlinks the shared memory blocks
+    """
+    if isinstance(result, SharedArray):
+        data = _read_shared(result.name, int(np.prod(result.shape)) * np.dtype(result.dtype).itemsize)
+        return np.frombuffer(data, dtype=result.dtype).reshape(result.shape)
+    if isinstance(result, SharedStrings):
+        return _read_shared(result.name, result.size).decode().split('\0')
+    if type(result) is tuple:
+        return tuple(from_shared(x) for x in result)
+    if type(result) is dict:
+        return {k: from_shared(v) for k, v in result.items()}
+    return result
+
+
+class SharedMemoryWorker:
+    """
+    wrap a worker so that its results are returned through shared memory, see to_shared
+    """
+
+    def __init__(self, worker: Callable, min_bytes: int = SHARED_MEMORY_MIN_BYTES):
+        self.worker = worker
+        self.min_bytes = min_bytes
+
+    def __call__(self, arg):
+        return to_shared(self.worker(arg), self.min_bytes)
+
+
+def run_mlpro(worker: Callable,
+              data: list,
+              num_process: int = 10,
+              chunksize: int = 1,
+              shared_memory: bool = False,
+              initializer: Optional[Callable] = None,
+              initargs: tuple = ()) -> list:
     """
     run worker with multiprocessing
     :param worker:  worker function
     :param data:  list of data
     :param num_process:  number of processes
+    :param chunksize:  number of items sent to a worker at once, use a larger value for many cheap tasks
+    :param shared_memory:  return large ndarrays and lists of strings through shared memory instead of pickling
+                           them through the pool pipe, for workers with large results
+    :param initializer:  called with initargs once in each worker process when it starts, such as
+                         init_onnx_worker to load a model once per worker instead of once per task
+    :param initargs:  arguments of initializer
     :return:  list of results or empty list
     """
-    pool = multiprocessing.Pool(num_process)
-    output = []
-    for _ in tqdm(pool.imap_unordered(worker, data), total=len(data)):
-        if _ is not None:
-            output.append(_)
+    return list(iter_mlpro(worker, data, num_process, chunksize, len(data), shared_memory, initializer, initargs))
 
-    pool.close()
-    pool.join()
 
-    return output
+def iter_mlpro(worker: Callable,
+               data: Iterable,
+               num_process: int = 10,
+               chunksize: int = 1,
+               total: Optional[int] = None,
+               shared_memory: bool = False,
+               initializer: Optional[Callable] = None,
+               initargs: tuple = ()) -> Iterator:
+    """
+    run worker with multiprocessing and yield results as they finish, instead of collecting them in a list
+    :param worker:  worker function
+    :param data:  iterable of data, e.g. a generator over a large manifest
+    :param num_process:  number of processes
+    :param chunksize:  number of items sent to a worker at once
+    :param total:  number of items for the progress bar, None if unknown
+    :param shared_memory:  see run_mlpro
+    :param initializer:  see run_mlpro
+    :param initargs:  see run_mlpro
+    :return:  iterator of results, None results are skipped
+    """
+    if shared_memory:
+        worker = SharedMemoryWorker(worker)
+    pool = multiprocessing.Pool(num_process, initializer, initargs)
+    results = pool.imap_unordered(worker, data, chunksize=chunksize)
+    try:
+        for _ in tqdm(results, total=total):
+            if _ is not None:
+                yield from_shared(_) if shared_memory else _
+    finally:
+        pool.terminate()
+        if shared_memory:
+            # the consumer stopped early, finished results that were not read still own their blocks
+            _drain_shared(results)
+
+
+def _drain_shared(results: Iterator) -> None:
+    """
+    read and unlink the shared memory blocks of the results already received by a terminated pool
+    """
+    while True:
+        try:
+            result = results.next(timeout=0)
+        except (StopIteration, multiprocessing.TimeoutError):
+            return
+        except Exception:
+            # a task that raised
+            continue
+        if result is not None:
+            from_shared(result)